@@ -9,9 +9,12 @@ from cdk_nag import NagPackSuppression
 from cdk_nag import NagSuppressions
 from cdk_nag import NIST80053R5Checks
 
+from cdk import nag_cache
 from cdk.application_account import ApplicationStack
 from cdk.database_account import DatabaseStack
 
+NAG_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".nag-cache.json")
+
 app = cdk.App()
 
 env = cdk.Environment(
@@ -19,8 +22,31 @@ env = cdk.Environment(
     region=os.environ["CDK_DEFAULT_REGION"],
 )
 
-databaes_stack = DatabaseStack(app, "DatabaseStack", env=env)
-application_stack = ApplicationStack(app, "ApplicationStack", env=env)
+# `cdk synth -c stack=ApplicationStack` builds and checks only that stack.
+selected_stack = app.node.try_get_context("stack")
+if selected_stack not in (None, "DatabaseStack", "ApplicationStack"):
+    raise ValueError("stack must be DatabaseStack or ApplicationStack")
+
+
+def stack_scope(stack_name):
+    # A stack that is not selected is built in an app that is never
+    # synthesized, so the suppressions below apply to both alike.
+    if selected_stack in (None, stack_name):
+        return app
+    return cdk.App()
+
+
+databaes_stack = DatabaseStack(stack_scope("DatabaseStack"), "DatabaseStack", env=env)
+application_stack = ApplicationStack(
+    stack_scope("ApplicationStack"),
+    "ApplicationStack",
+    env=env,
+)
+stacks = [
+    stack
+    for stack in (databaes_stack, application_stack)
+    if selected_stack in (None, stack.stack_name)
+]
 
 # ApplicationStack Surpressions
 
@@ -83,6 +109,46 @@ NagSuppressions.add_resource_suppressions_by_path(
     ],
 )
 
+# Outside the nat network mode, the S3 prefix list is looked up by a custom
+# resource.
+s3_prefix_list_paths = [
+    f"/ApplicationStack/{path}"
+    for path in (
+        "s3-prefix-list/CustomResourcePolicy/Resource",
+        "AWS679f53fac002430cb0da5b7982bd2287/ServiceRole/Resource",
+        "AWS679f53fac002430cb0da5b7982bd2287/Resource",
+    )
+    if application_stack.node.try_find_child("s3-prefix-list") is not None
+]
+
+if s3_prefix_list_paths:
+    NagSuppressions.add_resource_suppressions_by_path(
+        application_stack,
+        path=s3_prefix_list_paths,
+        suppressions=[
+            NagPackSuppression(
+                id="AwsSolutions-IAM4",
+                reason="Cannot control AwsCustomResource resources",
+            ),
+            NagPackSuppression(
+                id="AwsSolutions-IAM5",
+                reason="ec2:DescribeManagedPrefixLists does not support resource-level permissions",
+            ),
+            NagPackSuppression(
+                id="NIST.800.53.R5-IAMNoInlinePolicy",
+                reason="Cannot control AwsCustomResource resources",
+            ),
+            NagPackSuppression(
+                id="NIST.800.53.R5-LambdaConcurrency",
+                reason="Cannot control AwsCustomResource resources",
+            ),
+            NagPackSuppression(
+                id="NIST.800.53.R5-LambdaInsideVPC",
+                reason="Cannot control AwsCustomResource resources",
+            ),
+        ],
+    )
+
 NagSuppressions.add_stack_suppressions(
     application_stack,
     suppressions=[
@@ -127,6 +193,13 @@ NagSuppressions.add_stack_suppressions(
 
 # DatabaseStack Surpressions
 
+# The reader tier is sized from context, so its instances are looked up.
+reader_instance_paths = [
+    f"/DatabaseStack/PostgreSQLCluster/{child.node.id}/Resource"
+    for child in databaes_stack.node.find_child("PostgreSQLCluster").node.children
+    if child.node.id.startswith("reader")
+]
+
 NagSuppressions.add_resource_suppressions_by_path(
     databaes_stack,
     path=[
@@ -136,6 +209,7 @@ NagSuppressions.add_resource_suppressions_by_path(
         "/DatabaseStack/PostgreSQLCluster/Secret/Resource",
         "/DatabaseStack/PostgreSQLCluster/Resource",
         "/DatabaseStack/PostgreSQLCluster/writer/Resource",
+        *reader_instance_paths,
         "/DatabaseStack/RdsProxy/IAMRole/DefaultPolicy/Resource",
         "/DatabaseStack/CrossAccountRdsConnectRole/DefaultPolicy/Resource",
     ],
@@ -179,7 +253,12 @@ NagSuppressions.add_resource_suppressions_by_path(
     ],
 )
 
-cdk.Aspects.of(app).add(AwsSolutionsChecks())
-cdk.Aspects.of(app).add(NIST80053R5Checks())
-
-app.synth()
+# Nag findings are cached per stack template; `-c nag_cache=false` re-checks
+# every stack.
+nag_cache.synth(
+    app,
+    stacks,
+    pack_factories=(AwsSolutionsChecks, NIST80053R5Checks),
+    cache_path=NAG_CACHE_PATH,
+    use_cache=str(app.node.try_get_context("nag_cache")).lower() != "false",
+)
@@ -0,0 +1,247 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import re
+
+import psycopg2
+import psycopg2.extensions
+from pinning import PinningError
+from resilience import DeadlineExceeded
+
+# Upper bound on rows returned per statement in a batch result.
+DEFAULT_MAX_ROWS = 1000
+
+# Statements grouped into one round trip stay below the size at which RDS
+# Proxy pins the session.
+MAX_ROUND_TRIP_BYTES = 16000
+# Room in each round trip for the statement_timeout of a deadline.
+TIMEOUT_PREFIX_BYTES = 48
+
+# Marks the start of a grouped round trip in a transaction, so that a failed
+# group can be rolled back to it and run again one statement at a time.
+SAVEPOINT = b"savepoint batch_group"
+RELEASE_SAVEPOINT = b"release savepoint batch_group"
+ROLLBACK_TO_SAVEPOINT = b"rollback to savepoint batch_group"
+SAVEPOINT_PREFIX_BYTES = len(RELEASE_SAVEPOINT) + len(SAVEPOINT) + 4
+
+ROW_RETURNING = re.compile(
+    r"^\s*(select|with|values|show|table|explain)\b|\breturning\b",
+    re.IGNORECASE,
+)
+
+
+def returns_rows(statement):
+    if "fetch" in statement:
+        return bool(statement["fetch"])
+    return bool(ROW_RETURNING.search(statement["sql"]))
+
+
+def normalize_statements(event):
+    """Returns the ordered statements of a batch event.
+
+    Items are SQL strings or {"sql": ..., "params": [...], "fetch": bool}
+    objects using psycopg2 %s placeholders.
+    """
+    statements = []
+    for statement in event["statements"]:
+        if isinstance(statement, str):
+            statement = {"sql": statement}
+        statements.append(
+            {
+                "sql": statement["sql"],
+                "params": statement.get("params"),
+                "fetch": returns_rows(statement),
+            },
+        )
+    return statements
+
+
+def guard_statements(statements, guard, transaction):
+    """Runs every statement through a PinningGuard before any is sent.
+
+    Rewrites statements in place. Returns per-statement results when a
+    statement is rejected, in which case nothing should be executed.
+    """
+    errors = {}
+    for index, statement in enumerate(statements):
+        try:
+            statement["sql"] = guard.check(statement["sql"], transaction)
+        except PinningError as e:
+            errors[index] = {"status": "error", "error": str(e)}
+    if not errors:
+        return None
+    return [errors.get(index, {"status": "skipped"}) for index in range(len(statements))]
+
+
+def _round_trips(cur, statements):
+    """Groups consecutive statements that return no rows so that each group
+    is sent to the server as one multi-statement query."""
+    prefix_bytes = TIMEOUT_PREFIX_BYTES + SAVEPOINT_PREFIX_BYTES
+    group, group_bytes = [], prefix_bytes
+    for index, statement in enumerate(statements):
+        if statement["fetch"]:
+            if group:
+                yield group
+                group, group_bytes = [], prefix_bytes
+            yield [(index, statement)]
+            continue
+
+        statement_bytes = len(cur.mogrify(statement["sql"], statement["params"]))
+        if group and group_bytes + statement_bytes > MAX_ROUND_TRIP_BYTES:
+            yield group
+            group, group_bytes = [], prefix_bytes
+        group.append((index, statement))
+        group_bytes += statement_bytes + 2
+    if group:
+        yield group
+
+
+def _failure(error):
+    """The result of a statement that failed with `error`."""
+    if isinstance(error, (DeadlineExceeded, psycopg2.extensions.QueryCanceledError)):
+        return {"status": "timeout", "error": str(error).strip()}
+    return {"status": "error", "error": str(error).strip()}
+
+
+def _execute_group(cur, group, max_rows, deadline=None, prefix=()):
+    # Travels in the same round trip as the statements it limits.
+    timeout_sql = deadline.statement_timeout_sql() if deadline is not None else None
+    if timeout_sql is not None:
+        prefix = [timeout_sql.encode(), *prefix]
+    if len(group) == 1 and not prefix:
+        _, statement = group[0]
+        cur.execute(statement["sql"], statement["params"])
+    else:
+        cur.execute(
+            b";\n".join(
+                list(prefix)
+                + [
+                    cur.mogrify(statement["sql"], statement["params"])
+                    for _, statement in group
+                ],
+            ),
+        )
+
+    if group[-1][1]["fetch"]:
+        rows = cur.fetchmany(max_rows + 1)
+        return [
+            {
+                "status": "ok",
+                "rowcount": cur.rowcount,
+                "columns": [column.name for column in cur.description],
+                "rows": [list(row) for row in rows[:max_rows]],
+                "truncated": len(rows) > max_rows,
+            },
+        ]
+    # Only the last statement of a multi-statement query reports a rowcount.
+    return [{"status": "ok"} for _ in group[:-1]] + [
+        {"status": "ok", "rowcount": cur.rowcount},
+    ]
+
+
+def _attribute_failure(cur, group, error, max_rows, deadline):
+    """Returns per-statement results for a grouped round trip that failed
+    with `error` after its savepoint.
+
+    The group is rolled back to the savepoint and run again one statement at
+    a time, up to the statement that fails. Timeouts leave no time to do so,
+    and the statements of the group are reported as "unknown".
+    """
+    failure = _failure(error)
+    unknown = {"status": "unknown", "cause": failure["status"], "error": failure["error"]}
+    if failure["status"] == "timeout":
+        return [unknown] * len(group)
+
+    cur.execute(ROLLBACK_TO_SAVEPOINT)
+    results = []
+    for index, statement in group:
+        try:
+            (result,) = _execute_group(cur, [(index, statement)], max_rows, deadline)
+        except (psycopg2.DatabaseError, DeadlineExceeded) as e:
+            results.append(_failure(e))
+            return results + [{"status": "skipped"}] * (len(group) - len(results))
+        results.append(result)
+    # Ran through on its own; which statement failed is not known.
+    return [unknown] * len(group)
+
+
+def execute_batch(
+    conn,
+    statements,
+    transaction=True,
+    max_rows=DEFAULT_MAX_ROWS,
+    deadline=None,
+):
+    """Executes statements in order and returns one result per statement.
+
+    With `transaction`, the statements run in a single transaction that is
+    rolled back at the first error; later statements are reported as skipped.
+    Runs of statements that return no rows are sent in one round trip.
+
+    Without `transaction`, every statement runs in its own implicit
+    transaction, one round trip each, so that each one can fail on its own.
+
+    With a `deadline`, every round trip of a transaction carries a
+    statement_timeout that ends at it. Statements without a transaction are
+    sent on their own and left to the caller's cancel_on_expiry. Statements
+    cancelled at the deadline, or left without time to start, are reported
+    with a "timeout" status.
+
+    When a grouped round trip fails, its statements are run again one at a
+    time to find the one that failed. Statements of a group that ran out of
+    time are reported as "unknown", with the "cause" of the failure.
+    """
+    results = [None] * len(statements)
+
+    if not transaction:
+        autocommit = conn.autocommit
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for index, statement in enumerate(statements):
+                    try:
+                        if deadline is not None:
+                            # Raises when no time is left. A SET LOCAL sent
+                            # with the statement would wrap it in a
+                            # transaction block, in which VACUUM or CREATE
+                            # INDEX CONCURRENTLY cannot run.
+                            deadline.statement_timeout_sql()
+                        (results[index],) = _execute_group(
+                            cur,
+                            [(index, statement)],
+                            max_rows,
+                        )
+                    except (psycopg2.DatabaseError, DeadlineExceeded) as e:
+                        if conn.closed:
+                            raise
+                        results[index] = _failure(e)
+        finally:
+            conn.autocommit = autocommit
+        return results
+
+    with conn.cursor() as cur:
+        savepoint = False
+        for group in _round_trips(cur, statements):
+            prefix = []
+            if len(group) > 1:
+                # Only the savepoint of the current group is kept.
+                prefix = [RELEASE_SAVEPOINT, SAVEPOINT] if savepoint else [SAVEPOINT]
+            try:
+                group_results = _execute_group(cur, group, max_rows, deadline, prefix)
+            except (psycopg2.DatabaseError, DeadlineExceeded) as e:
+                if conn.closed:
+                    raise
+                if prefix and not isinstance(e, DeadlineExceeded):
+                    group_results = _attribute_failure(cur, group, e, max_rows, deadline)
+                else:
+                    # Nothing of the group ran, or it is a single statement.
+                    group_results = [_failure(e)]
+                conn.rollback()
+                for (index, _), result in zip(group, group_results):
+                    results[index] = result
+                return [result or {"status": "skipped"} for result in results]
+            savepoint = savepoint or bool(prefix)
+            for (index, _), result in zip(group, group_results):
+                results[index] = result
+    conn.commit()
+    return results
@@ -0,0 +1,173 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+import time
+from collections import OrderedDict
+
+from credentials import CredentialCache
+from metrics import NO_OP_RECORDER
+from tokens import AuthTokenCache
+
+
+class _Loading:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class BoundedTTLCache:
+    """A size-bounded LRU whose entries also expire after `idle_seconds`
+    without access. Concurrent loads of the same key run the loader once;
+    the other callers wait for its result."""
+
+    def __init__(self, max_entries, idle_seconds, on_evict=None):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self.stats = {"hits": 0, "misses": 0, "collapsed": 0, "evictions": 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expire(self, now):
+        evicted = []
+        while self._entries:
+            key, (value, last_used) = next(iter(self._entries.items()))
+            if (
+                len(self._entries) <= self.max_entries
+                and now - last_used < self.idle_seconds
+            ):
+                break
+            del self._entries[key]
+            evicted.append(value)
+        self.stats["evictions"] += len(evicted)
+        return evicted
+
+    def _evict(self, values):
+        if self.on_evict is not None:
+            for value in values:
+                self.on_evict(value)
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+            else:
+                loading = self._loading.get(key)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[key] = _Loading()
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["collapsed"] += 1
+        self._evict(evicted)
+
+        if entry is not None:
+            return entry[0]
+
+        if not owner:
+            loading.done.wait()
+            if loading.error is not None:
+                raise loading.error
+            return loading.value
+
+        try:
+            loading.value = loader()
+        except Exception as e:
+            loading.error = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (loading.value, time.monotonic())
+                evicted = self._expire(time.monotonic())
+            self._evict(evicted)
+            return loading.value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.done.set()
+
+    def values(self):
+        with self._lock:
+            return [value for value, _ in self._entries.values()]
+
+
+class CredentialBroker:
+    """Assumed-role credentials and RDS IAM auth tokens for many database
+    targets, held per role ARN in a BoundedTTLCache."""
+
+    def __init__(self, session, targets, max_entries, idle_seconds, token_max_age):
+        self.session = session
+        self.targets = targets
+        self.token_max_age = token_max_age
+        self._roles = BoundedTTLCache(max_entries, idle_seconds)
+
+    def target(self, name):
+        try:
+            return self.targets[name]
+        except KeyError:
+            raise KeyError(f"Unknown database target {name!r}") from None
+
+    def caches(self, name):
+        """Returns the (CredentialCache, AuthTokenCache) pair for a target."""
+        role_arn = self.target(name).role_arn
+
+        def load():
+            credential_cache = CredentialCache(role_arn, self.session)
+            return credential_cache, AuthTokenCache(
+                credential_cache,
+                max_age=self.token_max_age,
+            )
+
+        return self._roles.get_or_load(role_arn, load)
+
+    def auth_token(self, name, hostname=None, metrics=NO_OP_RECORDER):
+        """Returns a token for a target, timing the credential and token
+        lookups as the "credentials" and "token" phases of `metrics`."""
+        target = self.target(name)
+        credential_cache, token_cache = self.caches(name)
+
+        with metrics.phase("credentials") as phase:
+            hits = credential_cache.stats["hits"]
+            signer = credential_cache.get_rds_client()
+            phase.dimensions["CacheHit"] = credential_cache.stats["hits"] > hits
+
+        with metrics.phase("token") as phase:
+            hits = token_cache.stats["hits"]
+            token = token_cache.get(
+                hostname or target.endpoint,
+                target.port,
+                target.user,
+                target.region,
+                signer=signer,
+            )
+            phase.dimensions["CacheHit"] = token_cache.stats["hits"] > hits
+        return token
+
+    def invalidate_auth_token(self, name, hostname=None):
+        _, token_cache = self.caches(name)
+        token_cache.invalidate(hostname or self.target(name).endpoint)
+
+    @property
+    def stats(self):
+        totals = {
+            "credential_cache": {"hits": 0, "misses": 0, "refreshes": 0},
+            "token_cache": {"hits": 0, "misses": 0, "refreshes": 0},
+        }
+        for credential_cache, token_cache in self._roles.values():
+            for key in ("hits", "misses", "refreshes"):
+                totals["credential_cache"][key] += credential_cache.stats[key]
+                totals["token_cache"][key] += token_cache.stats[key]
+        totals["roles"] = dict(self._roles.stats, size=len(self._roles))
+        return totals
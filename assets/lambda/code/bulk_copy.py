@@ -0,0 +1,383 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+import time
+
+import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+from botocore.config import Config
+from defaults import DEFAULT_CHECKPOINT_TABLE
+from defaults import DEFAULT_CHUNK_BYTES
+from defaults import DEFAULT_READ_BYTES
+from metrics import NO_OP_RECORDER
+from psycopg2 import sql
+from resilience import DeadlineExceeded
+
+CSV = "csv"
+TEXT = "text"
+FORMATS = (CSV, TEXT)
+
+# Share of the time left that a chunk sized to the measured throughput
+# is planned to take.
+CHUNK_TIME_SHARE = 0.8
+
+COMPLETE = "complete"
+INCOMPLETE = "incomplete"
+
+# A stalled ranged GET must not outlast the invocation deadline; the
+# session's STS-sized read timeout is too short for S3 under load.
+S3_CLIENT_CONFIG = Config(
+    read_timeout=10,
+    retries={"mode": "standard", "total_max_attempts": 3},
+)
+
+CHECKPOINT_DDL = """create table if not exists {table} (
+    bucket text not null,
+    key text not null,
+    target_table text not null,
+    etag text not null,
+    object_bytes bigint not null,
+    byte_offset bigint not null default 0,
+    row_count bigint not null default 0,
+    completed_at timestamptz,
+    updated_at timestamptz not null default now(),
+    primary key (bucket, key, target_table)
+)"""
+
+
+class CheckpointConflict(Exception):
+    """Raised when another load of the same object holds or moved its
+    checkpoint, or the object changed under an incomplete load."""
+
+
+def last_record_end(data, data_format):
+    """Returns the length of the complete records at the start of `data`,
+    which begins at a record boundary, or 0 without one.
+
+    In CSV a newline only ends a record outside quotes, that is after an even
+    number of quote characters; an escaped quote is doubled and counts twice.
+    """
+    end = data.rfind(b"\n")
+    if data_format == CSV:
+        while end >= 0 and data.count(b'"', 0, end) % 2:
+            end = data.rfind(b"\n", 0, end)
+    return end + 1
+
+
+class RecordReader:
+    """A file-like view of the pieces of a ranged GET for COPY ... FROM
+    STDIN that stops at the last complete record.
+
+    The bytes after the last record boundary seen so far are held back and
+    only sent once the record completes, or at the end of the object, where
+    the final record may lack its newline. `sent_bytes` is where the next
+    chunk starts.
+    """
+
+    def __init__(self, pieces, data_format, at_end):
+        self.data_format = data_format
+        self.at_end = at_end
+        self.sent_bytes = 0
+
+        self._pieces = pieces
+        self._pending = b""
+        self._done = False
+
+    def read(self, size=-1):
+        # COPY sends whatever is returned as one message, so whole record
+        # runs are returned regardless of `size`.
+        while not self._done:
+            piece = next(self._pieces, None)
+            if piece is None:
+                self._done = True
+                data = self._pending if self.at_end else b""
+                self._pending = b""
+            else:
+                data = self._pending + piece
+                end = last_record_end(data, self.data_format)
+                data, self._pending = data[:end], data[end:]
+            if data:
+                self.sent_bytes += len(data)
+                return data
+        return b""
+
+
+def copy_statement(conn, table, columns, data_format, header, delimiter=None):
+    options = [sql.SQL("format {}").format(sql.SQL(data_format))]
+    if header:
+        options.append(sql.SQL("header true"))
+    if delimiter:
+        options.append(sql.SQL("delimiter {}").format(sql.Literal(delimiter)))
+    column_list = (
+        sql.SQL(" ({})").format(sql.SQL(", ").join(map(sql.Identifier, columns)))
+        if columns
+        else sql.SQL("")
+    )
+    return (
+        sql.SQL("copy {}{} from stdin with ({})")
+        .format(
+            sql.Identifier(*table.split(".", 1)),
+            column_list,
+            sql.SQL(", ").join(options),
+        )
+        .as_string(conn)
+    )
+
+
+class ChunkSizer:
+    """Sizes chunks to the COPY throughput measured so far, so that a chunk
+    ends before the deadline instead of being rolled back at it. Kept for
+    the lifetime of an execution environment."""
+
+    def __init__(self, chunk_bytes=DEFAULT_CHUNK_BYTES, min_bytes=DEFAULT_READ_BYTES):
+        self.chunk_bytes = chunk_bytes
+        self.min_bytes = min(min_bytes, chunk_bytes)
+        self.bytes_per_second = None
+
+    def record(self, sent_bytes, seconds):
+        if sent_bytes and seconds > 0:
+            self.bytes_per_second = sent_bytes / seconds
+
+    def record_cut_short(self, sent_bytes, seconds):
+        # The server was still behind the bytes sent to it, so the chunk
+        # only shows an upper bound of the throughput.
+        if sent_bytes and seconds > 0:
+            self.bytes_per_second = (
+                min(self.bytes_per_second or math.inf, sent_bytes / seconds) / 2
+            )
+
+    def size(self, remaining):
+        """Returns the bytes to load in `remaining` seconds, or 0 when even
+        the smallest chunk would not fit."""
+        if self.bytes_per_second is None or remaining == math.inf:
+            return self.chunk_bytes
+        planned = int(self.bytes_per_second * remaining * CHUNK_TIME_SHARE)
+        if planned < self.min_bytes:
+            return 0
+        return min(self.chunk_bytes, planned)
+
+
+class CheckpointStore:
+    """Keeps the progress of each load in a table of the target database.
+
+    A load is keyed by bucket, key and target table and records the ETag of
+    the object it reads. Its checkpoint is advanced in the transaction of the
+    chunk it records, so rows and checkpoint commit or roll back together.
+    """
+
+    def __init__(self, table=DEFAULT_CHECKPOINT_TABLE):
+        self.table = table
+        self._identifier = sql.Identifier(*table.split(".", 1))
+        self._created = False
+
+    def _execute(self, cur, statement, params=None):
+        cur.execute(sql.SQL(statement).format(table=self._identifier), params)
+
+    def _lock(self, conn, cur, source):
+        """Locks the checkpoint row of a load for the current transaction
+        without waiting for another load that holds it."""
+        try:
+            self._execute(
+                cur,
+                "select etag, byte_offset, row_count, completed_at from {table}"
+                " where bucket = %s and key = %s and target_table = %s"
+                " for update nowait",
+                (source["bucket"], source["key"], source["table"]),
+            )
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            raise CheckpointConflict(
+                "another load of this object is in progress",
+            ) from None
+        return cur.fetchone()
+
+    def start(self, conn, source, etag, object_bytes):
+        """Returns the checkpoint of a load, starting over when the object
+        has another ETag than the one it recorded."""
+        with conn.cursor() as cur:
+            if not self._created:
+                self._execute(cur, CHECKPOINT_DDL)
+                conn.commit()
+                self._created = True
+            params = (source["bucket"], source["key"], source["table"])
+            self._execute(
+                cur,
+                "insert into {table} (bucket, key, target_table, etag, object_bytes)"
+                " values (%s, %s, %s, %s, %s) on conflict do nothing",
+                params + (etag, object_bytes),
+            )
+            checkpoint_etag, byte_offset, row_count, completed_at = self._lock(
+                conn,
+                cur,
+                source,
+            )
+            if checkpoint_etag != etag:
+                # A load that loaded part of the old object cannot switch to
+                # the new one; one that loaded none of it or all of it starts
+                # over.
+                if completed_at is None and byte_offset > 0:
+                    conn.rollback()
+                    raise CheckpointConflict(
+                        f"s3://{source['bucket']}/{source['key']} changed during "
+                        f"an incomplete load at byte {byte_offset}",
+                    )
+                self._execute(
+                    cur,
+                    "update {table} set etag = %s, object_bytes = %s,"
+                    " byte_offset = 0, row_count = 0, completed_at = null,"
+                    " updated_at = now()"
+                    " where bucket = %s and key = %s and target_table = %s",
+                    (etag, object_bytes) + params,
+                )
+                byte_offset, row_count, completed_at = 0, 0, None
+        conn.commit()
+        return {
+            "byte_offset": byte_offset,
+            "row_count": row_count,
+            "completed": completed_at is not None,
+        }
+
+    def claim(self, conn, source, etag, byte_offset):
+        """Locks a load's checkpoint for the current transaction. Raises
+        CheckpointConflict if another load holds it or moved it."""
+        with conn.cursor() as cur:
+            checkpoint_etag, checkpoint_offset, _, _ = self._lock(conn, cur, source)
+        if (checkpoint_etag, checkpoint_offset) != (etag, byte_offset):
+            raise CheckpointConflict("another load of this object moved its checkpoint")
+
+    def advance(self, conn, source, byte_offset, rows, completed):
+        with conn.cursor() as cur:
+            self._execute(
+                cur,
+                "update {table} set byte_offset = %s, row_count = row_count + %s,"
+                " completed_at = case when %s then now() end, updated_at = now()"
+                " where bucket = %s and key = %s and target_table = %s",
+                (
+                    byte_offset,
+                    rows,
+                    completed,
+                    source["bucket"],
+                    source["key"],
+                    source["table"],
+                ),
+            )
+
+
+def ingest_object(
+    conn,
+    s3,
+    source,
+    checkpoints,
+    sizer=None,
+    read_bytes=DEFAULT_READ_BYTES,
+    deadline=None,
+    metrics=NO_OP_RECORDER,
+):
+    """Loads an S3 object into a table with COPY ... FROM STDIN, one chunk
+    per transaction, resuming from the load's checkpoint.
+
+    `source` holds the bucket, key, table, columns, format, header and
+    delimiter of the load. Each chunk is streamed from a ranged GET sized by
+    `sizer` and ends at the last record boundary in it. With a `deadline`,
+    chunks shrink to the time left, and one cut short by it is rolled back.
+
+    Returns the progress of the load; its status is COMPLETE or INCOMPLETE.
+    """
+    head = s3.head_object(Bucket=source["bucket"], Key=source["key"])
+    etag, object_bytes = head["ETag"], head["ContentLength"]
+    checkpoint = checkpoints.start(conn, source, etag, object_bytes)
+    byte_offset, row_count = checkpoint["byte_offset"], checkpoint["row_count"]
+    progress = {
+        "status": INCOMPLETE,
+        "object_bytes": object_bytes,
+        "byte_offset": byte_offset,
+        "row_count": row_count,
+        "rows_loaded": 0,
+        "chunks": 0,
+    }
+    if checkpoint["completed"]:
+        progress["status"] = COMPLETE
+        return progress
+
+    sizer = sizer or ChunkSizer()
+    # Every chunk moves the checkpoint or raises, and the last one, which
+    # may be empty, completes the load.
+    while True:
+        chunk_bytes = sizer.size(
+            deadline.remaining() if deadline is not None else math.inf,
+        )
+        if chunk_bytes == 0:
+            # Leave the next chunk to an invocation that has time for it.
+            return progress
+        start = time.monotonic()
+        end = min(byte_offset + chunk_bytes, object_bytes)
+        reader = None
+        try:
+            with metrics.phase("copy"):
+                if deadline is not None:
+                    deadline.apply_statement_timeout(conn)
+                checkpoints.claim(conn, source, etag, byte_offset)
+                rows, sent_bytes = 0, 0
+                if object_bytes:
+                    body = s3.get_object(
+                        Bucket=source["bucket"],
+                        Key=source["key"],
+                        Range=f"bytes={byte_offset}-{end - 1}",
+                        IfMatch=etag,
+                    )["Body"]
+                    reader = RecordReader(
+                        body.iter_chunks(read_bytes),
+                        source["format"],
+                        at_end=end == object_bytes,
+                    )
+                    with conn.cursor() as cur:
+                        cur.copy_expert(
+                            copy_statement(
+                                conn,
+                                source["table"],
+                                source["columns"],
+                                source["format"],
+                                source["header"] and byte_offset == 0,
+                                source["delimiter"],
+                            ),
+                            reader,
+                            size=read_bytes,
+                        )
+                        rows = cur.rowcount
+                    sent_bytes = reader.sent_bytes
+                    if sent_bytes == 0 and end < object_bytes:
+                        if chunk_bytes < sizer.chunk_bytes:
+                            # A chunk shrunk to the time left may hold no
+                            # whole record; a later invocation has more.
+                            conn.rollback()
+                            return progress
+                        raise ValueError(
+                            f"the record at byte {byte_offset} is longer than the "
+                            f"{chunk_bytes} byte chunk size",
+                        )
+                completed = byte_offset + sent_bytes == object_bytes
+                checkpoints.advance(conn, source, byte_offset + sent_bytes, rows, completed)
+            conn.commit()
+        except (psycopg2.extensions.QueryCanceledError, DeadlineExceeded):
+            # Cut short by the deadline; the checkpoint still points at the
+            # start of the chunk. Later chunks are sized down.
+            conn.rollback()
+            if reader is not None:
+                sizer.record_cut_short(reader.sent_bytes, time.monotonic() - start)
+            return progress
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+
+        sizer.record(sent_bytes, time.monotonic() - start)
+        byte_offset += sent_bytes
+        progress["byte_offset"] = byte_offset
+        progress["row_count"] += rows
+        progress["rows_loaded"] += rows
+        progress["chunks"] += 1
+        if completed:
+            progress["status"] = COMPLETE
+            return progress
@@ -0,0 +1,198 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+
+import psycopg2
+import psycopg2.errors
+from batch import MAX_ROUND_TRIP_BYTES
+from batch import TIMEOUT_PREFIX_BYTES
+from defaults import UPDATE
+from psycopg2 import sql
+from psycopg2.extras import Json
+
+SAVEPOINT = b"savepoint coalesce"
+RELEASE = b"release savepoint coalesce"
+ROLLBACK = b"rollback to savepoint coalesce; release savepoint coalesce"
+# Room in each statement for the savepoint commands around it.
+SAVEPOINT_BYTES = len(SAVEPOINT) + len(RELEASE) + 4
+
+
+def _values(row, columns):
+    return tuple(
+        Json(row[column]) if isinstance(row[column], (dict, list)) else row[column]
+        for column in columns
+    )
+
+
+def _key_value(value):
+    # JSON numbers that are equal as key values, such as 1 and 1.0, merge.
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value, sort_keys=True)
+
+
+def coalesce_records(records, tables):
+    """Groups the rows carried by SQS records into one list per table and
+    column set. Returns the groups and the IDs of unusable messages.
+
+    Message bodies are {"table": ..., "row": {column: value}} objects naming
+    one of `tables`. For an UPDATE table, the rows of a key are merged in
+    message order, later values winning, into a single row that has the
+    effect of upserting them one after another; the messages it was merged
+    from share its outcome.
+    """
+    groups, upserts, failed = {}, {}, []
+    for record in records:
+        message_id = record["messageId"]
+        try:
+            body = json.loads(record["body"])
+            table = tables[body["table"]]
+            row = body["row"]
+            if not row or not isinstance(row, dict):
+                raise ValueError("row must be a non-empty object")
+            key = tuple(_key_value(row[column]) for column in table.key)
+        except (ValueError, KeyError, TypeError):
+            failed.append(message_id)
+            continue
+
+        if table.on_conflict == UPDATE:
+            # Moved to the end: rows the database still sees as one key,
+            # such as "1" and 1 for an integer column, are written in the
+            # order of their last messages.
+            message_ids, merged = upserts.pop((table.name, key), ([], {}))
+            upserts[(table.name, key)] = (message_ids + [message_id], {**merged, **row})
+        else:
+            columns = tuple(sorted(row))
+            groups.setdefault((table.name, columns), []).append(
+                ([message_id], _values(row, columns)),
+            )
+
+    # Grouped once merged, as the merged row of a key may have more columns
+    # than any one of its messages.
+    for (table_name, _), (message_ids, row) in upserts.items():
+        columns = tuple(sorted(row))
+        groups.setdefault((table_name, columns), []).append(
+            (message_ids, _values(row, columns)),
+        )
+    return groups, failed
+
+
+def insert_statement(conn, table, columns):
+    """Returns the INSERT ... VALUES text a group's rows are appended to,
+    and the ON CONFLICT clause that follows them."""
+    target = sql.Identifier(*table.name.split(".", 1))
+    column_list = sql.SQL(", ").join(map(sql.Identifier, columns))
+    updates = [column for column in columns if column not in table.key]
+    if table.on_conflict == UPDATE and updates:
+        conflict = sql.SQL(" on conflict ({}) do update set {}").format(
+            sql.SQL(", ").join(map(sql.Identifier, table.key)),
+            sql.SQL(", ").join(
+                sql.SQL("{0} = excluded.{0}").format(sql.Identifier(column))
+                for column in updates
+            ),
+        )
+    elif table.key:
+        conflict = sql.SQL(" on conflict ({}) do nothing").format(
+            sql.SQL(", ").join(map(sql.Identifier, table.key)),
+        )
+    else:
+        conflict = sql.SQL(" on conflict do nothing")
+    prefix = sql.SQL("insert into {} ({}) values ").format(target, column_list)
+    return prefix.as_string(conn).encode(), conflict.as_string(conn).encode()
+
+
+def _pages(cur, entries, columns, fixed_bytes):
+    """Splits entries into pages whose statements stay below the size at
+    which RDS Proxy pins the session; a larger row gets a page of its own."""
+    template = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    page, page_bytes = [], fixed_bytes
+    for message_ids, values in entries:
+        row = cur.mogrify(template, values)
+        if page and page_bytes + len(row) + 1 > MAX_ROUND_TRIP_BYTES:
+            yield page
+            page, page_bytes = [], fixed_bytes
+        page.append((message_ids, row))
+        page_bytes += len(row) + 1
+    if page:
+        yield page
+
+
+class CoalescedWriter:
+    """Writes coalesced groups as multi-row INSERT ... ON CONFLICT
+    statements, all in the caller's transaction.
+
+    Every statement runs inside a savepoint. When one fails on the data of
+    a row, it is rolled back and its rows are bisected until the rows that
+    fail are isolated; their messages are reported as failed and the others
+    still written.
+    """
+
+    def __init__(self, conn, deadline=None):
+        self.conn = conn
+        self.deadline = deadline
+        self.stats = {"rows": 0, "statements": 0, "bisections": 0}
+        self.errors = {}
+
+    def _execute(self, cur, prefix, rows, conflict):
+        statement = b"".join(
+            [SAVEPOINT, b";\n", prefix, b",".join(rows), conflict, b";\n", RELEASE],
+        )
+        timeout_sql = (
+            self.deadline.statement_timeout_sql() if self.deadline is not None else None
+        )
+        if timeout_sql is not None:
+            # Travels in the same round trip as the statement it limits.
+            statement = timeout_sql.encode() + b";\n" + statement
+        cur.execute(statement)
+        self.stats["statements"] += 1
+
+    def _write_page(self, cur, prefix, page, conflict):
+        """Returns the message IDs of the rows of a page that failed."""
+        try:
+            self._execute(cur, prefix, [row for _, row in page], conflict)
+        except (
+            psycopg2.DataError,
+            psycopg2.IntegrityError,
+            psycopg2.errors.CardinalityViolation,
+        ) as e:
+            # Errors that depend on the values of a row. ON CONFLICT DO
+            # UPDATE cannot update a row twice, which two keys that are only
+            # equal in the database cause.
+            if self.conn.closed:
+                raise
+            cur.execute(ROLLBACK)
+            if len(page) == 1:
+                self.errors[type(e).__name__] = str(e).strip().splitlines()[0]
+                return page[0][0]
+            self.stats["bisections"] += 1
+            middle = len(page) // 2
+            failed = self._write_page(cur, prefix, page[:middle], conflict)
+            return failed + self._write_page(cur, prefix, page[middle:], conflict)
+        except psycopg2.ProgrammingError as e:
+            # An unknown column or a missing privilege fails every row alike.
+            if self.conn.closed:
+                raise
+            cur.execute(ROLLBACK)
+            self.errors[type(e).__name__] = str(e).strip().splitlines()[0]
+            return [message_id for message_ids, _ in page for message_id in message_ids]
+        self.stats["rows"] += len(page)
+        return []
+
+    def write(self, groups, tables):
+        """Writes every group and returns the IDs of the messages whose rows
+        failed. The caller commits."""
+        failed = []
+        with self.conn.cursor() as cur:
+            for (table_name, columns), entries in groups.items():
+                prefix, conflict = insert_statement(
+                    self.conn,
+                    tables[table_name],
+                    columns,
+                )
+                fixed_bytes = (
+                    len(prefix) + len(conflict) + SAVEPOINT_BYTES + TIMEOUT_PREFIX_BYTES
+                )
+                for page in _pages(cur, entries, columns, fixed_bytes):
+                    failed.extend(self._write_page(cur, prefix, page, conflict))
+        return failed
@@ -0,0 +1,357 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+from dataclasses import dataclass
+from dataclasses import field
+
+from defaults import DEFAULT_CHECKPOINT_TABLE
+from defaults import DEFAULT_CHUNK_BYTES
+from defaults import DEFAULT_CONNECT_ATTEMPTS
+from defaults import DEFAULT_CONNECT_TIMEOUT_SECONDS
+from defaults import DEFAULT_DEADLINE_MARGIN_SECONDS
+from defaults import DEFAULT_READ_BYTES
+from defaults import MIN_CONNECT_TIMEOUT_SECONDS
+from defaults import NOTHING
+from defaults import ON_CONFLICT
+from defaults import UPDATE
+from metrics import EMF
+from metrics import OFF
+from pagination import DEFAULT_PAGE_ROWS
+from pagination import DEFAULT_RESPONSE_BUDGET_BYTES
+from pagination import MAX_RESPONSE_BUDGET_BYTES
+from pinning import POLICIES
+from pinning import REWRITE
+from query import DEFAULT_ITERSIZE
+from result_cache import DEFAULT_MAX_BYTES
+from result_cache import DEFAULT_TTL_SECONDS
+from result_cache import LOCAL
+from result_cache import OFF as RESULT_CACHE_OFF
+from tokens import TOKEN_LIFETIME
+from tokens import TOKEN_MAX_AGE
+
+REQUIRED_VARIABLES = (
+    "DATABASE_ACCOUNT_IAM_ROLE",
+    "RDS_PROXY_APPLICATION_ENDPOINT",
+    "DB_USERNAME",
+    "DBNAME",
+    "AWS_REGION",
+)
+
+
+DEFAULT_TARGET = "default"
+
+TARGET_KEYS = ("role_arn", "endpoint", "user", "database")
+
+
+@dataclass(frozen=True)
+class DatabaseTarget:
+    name: str
+    role_arn: str
+    endpoint: str
+    user: str
+    database: str
+    region: str
+    port: int = 5432
+    # Without a read-only endpoint every transaction goes to the read/write one.
+    read_only_endpoint: str = ""
+
+
+@dataclass(frozen=True)
+class WriterTable:
+    name: str
+    # Conflict target; rows of an "update" table are merged on it.
+    key: tuple = ()
+    on_conflict: str = NOTHING
+
+
+@dataclass(frozen=True)
+class Config:
+    region: str
+    sslmode: str = "require"
+    deadline_margin_ms: int = int(DEFAULT_DEADLINE_MARGIN_SECONDS * 1000)
+    connect_timeout_seconds: int = DEFAULT_CONNECT_TIMEOUT_SECONDS
+    connect_attempts: int = DEFAULT_CONNECT_ATTEMPTS
+    connect_hedge: bool = False
+    # 0 turns the circuit breaker off.
+    circuit_breaker_failures: int = 5
+    circuit_breaker_reset_seconds: int = 30
+    token_max_age_seconds: int = int(TOKEN_MAX_AGE.total_seconds())
+    query_itersize: int = DEFAULT_ITERSIZE
+    log_chunk_rows: int = 500
+    async_pool_size: int = 4
+    read_your_writes_seconds: int = 5
+    metrics_mode: str = EMF
+    metrics_namespace: str = "ConnectionTest"
+    trace_subsegments: bool = True
+    pinning_policy: str = REWRITE
+    query_cursor: str = "client"
+    page_rows: int = DEFAULT_PAGE_ROWS
+    response_budget_bytes: int = DEFAULT_RESPONSE_BUDGET_BYTES
+    result_cache: str = RESULT_CACHE_OFF
+    result_cache_max_bytes: int = DEFAULT_MAX_BYTES
+    result_cache_ttl_seconds: int = DEFAULT_TTL_SECONDS
+    broker_max_entries: int = 32
+    broker_idle_seconds: int = 900
+    # The bucket the ingest function loads from unless an event names one.
+    ingest_bucket: str = ""
+    ingest_chunk_bytes: int = DEFAULT_CHUNK_BYTES
+    ingest_read_bytes: int = DEFAULT_READ_BYTES
+    ingest_checkpoint_table: str = DEFAULT_CHECKPOINT_TABLE
+    # Table name to WriterTable: the tables the queue writer may insert into.
+    writer_tables: dict = field(default_factory=dict)
+    # Logical database name to DatabaseTarget, including DEFAULT_TARGET.
+    targets: dict = field(default_factory=dict)
+
+
+def _int_variable(environ, name, default, minimum, maximum):
+    value = environ.get(name, "")
+    if value == "":
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}") from None
+    if not minimum <= parsed <= maximum:
+        raise ValueError(f"{name} must be between {minimum} and {maximum}")
+    return parsed
+
+
+def _choice_variable(environ, name, default, choices):
+    value = environ.get(name) or default
+    if value not in choices:
+        raise ValueError(f"{name} must be one of {', '.join(choices)}, got {value!r}")
+    return value
+
+
+def _result_cache_variable(environ):
+    value = environ.get("RESULT_CACHE") or RESULT_CACHE_OFF
+    if value not in (RESULT_CACHE_OFF, LOCAL) and ":" not in value:
+        raise ValueError(
+            f"RESULT_CACHE must be {RESULT_CACHE_OFF}, {LOCAL} or a "
+            f"module:factory backend, got {value!r}",
+        )
+    return value
+
+
+def _targets(environ, default):
+    """Parses DATABASE_TARGETS, a JSON object mapping logical database names
+    to {"role_arn", "endpoint", "user", "database"} and optionally "port",
+    "region" and "read_only_endpoint"."""
+    try:
+        raw_targets = json.loads(environ.get("DATABASE_TARGETS") or "{}")
+    except ValueError as e:
+        raise ValueError(f"DATABASE_TARGETS is not valid JSON: {e}") from None
+
+    targets = {DEFAULT_TARGET: default}
+    for name, raw in raw_targets.items():
+        missing = [key for key in TARGET_KEYS if not raw.get(key)]
+        if missing:
+            raise ValueError(
+                f"DATABASE_TARGETS[{name!r}] is missing {', '.join(missing)}",
+            )
+        targets[name] = DatabaseTarget(
+            name=name,
+            role_arn=raw["role_arn"],
+            endpoint=raw["endpoint"],
+            user=raw["user"],
+            database=raw["database"],
+            region=raw.get("region", default.region),
+            port=int(raw.get("port", default.port)),
+            read_only_endpoint=raw.get("read_only_endpoint", ""),
+        )
+    return targets
+
+
+def _writer_tables(environ):
+    """Parses WRITER_TABLES, a JSON object mapping table names (optionally
+    schema-qualified) to {"key": [columns], "on_conflict": "nothing" or
+    "update"}."""
+    try:
+        raw_tables = json.loads(environ.get("WRITER_TABLES") or "{}")
+    except ValueError as e:
+        raise ValueError(f"WRITER_TABLES is not valid JSON: {e}") from None
+
+    tables = {}
+    for name, raw in raw_tables.items():
+        key = tuple(raw.get("key") or ())
+        on_conflict = raw.get("on_conflict", UPDATE if key else NOTHING)
+        if on_conflict not in ON_CONFLICT:
+            raise ValueError(
+                f"WRITER_TABLES[{name!r}] on_conflict must be one of "
+                f"{', '.join(ON_CONFLICT)}, got {on_conflict!r}",
+            )
+        if on_conflict == UPDATE and not key:
+            raise ValueError(f"WRITER_TABLES[{name!r}] needs a key to update on")
+        tables[name] = WriterTable(name=name, key=key, on_conflict=on_conflict)
+    return tables
+
+
+def load_config(environ):
+    """Parses and validates the function configuration once, during init."""
+    missing = [name for name in REQUIRED_VARIABLES if not environ.get(name)]
+    if missing:
+        raise ValueError(
+            f"Missing required environment variables: {', '.join(missing)}",
+        )
+
+    port = _int_variable(environ, "DB_PORT", 5432, 1, 65535)
+    default_target = DatabaseTarget(
+        name=DEFAULT_TARGET,
+        role_arn=environ["DATABASE_ACCOUNT_IAM_ROLE"],
+        endpoint=environ["RDS_PROXY_APPLICATION_ENDPOINT"],
+        user=environ["DB_USERNAME"],
+        database=environ["DBNAME"],
+        region=environ["AWS_REGION"],
+        port=port,
+        read_only_endpoint=environ.get("RDS_PROXY_READ_ONLY_ENDPOINT", ""),
+    )
+
+    return Config(
+        region=environ["AWS_REGION"],
+        sslmode=environ.get("DB_SSLMODE") or "require",
+        deadline_margin_ms=_int_variable(
+            environ,
+            "DEADLINE_MARGIN_MS",
+            int(DEFAULT_DEADLINE_MARGIN_SECONDS * 1000),
+            0,
+            60_000,
+        ),
+        connect_timeout_seconds=_int_variable(
+            environ,
+            "CONNECT_TIMEOUT_SECONDS",
+            DEFAULT_CONNECT_TIMEOUT_SECONDS,
+            MIN_CONNECT_TIMEOUT_SECONDS,
+            60,
+        ),
+        connect_attempts=_int_variable(
+            environ,
+            "CONNECT_ATTEMPTS",
+            DEFAULT_CONNECT_ATTEMPTS,
+            1,
+            10,
+        ),
+        connect_hedge=_choice_variable(
+            environ,
+            "CONNECT_HEDGE",
+            "false",
+            ("true", "false"),
+        )
+        == "true",
+        circuit_breaker_failures=_int_variable(
+            environ,
+            "CIRCUIT_BREAKER_FAILURES",
+            5,
+            0,
+            1000,
+        ),
+        circuit_breaker_reset_seconds=_int_variable(
+            environ,
+            "CIRCUIT_BREAKER_RESET_SECONDS",
+            30,
+            1,
+            3600,
+        ),
+        token_max_age_seconds=_int_variable(
+            environ,
+            "TOKEN_MAX_AGE_SECONDS",
+            int(TOKEN_MAX_AGE.total_seconds()),
+            1,
+            int(TOKEN_LIFETIME.total_seconds()),
+        ),
+        query_itersize=_int_variable(
+            environ,
+            "QUERY_ITERSIZE",
+            DEFAULT_ITERSIZE,
+            1,
+            1_000_000,
+        ),
+        log_chunk_rows=_int_variable(environ, "LOG_CHUNK_ROWS", 500, 1, 100_000),
+        async_pool_size=_int_variable(environ, "ASYNC_POOL_SIZE", 4, 1, 64),
+        read_your_writes_seconds=_int_variable(
+            environ,
+            "READ_YOUR_WRITES_SECONDS",
+            5,
+            0,
+            3600,
+        ),
+        metrics_mode=_choice_variable(environ, "METRICS_MODE", EMF, (EMF, OFF)),
+        metrics_namespace=environ.get("METRICS_NAMESPACE") or "ConnectionTest",
+        trace_subsegments=_choice_variable(
+            environ,
+            "TRACE_SUBSEGMENTS",
+            "true",
+            ("true", "false"),
+        )
+        == "true",
+        pinning_policy=_choice_variable(environ, "PINNING_POLICY", REWRITE, POLICIES),
+        query_cursor=_choice_variable(
+            environ,
+            "QUERY_CURSOR",
+            "client",
+            ("server", "client"),
+        ),
+        page_rows=_int_variable(
+            environ,
+            "PAGE_ROWS",
+            DEFAULT_PAGE_ROWS,
+            1,
+            100_000,
+        ),
+        response_budget_bytes=_int_variable(
+            environ,
+            "RESPONSE_BUDGET_BYTES",
+            DEFAULT_RESPONSE_BUDGET_BYTES,
+            1024,
+            MAX_RESPONSE_BUDGET_BYTES,
+        ),
+        result_cache=_result_cache_variable(environ),
+        result_cache_max_bytes=_int_variable(
+            environ,
+            "RESULT_CACHE_MAX_BYTES",
+            DEFAULT_MAX_BYTES,
+            1024,
+            1024**3,
+        ),
+        result_cache_ttl_seconds=_int_variable(
+            environ,
+            "RESULT_CACHE_TTL_SECONDS",
+            DEFAULT_TTL_SECONDS,
+            0,
+            86_400,
+        ),
+        broker_max_entries=_int_variable(
+            environ,
+            "BROKER_MAX_ENTRIES",
+            32,
+            1,
+            10_000,
+        ),
+        broker_idle_seconds=_int_variable(
+            environ,
+            "BROKER_IDLE_SECONDS",
+            900,
+            1,
+            86_400,
+        ),
+        ingest_bucket=environ.get("INGEST_BUCKET", ""),
+        ingest_chunk_bytes=_int_variable(
+            environ,
+            "INGEST_CHUNK_BYTES",
+            DEFAULT_CHUNK_BYTES,
+            1024,
+            1024**3,
+        ),
+        ingest_read_bytes=_int_variable(
+            environ,
+            "INGEST_READ_BYTES",
+            DEFAULT_READ_BYTES,
+            1024,
+            64 * 1024 * 1024,
+        ),
+        ingest_checkpoint_table=(
+            environ.get("INGEST_CHECKPOINT_TABLE") or DEFAULT_CHECKPOINT_TABLE
+        ),
+        writer_tables=_writer_tables(environ),
+        targets=_targets(environ, default_target),
+    )
@@ -0,0 +1,214 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from defaults import DEFAULT_CONNECT_TIMEOUT_SECONDS
+from defaults import MIN_CONNECT_TIMEOUT_SECONDS
+from metrics import NO_OP_RECORDER
+from resilience import AUTH
+from resilience import BORROW_TIMEOUT
+from resilience import classify
+from resilience import DeadlineExceeded
+from resilience import RetryPolicy
+from resilience import TRANSIENT
+
+# A reused connection is only probed with a round trip after sitting idle
+# this long; RDS Proxy closes idle client connections after idle_client_timeout.
+PING_AFTER_SECONDS = 60
+
+
+class ConnectionHolder:
+    """Keeps one psycopg2 connection per container and hands it out to
+    successive invocations.
+
+    Connects are retried per `retry_policy` for as long as the `deadline`
+    leaves time for another attempt, optionally hedged and behind a circuit
+    breaker.
+    """
+
+    def __init__(
+        self,
+        password_provider,
+        on_auth_failure=None,
+        metrics=NO_OP_RECORDER,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        retry_policy=None,
+        breaker=None,
+        hedge=None,
+        deadline=None,
+        **connect_kwargs,
+    ):
+        self.password_provider = password_provider
+        self.on_auth_failure = on_auth_failure
+        self.metrics = metrics
+        self.connect_timeout = connect_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker
+        self.hedge = hedge
+        self.deadline = deadline
+        self.connect_kwargs = connect_kwargs
+        self.stats = {"reuses": 0, "connects": 0, "reconnects": 0, "retries": 0}
+
+        self._conn = None
+        self._last_used = 0.0
+        self._discard = False
+
+    def _remaining(self):
+        return self.deadline.remaining() if self.deadline is not None else math.inf
+
+    def _connect_once(self):
+        remaining = self._remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("no time left to connect before the deadline")
+        # libpq only takes whole seconds; never wait past the deadline.
+        timeout = self.connect_timeout
+        if remaining < timeout:
+            timeout = max(MIN_CONNECT_TIMEOUT_SECONDS, math.floor(remaining))
+        # Sign in this thread; a hedge reuses the same token.
+        password = self.password_provider()
+
+        def connect():
+            return psycopg2.connect(
+                password=password,
+                connect_timeout=timeout,
+                **self.connect_kwargs,
+            )
+
+        if self.hedge is not None:
+            return self.hedge.connect(connect)
+        return connect()
+
+    def _connect(self):
+        retry = 0
+        refreshed_token = False
+        while True:
+            if self.breaker is not None:
+                self.breaker.check()
+            try:
+                conn = self._connect_once()
+            except Exception as e:
+                kind = classify(e)
+                # STS failures say nothing about the proxy endpoint.
+                if (
+                    self.breaker is not None
+                    and isinstance(e, psycopg2.OperationalError)
+                    and kind in (BORROW_TIMEOUT, TRANSIENT)
+                ):
+                    self.breaker.record_failure()
+                if kind is None:
+                    raise
+                if kind == AUTH:
+                    # The proxy rejected a cached token; sign a fresh one
+                    # and retry at once, but only once. This retry does not
+                    # count against the attempts of the retry policy.
+                    if refreshed_token or self.on_auth_failure is None:
+                        raise
+                    self.on_auth_failure()
+                    refreshed_token = True
+                    delay = 0.0
+                elif retry + 1 >= self.retry_policy.attempts:
+                    raise
+                else:
+                    delay = self.retry_policy.delay(retry)
+                    retry += 1
+                # Give up while another attempt can still finish in time.
+                if delay + MIN_CONNECT_TIMEOUT_SECONDS > self._remaining():
+                    raise
+                self.stats["retries"] += 1
+                time.sleep(delay)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return conn
+
+    @property
+    def summary(self):
+        summary = dict(self.stats)
+        if self.breaker is not None:
+            summary.update(self.breaker.stats, circuit=self.breaker.state)
+        if self.hedge is not None:
+            summary.update(self.hedge.stats)
+        return summary
+
+    def _is_alive(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used < PING_AFTER_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("select 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def acquire(self):
+        if self._conn is not None:
+            if self._is_alive(self._conn):
+                self.stats["reuses"] += 1
+                return self._conn
+            self.close()
+            self.stats["reconnects"] += 1
+
+        self._conn = self._connect()
+        self.stats["connects"] += 1
+        return self._conn
+
+    def discard_on_release(self):
+        """Closes the connection on release instead of keeping it warm, e.g.
+        because the session got pinned and only a disconnect unpins it."""
+        self._discard = True
+
+    def release(self):
+        conn = self._conn
+        if conn is None or conn.closed or self._discard:
+            self.close()
+            return
+
+        # End any open transaction so the proxy can return the backend
+        # connection to its pool between invocations.
+        status = conn.info.transaction_status
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            self.close()
+            return
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self.close()
+                return
+
+        self._last_used = time.monotonic()
+
+    @contextmanager
+    def connection(self):
+        with self.metrics.phase("connect") as phase:
+            connects = self.stats["connects"]
+            conn = self.acquire()
+            phase.dimensions["Reconnect"] = self.stats["connects"] > connects
+        try:
+            yield conn
+        except psycopg2.extensions.QueryCanceledError:
+            # A statement or deadline timeout; the connection is still usable.
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The proxy dropped the connection; reconnect on the next acquire.
+            self.close()
+            raise
+        finally:
+            self.release()
+
+    def close(self):
+        self._discard = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+        self._conn = None
@@ -1,61 +1,344 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import os
+from contextlib import ExitStack
 
-import boto3
-import psycopg2
+from batch import execute_batch
+from batch import guard_statements
+from batch import normalize_statements
+from config import DEFAULT_TARGET
+from pagination import dumps
+from pagination import encode
+from pagination import keyset_query
+from pagination import page_options
+from pagination import read_page
+from pinning import PinningError
+from pinning import SERVER_SIDE_CURSOR
+from psycopg2.extensions import QueryCanceledError
+from query import chunked
+from query import normalize_queries
+from query import stream_rows
+from resilience import CircuitOpenError
+from resilience import DeadlineExceeded
+from result_cache import cache_ttls
+from routing import READ_ONLY
+from routing import READ_WRITE
+from routing import resolve_route
+from runtime import BROKER
+from runtime import cache_stats
+from runtime import CONFIG
+from runtime import DEADLINE
+from runtime import METRICS
+from runtime import PINNING
+from runtime import RESULT_CACHE
+from runtime import router
+from warmup import register
 
+# Init stage
+
+
+def before_snapshot():
+    # Builds the default target's sts client and router without fetching
+    # credentials or connecting.
+    BROKER.caches(DEFAULT_TARGET)
+    router(DEFAULT_TARGET)
+
+
+def after_restore():
+    DEADLINE.reset()
+    with router(DEFAULT_TARGET).holders[READ_WRITE].connection():
+        pass
+    METRICS.flush()
+
+
+register(before_snapshot, after_restore)
+
+
+def _stats(target_router):
+    return {
+        **cache_stats(),
+        "routing": target_router.stats,
+        "pinned": PINNING.pinned,
+        "pinning_reasons": PINNING.reasons,
+        "connections": {
+            route: holder.summary for route, holder in target_router.holders.items()
+        },
+        "result_cache": RESULT_CACHE.summary if RESULT_CACHE is not None else None,
+    }
+
+
+# Per-request stage
+
+
+def _response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": dumps(body),
+    }
 
-def handler(event, context):
 
-    DATABASE_ACCOUNT_IAM_ROLE = os.environ["DATABASE_ACCOUNT_IAM_ROLE"]
-    RDS_PROXY_APPLICATION_ENDPOINT = os.environ["RDS_PROXY_APPLICATION_ENDPOINT"]
-    DB_USERNAME = os.environ["DB_USERNAME"]
-    DBNAME = os.environ["DBNAME"]
-    REGION = os.environ["AWS_REGION"]
-    PORT = "5432"
+def _invalidate_results(database, statements):
+    if RESULT_CACHE is not None:
+        RESULT_CACHE.invalidate_writes(database, statements)
 
-    sts_connection = boto3.client("sts")
 
-    database_account_session = sts_connection.assume_role(
-        RoleArn=DATABASE_ACCOUNT_IAM_ROLE,
-        RoleSessionName="cross_acct_connection",
+def batch_handler(event, target_router, database):
+    statements = normalize_statements(event)
+    transaction = event.get("transaction", True)
+    rejected = guard_statements(statements, PINNING, transaction)
+    if rejected is not None:
+        return _response(400, {"results": rejected, "pinned": False})
+
+    route = resolve_route(
+        [statement["sql"] for statement in statements],
+        event.get("route"),
     )
 
-    ACCESS_KEY = database_account_session["Credentials"]["AccessKeyId"]
-    SECRET_KEY = database_account_session["Credentials"]["SecretAccessKey"]
-    SESSION_TOKEN = database_account_session["Credentials"]["SessionToken"]
+    try:
+        with target_router.connection(route) as conn, DEADLINE.cancel_on_expiry(conn):
+            with METRICS.phase("batch") as phase:
+                phase.dimensions["Route"] = route
+                results = execute_batch(
+                    conn,
+                    statements,
+                    transaction=transaction,
+                    deadline=DEADLINE,
+                )
+                phase.dimensions["Pinned"] = PINNING.pinned
+            if PINNING.pinned:
+                target_router.discard_current()
+    finally:
+        # Also after a failure: statements outside a transaction may have
+        # committed before it.
+        _invalidate_results(database, [statement["sql"] for statement in statements])
+
+    print(_stats(target_router))
 
-    client = boto3.client(
-        "rds",
-        aws_access_key_id=ACCESS_KEY,
-        aws_secret_access_key=SECRET_KEY,
-        aws_session_token=SESSION_TOKEN,
+    timed_out = any(
+        "timeout" in (result["status"], result.get("cause")) for result in results
+    )
+    return _response(
+        504 if timed_out else 200,
+        {"results": results, "pinned": PINNING.pinned},
     )
 
-    token = client.generate_db_auth_token(
-        DBHostname=RDS_PROXY_APPLICATION_ENDPOINT,
-        Port=int(PORT),
-        DBUsername=DB_USERNAME,
-        Region=REGION,
+
+def _log_rows(rows, collect_bytes):
+    """Logs rows in chunks and returns their count, plus the rows themselves
+    if `collect_bytes` is set and their encoded size stays within it."""
+    row_count, collected_bytes = 0, 0
+    collected = [] if collect_bytes is not None else None
+    for chunk in chunked(rows, CONFIG.log_chunk_rows):
+        print(chunk)
+        row_count += len(chunk)
+        if collected is not None:
+            collected_bytes += len(encode(chunk))
+            if collected_bytes > collect_bytes:
+                collected = None
+            else:
+                collected.extend(chunk)
+    return row_count, collected
+
+
+def _log_query(conn, database, sql, params, ttl, server_side):
+    rows = stream_rows(
+        conn,
+        sql,
+        params,
+        itersize=CONFIG.query_itersize,
+        server_side=server_side,
+        deadline=DEADLINE,
+    )
+    row_count, collected = _log_rows(
+        rows,
+        RESULT_CACHE.max_entry_bytes if ttl else None,
     )
+    if ttl and collected is not None:
+        RESULT_CACHE.put(database, sql, params, {"rows": collected}, ttl)
+    return row_count
 
-    conn = psycopg2.connect(
-        host=RDS_PROXY_APPLICATION_ENDPOINT,
-        port=PORT,
-        database=DBNAME,
-        user=DB_USERNAME,
-        password=token,
-        sslmode="require",
+
+def _page(conn, database, sql, params, options, budget_bytes, ttl, server_side):
+    result, used_bytes = read_page(
+        conn,
+        sql,
+        params,
+        options,
+        budget_bytes,
+        itersize=CONFIG.query_itersize,
+        server_side=server_side,
+        deadline=DEADLINE,
     )
+    # A page the budget cut short holds fewer rows than its limit asks for,
+    # and depends on what the queries before it used up.
+    if (
+        ttl
+        and result["status"] == "ok"
+        and (not result["truncated"] or result["row_count"] == options["limit"])
+    ):
+        RESULT_CACHE.put(
+            database,
+            sql,
+            params,
+            {"result": result, "used_bytes": used_bytes},
+            ttl,
+            options=options,
+        )
+    return result, used_bytes
+
 
-    cur = conn.cursor()
-    cur.execute("""select * from information_schema.tables""")
-    print(cur.fetchall())
+def query_handler(event, target_router, database):
+    row_counts = []
+    results = []
+    server_side = CONFIG.query_cursor == "server"
+    # "rows" returns the results as column-wise pages; by default they are
+    # only logged.
+    return_rows = (event or {}).get("response") == "rows"
+    try:
+        # Queries run inside a transaction, which SET LOCAL rewrites need.
+        queries = [
+            (PINNING.check(sql, in_transaction=True), params)
+            for sql, params in normalize_queries(event)
+        ]
+        ttls = cache_ttls(
+            event,
+            RESULT_CACHE.default_ttl_seconds if RESULT_CACHE is not None else 0,
+        )
+        if return_rows:
+            pages = page_options(event, CONFIG.page_rows)
+            queries = [
+                keyset_query(sql, params, options)
+                for (sql, params), options in zip(queries, pages)
+            ]
+    except (PinningError, ValueError) as e:
+        return _response(400, {"error": str(e)})
 
+    route = resolve_route([sql for sql, _ in queries], (event or {}).get("route"))
+    budget_bytes = CONFIG.response_budget_bytes
+
+    # The connection is only opened for the first query the result cache
+    # cannot answer.
+    timed_out = None
+    with ExitStack() as stack:
+        conn = None
+        # Statements run one after another on the single container connection.
+        for index, (sql, params) in enumerate(queries):
+            # Only read-only transactions use the cache; an explicit
+            # read_write route asks for the writer's current data.
+            cacheable = RESULT_CACHE is not None and route == READ_ONLY
+            ttl = ttls[index] if cacheable else 0
+            try:
+                with METRICS.phase("query") as phase:
+                    phase.dimensions["Route"] = route
+                    options = pages[index] if return_rows else None
+                    cached = (
+                        RESULT_CACHE.get(database, sql, params, options)
+                        if ttl
+                        else None
+                    )
+                    if return_rows and cached and cached["used_bytes"] > budget_bytes:
+                        # A page cached under a larger budget is read again.
+                        cached = None
+                    phase.dimensions["CacheHit"] = cached is not None
+                    if cached is None and conn is None:
+                        conn = stack.enter_context(target_router.connection(route))
+                        stack.enter_context(DEADLINE.cancel_on_expiry(conn))
+                        if server_side:
+                            # RDS Proxy pins at the DECLARE of a named cursor,
+                            # until the client connection closes.
+                            PINNING.record(SERVER_SIDE_CURSOR)
+                    phase.dimensions["Pinned"] = PINNING.pinned
+
+                    if not return_rows:
+                        if cached is not None:
+                            row_count, _ = _log_rows(cached["rows"], None)
+                        else:
+                            row_count = _log_query(
+                                conn,
+                                database,
+                                sql,
+                                params,
+                                ttl,
+                                server_side,
+                            )
+                        row_counts.append(row_count)
+                        continue
+                    if cached is not None:
+                        result, used_bytes = cached["result"], cached["used_bytes"]
+                    else:
+                        result, used_bytes = _page(
+                            conn,
+                            database,
+                            sql,
+                            params,
+                            options,
+                            budget_bytes,
+                            ttl,
+                            server_side,
+                        )
+                    budget_bytes -= used_bytes
+                    results.append(result)
+                    row_counts.append(result.get("row_count", 0))
+            except (QueryCanceledError, DeadlineExceeded) as e:
+                # The invocation deadline, through statement_timeout or a
+                # cancel, ended the query; answer with what completed.
+                timed_out = str(e).strip()
+                break
+        if PINNING.pinned:
+            # Only a disconnect ends a pinned proxy session.
+            target_router.discard_current()
+    # Decided per statement rather than by route: a write sent with an
+    # explicit read_only route drops the results of its tables too.
+    _invalidate_results(database, [sql for sql, _ in queries])
+
+    print(
+        {
+            "row_counts": row_counts,
+            **_stats(target_router),
+        },
+    )
+
+    if timed_out is not None:
+        body = {
+            "error": f"deadline exceeded: {timed_out}",
+            "row_counts": row_counts,
+            "pinned": PINNING.pinned,
+        }
+        if return_rows:
+            skipped = len(queries) - len(results) - 1
+            body["results"] = (
+                results
+                + [{"status": "timeout", "error": timed_out}]
+                + [{"status": "skipped"}] * skipped
+            )
+        return _response(504, body)
+    if return_rows:
+        return _response(200, {"results": results, "pinned": PINNING.pinned})
     return {
         "statusCode": 200,
         "headers": {"Content-Type": "application/json"},
         "body": "Database connection was successful!",
     }
+
+
+def handler(event, context):
+
+    PINNING.reset()
+    DEADLINE.reset(context)
+    try:
+        database = (event or {}).get("database", DEFAULT_TARGET)
+        try:
+            target_router = router(database)
+        except KeyError as e:
+            return _response(400, {"error": str(e.args[0])})
+        if event and "statements" in event:
+            return batch_handler(event, target_router, database)
+        return query_handler(event, target_router, database)
+    except CircuitOpenError as e:
+        # Fail fast while the proxy endpoint keeps failing.
+        return _response(503, {"error": str(e)})
+    except DeadlineExceeded as e:
+        return _response(504, {"error": f"deadline exceeded: {e}"})
+    finally:
+        METRICS.flush()
@@ -0,0 +1,234 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import asyncio
+import json
+import math
+import re
+import time
+from functools import partial
+
+import asyncpg
+from config import DEFAULT_TARGET
+from pinning import PinningError
+from query import normalize_queries
+from resilience import DeadlineExceeded
+from routing import is_read_only
+from runtime import auth_token
+from runtime import BROKER
+from runtime import cache_stats
+from runtime import CONFIG
+from runtime import DEADLINE
+from runtime import METRICS
+from runtime import PINNING
+from warmup import register
+
+# Init stage
+
+# One event loop per container, so the pool and its connections survive
+# across warm invocations.
+LOOP = asyncio.new_event_loop()
+POOLS = {}
+# Per target, until when reads stay on the writer after a write, so that
+# later invocations see it despite replica lag, as routing.Router does.
+STICKY_UNTIL = {}
+
+# X-Ray subsegments follow thread-local context, which concurrent
+# coroutines and worker threads do not share; emit metrics only.
+METRICS.subsegments = False
+
+PLACEHOLDER = re.compile(r"%%|%s")
+
+
+def to_asyncpg_placeholders(sql):
+    """Rewrites psycopg2 %s placeholders to asyncpg's positional $n."""
+    counter = iter(range(1, sql.count("%s") + 1))
+    return PLACEHOLDER.sub(
+        lambda match: "%" if match.group() == "%%" else f"${next(counter)}",
+        sql,
+    )
+
+
+async def _password(target, hostname):
+    # Signing may call STS; keep it off the event loop.
+    return await asyncio.to_thread(auth_token, target.name, hostname)
+
+
+async def _pool(target, hostname):
+    # Concurrent queries share one pool creation per endpoint.
+    key = (target.name, hostname)
+    if key not in POOLS:
+        POOLS[key] = asyncio.ensure_future(
+            asyncpg.create_pool(
+                host=hostname,
+                port=target.port,
+                database=target.database,
+                user=target.user,
+                password=partial(_password, target, hostname),
+                ssl=CONFIG.sslmode,
+                timeout=CONFIG.connect_timeout_seconds,
+                min_size=0,
+                max_size=CONFIG.async_pool_size,
+                # Named prepared statements pin RDS Proxy sessions.
+                statement_cache_size=0,
+            ),
+        )
+    try:
+        return await POOLS[key]
+    except Exception:
+        # Let the next invocation retry instead of caching the failure.
+        POOLS.pop(key, None)
+        raise
+
+
+def _endpoint(target, sql, after_write):
+    if (
+        target.read_only_endpoint
+        and is_read_only(sql)
+        and not after_write
+        and time.monotonic() >= STICKY_UNTIL.get(target.name, 0.0)
+    ):
+        return target.read_only_endpoint
+    return target.endpoint
+
+
+async def _run_query(target, sql, params, writes=()):
+    row_count = 0
+    if writes:
+        # Statements after a write wait for it and go to the writer, so that
+        # they see it.
+        await asyncio.gather(*writes, return_exceptions=True)
+    pool = await _pool(target, _endpoint(target, sql, bool(writes)))
+    with METRICS.phase("query"):
+        async with pool.acquire() as conn:
+            # Statements is_read_only does not recognise go to the writer and
+            # may write.
+            async with conn.transaction(readonly=is_read_only(sql)):
+                timeout_sql = DEADLINE.statement_timeout_sql()
+                if timeout_sql is not None:
+                    await conn.execute(timeout_sql)
+                async for row in conn.cursor(
+                    to_asyncpg_placeholders(sql),
+                    *(params or ()),
+                    prefetch=CONFIG.query_itersize,
+                ):
+                    row_count += 1
+            if not is_read_only(sql):
+                STICKY_UNTIL[target.name] = (
+                    time.monotonic() + CONFIG.read_your_writes_seconds
+                )
+            if PINNING.pinned:
+                # Only a disconnect ends a pinned proxy session; the pool
+                # opens a new connection in its place.
+                await conn.close()
+    return row_count
+
+
+async def _handle(event, target):
+    # Refresh the token in the background while queries run on pooled
+    # connections that are already authenticated.
+    queries = [
+        (PINNING.check(sql, in_transaction=True), params)
+        for sql, params in normalize_queries(event)
+    ]
+    token_refresh = asyncio.create_task(_password(target, target.endpoint))
+    tasks, writes = [], []
+    for sql, params in queries:
+        task = asyncio.create_task(_run_query(target, sql, params, list(writes)))
+        tasks.append(task)
+        if not is_read_only(sql):
+            writes.append(task)
+    remaining = DEADLINE.remaining()
+    # Cancelling a task cancels its query on the server too.
+    _, pending = await asyncio.wait(
+        tasks,
+        timeout=None if remaining == math.inf else remaining,
+    )
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    await token_refresh
+
+    row_counts, timed_out = [], None
+    for task in tasks:
+        error = None if task in pending else task.exception()
+        if task in pending or isinstance(
+            error,
+            (asyncpg.QueryCanceledError, DeadlineExceeded),
+        ):
+            row_counts.append(None)
+            timed_out = str(error or "the invocation deadline has passed")
+        elif error is not None:
+            raise error
+        else:
+            row_counts.append(task.result())
+    return row_counts, timed_out
+
+
+def before_snapshot():
+    BROKER.caches(DEFAULT_TARGET)
+
+
+async def _warm_pool(target):
+    pool = await _pool(target, target.endpoint)
+    # The released connection stays idle in the pool for the first request.
+    async with pool.acquire():
+        pass
+
+
+def after_restore():
+    LOOP.run_until_complete(_warm_pool(BROKER.target(DEFAULT_TARGET)))
+    METRICS.flush()
+
+
+register(before_snapshot, after_restore)
+
+
+# Per-request stage
+
+
+def handler(event, context):
+
+    PINNING.reset()
+    DEADLINE.reset(context)
+    try:
+        target = BROKER.target((event or {}).get("database", DEFAULT_TARGET))
+        row_counts, timed_out = LOOP.run_until_complete(_handle(event, target))
+    except (KeyError, PinningError) as e:
+        # Unknown database targets and rejected statements are caller errors.
+        return {
+            "statusCode": 400,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"error": str(e.args[0])}),
+        }
+    finally:
+        METRICS.flush()
+
+    print(
+        {
+            "row_counts": row_counts,
+            **cache_stats(),
+            "pinned": PINNING.pinned,
+            "pinning_reasons": PINNING.reasons,
+        },
+    )
+
+    if timed_out is not None:
+        # Queries that finished report their row count, the others None.
+        return {
+            "statusCode": 504,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(
+                {
+                    "error": f"deadline exceeded: {timed_out}",
+                    "row_counts": row_counts,
+                    "pinned": PINNING.pinned,
+                },
+            ),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": {"Content-Type": "application/json"},
+        "body": "Database connection was successful!",
+    }
@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import botocore.session
+from botocore.config import Config
+
+# Assumed-role credentials are treated as expired this long before their real
+# Expiration so that a token signed with them is never handed out stale.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# The only service models the connection path needs. The rds model carries
+# the generate_db_auth_token signer.
+SERVICE_MODELS = ("sts", "rds")
+
+# botocore's defaults of 60 second timeouts and five legacy attempts would let
+# one slow AssumeRole outlast the function timeout. Connects retry transient
+# STS errors themselves, within the invocation deadline.
+CLIENT_CONFIG = Config(
+    connect_timeout=2,
+    read_timeout=3,
+    retries={"mode": "standard", "total_max_attempts": 2},
+)
+
+
+def create_session(region):
+    """Creates a botocore session with its service models already loaded, so
+    the loading cost lands in the Lambda init phase instead of a request."""
+    session = botocore.session.get_session()
+    session.set_config_variable("region", region)
+    # The regional STS hostname is the one an STS interface VPC endpoint
+    # answers for; older botocore releases default to the global endpoint.
+    session.set_config_variable("sts_regional_endpoints", "regional")
+    session.set_default_client_config(CLIENT_CONFIG)
+    for service_name in SERVICE_MODELS:
+        session.get_service_model(service_name)
+    return session
+
+
+class CredentialCache:
+    """Caches assumed-role credentials, and the rds client built from them,
+    for the lifetime of a Lambda execution environment."""
+
+    def __init__(
+        self,
+        role_arn,
+        session,
+        role_session_name="cross_acct_connection",
+        refresh_margin=REFRESH_MARGIN,
+    ):
+        self.role_arn = role_arn
+        self.session = session
+        self.role_session_name = role_session_name
+        self.refresh_margin = refresh_margin
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+        self._lock = threading.Lock()
+        self._sts_client = session.create_client("sts")
+        self._credentials = None
+        self._rds_client = None
+
+    def _is_fresh(self, credentials):
+        if credentials is None:
+            return False
+        now = datetime.now(timezone.utc)
+        return credentials["Expiration"] - self.refresh_margin > now
+
+    def _assume_role(self):
+        database_account_session = self._sts_client.assume_role(
+            RoleArn=self.role_arn,
+            RoleSessionName=self.role_session_name,
+        )
+        return database_account_session["Credentials"]
+
+    def get_rds_client(self):
+        """Returns a (credentials, rds client) pair that belong together."""
+        credentials, client = self._credentials, self._rds_client
+        if self._is_fresh(credentials) and client is not None:
+            self.stats["hits"] += 1
+            return credentials, client
+
+        with self._lock:
+            # Another thread may have refreshed while we waited on the lock.
+            if self._is_fresh(self._credentials) and self._rds_client is not None:
+                self.stats["hits"] += 1
+                return self._credentials, self._rds_client
+
+            if self._credentials is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["refreshes"] += 1
+
+            credentials = self._assume_role()
+            client = self.session.create_client(
+                "rds",
+                aws_access_key_id=credentials["AccessKeyId"],
+                aws_secret_access_key=credentials["SecretAccessKey"],
+                aws_session_token=credentials["SessionToken"],
+            )
+            self._credentials, self._rds_client = credentials, client
+            return credentials, client
+
+    def invalidate(self):
+        with self._lock:
+            self._credentials = None
+            self._rds_client = None
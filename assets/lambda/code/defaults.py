@@ -0,0 +1,28 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+# Defaults that config.py shares with modules that import psycopg2 or
+# botocore. This module imports nothing, so that every handler can load its
+# configuration without the drivers of the others.
+
+# Time kept back from the invocation deadline to build and return a response.
+DEFAULT_DEADLINE_MARGIN_SECONDS = 1.0
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5
+DEFAULT_CONNECT_ATTEMPTS = 3
+# libpq rounds connect_timeout to whole seconds and treats anything below 2
+# as 2.
+MIN_CONNECT_TIMEOUT_SECONDS = 2
+
+# Bytes of the object loaded per transaction; a chunk's rows and its
+# checkpoint commit together.
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+# Bytes read from S3 per piece; with one record held back, this bounds the
+# memory a load takes.
+DEFAULT_READ_BYTES = 1024 * 1024
+DEFAULT_CHECKPOINT_TABLE = "ingest_checkpoints"
+
+# What a queue writer table does with a row whose key already exists.
+NOTHING = "nothing"
+UPDATE = "update"
+ON_CONFLICT = (NOTHING, UPDATE)
@@ -0,0 +1,128 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import botocore.exceptions
+import psycopg2
+from bulk_copy import CheckpointConflict
+from bulk_copy import CheckpointStore
+from bulk_copy import ChunkSizer
+from bulk_copy import COMPLETE
+from bulk_copy import CSV
+from bulk_copy import FORMATS
+from bulk_copy import ingest_object
+from bulk_copy import S3_CLIENT_CONFIG
+from config import DEFAULT_TARGET
+from pagination import dumps
+from resilience import CircuitOpenError
+from resilience import DeadlineExceeded
+from routing import READ_WRITE
+from runtime import CONFIG
+from runtime import DEADLINE
+from runtime import METRICS
+from runtime import router
+from runtime import SESSION
+
+# Init stage
+
+# The function's own role reads the objects; AWS_ENDPOINT_URL_S3 points the
+# client elsewhere, such as at a local stand-in.
+S3 = SESSION.create_client("s3", config=S3_CLIENT_CONFIG)
+CHECKPOINTS = CheckpointStore(CONFIG.ingest_checkpoint_table)
+SIZER = ChunkSizer(CONFIG.ingest_chunk_bytes, CONFIG.ingest_read_bytes)
+
+
+# Per-request stage
+
+
+def _response(status_code, body):
+    return {
+        "statusCode": status_code,
+        "headers": {"Content-Type": "application/json"},
+        "body": dumps(body),
+    }
+
+
+def normalize_source(event):
+    """Returns the load an event asks for.
+
+    An event carries the "key" of the object and the "table" to load it
+    into, and optionally "bucket" (INGEST_BUCKET by default), "columns",
+    "format" ("csv" or "text"), "header" (csv only) and a one-character
+    "delimiter".
+    """
+    event = event or {}
+    source = {
+        "bucket": event.get("bucket") or CONFIG.ingest_bucket,
+        "key": event.get("key"),
+        "table": event.get("table"),
+        "columns": event.get("columns") or [],
+        "format": event.get("format", CSV),
+        "header": bool(event.get("header", False)),
+        "delimiter": event.get("delimiter"),
+    }
+    missing = [name for name in ("bucket", "key", "table") if not source[name]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    if source["format"] not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if source["header"] and source["format"] != CSV:
+        raise ValueError("header is only supported for csv")
+    if source["delimiter"] is not None and len(source["delimiter"]) != 1:
+        raise ValueError("delimiter must be a single character")
+    return source
+
+
+def handler(event, context):
+
+    DEADLINE.reset(context)
+    try:
+        try:
+            source = normalize_source(event)
+            target_router = router((event or {}).get("database", DEFAULT_TARGET))
+        except ValueError as e:
+            return _response(400, {"error": str(e)})
+        except KeyError as e:
+            return _response(400, {"error": str(e.args[0])})
+
+        with target_router.connection(READ_WRITE) as conn:
+            with DEADLINE.cancel_on_expiry(conn):
+                progress = ingest_object(
+                    conn,
+                    S3,
+                    source,
+                    CHECKPOINTS,
+                    sizer=SIZER,
+                    read_bytes=CONFIG.ingest_read_bytes,
+                    deadline=DEADLINE,
+                    metrics=METRICS,
+                )
+        print({"source": source, **progress})
+
+        # An incomplete load resumes from its checkpoint when the same event
+        # is sent again.
+        return _response(
+            200 if progress["status"] == COMPLETE else 202,
+            {**progress, "table": source["table"], "key": source["key"]},
+        )
+    except CheckpointConflict as e:
+        return _response(409, {"error": str(e)})
+    except botocore.exceptions.ClientError as e:
+        # A missing object, a denied read, or an object replaced between the
+        # ranged GETs of a load (PreconditionFailed).
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 502)
+        return _response(409 if status == 412 else status, {"error": str(e)})
+    except (
+        ValueError,
+        psycopg2.DataError,
+        psycopg2.IntegrityError,
+        psycopg2.ProgrammingError,
+    ) as e:
+        # Records COPY rejects or that are longer than a chunk, or a table or
+        # column that does not exist. The failed chunk is rolled back.
+        return _response(422, {"error": str(e).strip()})
+    except CircuitOpenError as e:
+        return _response(503, {"error": str(e)})
+    except DeadlineExceeded as e:
+        return _response(504, {"error": f"deadline exceeded: {e}"})
+    finally:
+        METRICS.flush()
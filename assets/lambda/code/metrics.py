@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+import os
+import time
+
+EMF = "emf"
+OFF = "off"
+
+# CloudWatch drops EMF documents with more values than this for a metric.
+MAX_VALUES = 100
+
+
+class _NoOpPhase:
+    def __init__(self):
+        self.dimensions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_OP_PHASE = _NoOpPhase()
+
+
+class _Phase:
+    __slots__ = ("recorder", "name", "dimensions", "start", "subsegment")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.dimensions = {}
+        self.subsegment = None
+
+    def __enter__(self):
+        xray_recorder = self.recorder.xray_recorder()
+        if xray_recorder is not None:
+            self.subsegment = xray_recorder.begin_subsegment(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        dimensions = {key: str(value).lower() for key, value in self.dimensions.items()}
+        if exc_type is not None:
+            dimensions["Error"] = "true"
+        self.recorder.record(self.name, duration_ms, dimensions)
+
+        if self.subsegment is not None:
+            for key, value in dimensions.items():
+                self.subsegment.put_annotation(key, value)
+            self.recorder.xray_recorder().end_subsegment()
+        return False
+
+
+class Recorder:
+    """Times the phases of an invocation and writes them out as CloudWatch
+    Embedded Metric Format lines, plus X-Ray subsegments when the X-Ray SDK
+    is available. With mode OFF every call is a no-op."""
+
+    def __init__(self, namespace, mode=EMF, subsegments=True):
+        self.namespace = namespace
+        self.mode = mode
+        self.subsegments = subsegments
+        self.function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+
+        self._xray_recorder = None
+        self._samples = {}
+
+    def phase(self, name):
+        if self.mode == OFF:
+            return _NO_OP_PHASE
+        return _Phase(self, name)
+
+    def xray_recorder(self):
+        if not self.subsegments:
+            return None
+        if self._xray_recorder is None:
+            # The X-Ray SDK is optional and slow to import; load it on first use.
+            try:
+                from aws_xray_sdk.core import xray_recorder
+            except ImportError:
+                self.subsegments = False
+                return None
+            self._xray_recorder = xray_recorder
+        return self._xray_recorder
+
+    def record(self, name, duration_ms, dimensions):
+        key = (name, tuple(sorted(dimensions.items())))
+        values = self._samples.setdefault(key, [])
+        values.append(duration_ms)
+        if len(values) == MAX_VALUES:
+            # Written out as soon as a document is full, so that a long
+            # invocation holds at most MAX_VALUES samples per key.
+            del self._samples[key]
+            self._emit(name, key[1], values, int(time.time() * 1000))
+
+    def flush(self):
+        """Prints one EMF line per phase and dimension set, then resets."""
+        samples, self._samples = self._samples, {}
+        timestamp = int(time.time() * 1000)
+        for (name, dimensions), values in samples.items():
+            self._emit(name, dimensions, values, timestamp)
+
+    def _emit(self, name, dimensions, values, timestamp):
+        dimensions = dict(dimensions, FunctionName=self.function_name, Phase=name)
+        print(
+            json.dumps(
+                {
+                    "_aws": {
+                        "Timestamp": timestamp,
+                        "CloudWatchMetrics": [
+                            {
+                                "Namespace": self.namespace,
+                                "Dimensions": [sorted(dimensions)],
+                                "Metrics": [
+                                    {"Name": "Duration", "Unit": "Milliseconds"},
+                                ],
+                            },
+                        ],
+                    },
+                    **dimensions,
+                    "Duration": values,
+                },
+            ),
+        )
+
+
+NO_OP_RECORDER = Recorder("", mode=OFF, subsegments=False)
@@ -0,0 +1,223 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import base64
+import datetime
+import itertools
+import json
+import uuid
+
+# orjson is optional; ship it in a layer to encode large pages several times
+# faster than the standard library.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows per page when a query does not ask for fewer.
+DEFAULT_PAGE_ROWS = 1000
+
+# Lambda caps a synchronous response at 6 MB, and proxy integrations carry the
+# body as an escaped JSON string inside it, which can nearly double the size
+# of string-heavy results.
+DEFAULT_RESPONSE_BUDGET_BYTES = 2_500_000
+MAX_RESPONSE_BUDGET_BYTES = 6_000_000
+
+
+def _default(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea in PostgreSQL's hex text format, so it can be sent back as a
+        # cursor parameter.
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    # Decimal, UUID, timedelta and the like.
+    return str(value)
+
+
+if orjson is not None:
+
+    def encode(value):
+        """Encodes `value` as compact UTF-8 JSON."""
+        # Datetimes go through _default too, so both encoders format them
+        # the same way.
+        return orjson.dumps(
+            value,
+            default=_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+    loads = orjson.loads
+
+else:
+
+    def encode(value):
+        """Encodes `value` as compact UTF-8 JSON."""
+        return json.dumps(
+            value,
+            default=_default,
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode()
+
+    loads = json.loads
+
+
+def dumps(value):
+    return encode(value).decode()
+
+
+def encode_cursor(key, values):
+    payload = encode({"key": key, "after": values})
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor, key):
+    """Returns the key values a cursor resumes after."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        values = payload["after"]
+        cursor_key = payload["key"]
+    except (TypeError, ValueError, KeyError):
+        raise ValueError("cursor is not a valid page cursor") from None
+    if cursor_key != key or not isinstance(values, list) or len(values) != len(key):
+        raise ValueError(f"cursor does not belong to a page keyed on {key}")
+    return values
+
+
+def page_options(event, max_rows):
+    """Returns the paging options of each query of an event, in the order of
+    normalize_queries.
+
+    Query objects may carry "key" (result column names to page on, unique
+    together), "limit" (rows per page, at most `max_rows`), "cursor" (the
+    next_cursor of the previous page) and "descending". Without a key, a
+    query returns its first page only.
+    """
+    options = []
+    for query in (event or {}).get("queries") or [None]:
+        query = query if isinstance(query, dict) else {}
+        key = query.get("key") or []
+        if isinstance(key, str):
+            key = [key]
+        limit = query.get("limit", max_rows)
+        if not isinstance(limit, int) or not 1 <= limit <= max_rows:
+            raise ValueError(f"limit must be an integer between 1 and {max_rows}")
+        cursor = query.get("cursor")
+        if cursor and not key:
+            raise ValueError("a cursor needs the page key it was issued for")
+        options.append(
+            {
+                "key": key,
+                "limit": limit,
+                "after": decode_cursor(cursor, key) if cursor else None,
+                "descending": bool(query.get("descending", False)),
+            },
+        )
+    return options
+
+
+def _identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def keyset_query(sql, params, options):
+    """Wraps a query so that it returns the rows after the cursor in key order,
+    one more than the page holds to tell whether another page follows.
+
+    Keyset pagination seeks through the key instead of skipping OFFSET rows,
+    so every page costs the same however deep it is.
+    """
+    sql = sql.strip().rstrip(";")
+    key = options["key"]
+    if not key:
+        return sql, params or None
+    if not params:
+        # The page adds parameters, after which psycopg2 reads every % in
+        # the query as a placeholder or escape.
+        sql = sql.replace("%", "%%")
+    params = list(params or [])
+
+    columns = ", ".join(_identifier(name) for name in key)
+    direction = " desc" if options["descending"] else ""
+    where = ""
+    if options["after"] is not None:
+        placeholders = ", ".join(["%s"] * len(key))
+        where = (
+            f" where ({columns}) {'<' if options['descending'] else '>'}"
+            f" ({placeholders})"
+        )
+        params.extend(options["after"])
+    order = ", ".join(f"{_identifier(name)}{direction}" for name in key)
+    params.append(options["limit"] + 1)
+    return (
+        f"select * from ({sql}) as keyset_page{where} order by {order} limit %s",
+        params,
+    )
+
+
+def read_page(
+    conn,
+    sql,
+    params,
+    options,
+    budget_bytes,
+    itersize,
+    server_side,
+    deadline=None,
+):
+    """Reads one page of a query and encodes it column-wise.
+
+    Stops at the page limit or before the encoded rows would exceed
+    `budget_bytes`, whichever comes first. Returns the result and the bytes
+    its rows take up. Column-wise results list the column names once and one
+    array of values per column, instead of an object per row.
+    """
+    if deadline is not None:
+        deadline.apply_statement_timeout(conn)
+    name = f"page_{uuid.uuid4().hex}" if server_side else None
+    with conn.cursor(name=name) as cur:
+        if server_side:
+            cur.itersize = itersize
+        cur.execute(sql, params)
+        rows = iter(cur)
+        # Named cursors only describe their result after the first fetch.
+        first = next(rows, None)
+        columns = [column.name for column in cur.description]
+
+        page, used_bytes, truncated = [], 0, False
+        rows = itertools.chain([first] if first is not None else [], rows)
+        for row in rows:
+            # A row's row-wise encoding is an upper bound on what it adds to
+            # a column-wise page with fewer columns than rows.
+            row_bytes = len(encode(row)) + 1
+            if len(page) == options["limit"] or used_bytes + row_bytes > budget_bytes:
+                truncated = True
+                break
+            page.append(row)
+            used_bytes += row_bytes
+
+    if truncated and not page:
+        return {
+            "status": "error",
+            "error": "the next row does not fit in the remaining response budget",
+        }, 0
+
+    next_cursor = None
+    if truncated and options["key"]:
+        positions = [columns.index(name) for name in options["key"]]
+        next_cursor = encode_cursor(
+            options["key"],
+            [page[-1][position] for position in positions],
+        )
+    return {
+        "status": "ok",
+        "columns": columns,
+        "data": (
+            [list(values) for values in zip(*page)] if page else [[] for _ in columns]
+        ),
+        "row_count": len(page),
+        "truncated": truncated,
+        "next_cursor": next_cursor,
+    }, used_bytes
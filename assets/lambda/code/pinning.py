@@ -0,0 +1,139 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import re
+
+# Statements longer than this pin the session to its backend connection.
+MAX_STATEMENT_BYTES = 16384
+
+WARN = "warn"
+REWRITE = "rewrite"
+REJECT = "reject"
+POLICIES = (WARN, REWRITE, REJECT)
+
+# Driver behaviour that pins, reported alongside the statement risks. The
+# "cursor" pattern below only sees a DECLARE written in the SQL, not the one
+# psycopg2 sends for a named cursor.
+SERVER_SIDE_CURSOR = "server_side_cursor"
+
+PATTERNS = {
+    "set": re.compile(r"^\s*set\s+(?!local\b|transaction\b)", re.IGNORECASE),
+    "reset": re.compile(r"^\s*(reset|discard)\b", re.IGNORECASE),
+    "prepared_statement": re.compile(
+        r"^\s*(prepare|execute|deallocate)\b",
+        re.IGNORECASE,
+    ),
+    "temporary_object": re.compile(
+        r"\bcreate\s+(global\s+|local\s+)?(temp|temporary)\b",
+        re.IGNORECASE,
+    ),
+    "cursor": re.compile(r"^\s*declare\b", re.IGNORECASE),
+    "listen": re.compile(r"^\s*(listen|unlisten)\b", re.IGNORECASE),
+    "load": re.compile(r"^\s*load\b", re.IGNORECASE),
+    "sequence_function": re.compile(r"\b(nextval|setval)\s*\(", re.IGNORECASE),
+    "advisory_lock": re.compile(
+        r"\bpg_(try_)?advisory_(un)?lock(_shared|_all)?\s*\(",
+        re.IGNORECASE,
+    ),
+    "set_config": re.compile(
+        r"\bset_config\s*\([^)]*,\s*false\s*\)",
+        re.IGNORECASE,
+    ),
+}
+
+# Transaction-scoped equivalents; only valid inside an explicit transaction,
+# where the setting or lock is released at commit or rollback.
+REWRITES = {
+    "set": (
+        re.compile(r"^(\s*set\s+)(session\s+)?", re.IGNORECASE),
+        r"\1local ",
+    ),
+    "advisory_lock": (
+        re.compile(r"\bpg_(try_)?advisory_lock(_shared)?\s*\(", re.IGNORECASE),
+        r"pg_\1advisory_xact_lock\2(",
+    ),
+    "set_config": (
+        re.compile(r"(\bset_config\s*\([^)]*,\s*)false(\s*\))", re.IGNORECASE),
+        r"\1true\2",
+    ),
+}
+
+
+class PinningError(ValueError):
+    pass
+
+
+def classify(sql):
+    """Returns the names of the pinning risks found in a statement."""
+    risks = [name for name, pattern in PATTERNS.items() if pattern.search(sql)]
+    if len(sql.encode()) > MAX_STATEMENT_BYTES:
+        risks.append("statement_size")
+    return risks
+
+
+def _rewrite(sql, risk):
+    if risk not in REWRITES:
+        return None
+    # Unlocks and session-level role or characteristics changes have no
+    # transaction-scoped equivalent.
+    if risk == "advisory_lock" and re.search(
+        r"advisory_unlock|advisory_lock_all",
+        sql,
+        re.IGNORECASE,
+    ):
+        return None
+    if risk == "set" and re.search(
+        r"session\s+(authorization|characteristics)",
+        sql,
+        re.IGNORECASE,
+    ):
+        return None
+    pattern, replacement = REWRITES[risk]
+    return pattern.sub(replacement, sql)
+
+
+class PinningGuard:
+    """Checks outgoing statements for RDS Proxy session pinning.
+
+    With WARN, statements pass through and are only reported. With REWRITE,
+    statements that have a transaction-scoped equivalent are rewritten when
+    they run inside a transaction and the rest are rejected. With REJECT,
+    every pinning statement is rejected. In all modes `pinned` records
+    whether the current invocation pinned its session.
+    """
+
+    def __init__(self, policy=REWRITE):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.reasons = []
+
+    @property
+    def pinned(self):
+        return bool(self.reasons)
+
+    def reset(self):
+        self.reasons = []
+
+    def record(self, reason):
+        """Records driver behaviour that pins the session."""
+        self.reasons.append(reason)
+
+    def check(self, sql, in_transaction):
+        """Returns the statement to send, rewritten if needed."""
+        for risk in classify(sql):
+            if self.policy == WARN:
+                self.record(risk)
+                continue
+
+            rewritten = (
+                _rewrite(sql, risk)
+                if self.policy == REWRITE and in_transaction
+                else None
+            )
+            if rewritten is None:
+                raise PinningError(
+                    f"Statement would pin the RDS Proxy session ({risk})",
+                )
+            sql = rewritten
+        return sql
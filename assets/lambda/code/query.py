@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import itertools
+import uuid
+
+# Rows fetched from the server per round trip by a named cursor.
+DEFAULT_ITERSIZE = 2000
+
+DEFAULT_QUERY = """select * from information_schema.tables"""
+
+
+def normalize_queries(event):
+    """Returns the (sql, params) pairs requested by an event.
+
+    An event may carry a "queries" list whose items are either SQL strings or
+    {"sql": ..., "params": [...]} objects using psycopg2 %s placeholders.
+    Without one, the connectivity probe query runs.
+    """
+    queries = (event or {}).get("queries") or [DEFAULT_QUERY]
+    normalized = []
+    for query in queries:
+        if isinstance(query, str):
+            normalized.append((query, None))
+        else:
+            normalized.append((query["sql"], query.get("params")))
+    return normalized
+
+
+def stream_rows(
+    conn,
+    sql,
+    params=None,
+    itersize=DEFAULT_ITERSIZE,
+    server_side=False,
+    deadline=None,
+):
+    """Yields the rows of a query.
+
+    By default the whole result is transferred into memory when the query
+    runs. With `server_side`, rows are fetched through a named cursor,
+    `itersize` at a time, inside the current transaction; the cursor is
+    closed when the generator is exhausted or closed. The README's "Session
+    Pinning" section weighs the two.
+
+    With a `deadline`, the query's statement_timeout ends at it.
+    """
+    if deadline is not None:
+        deadline.apply_statement_timeout(conn)
+    name = f"stream_{uuid.uuid4().hex}" if server_side else None
+    with conn.cursor(name=name) as cur:
+        if server_side:
+            cur.itersize = itersize
+        cur.execute(sql, params)
+        # A statement without a result, such as an INSERT without
+        # RETURNING, yields no rows.
+        if cur.description is not None:
+            yield from cur
+
+
+def chunked(rows, size):
+    """Groups an iterable of rows into lists of at most `size` rows."""
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,289 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import contextmanager
+
+import botocore.exceptions
+import psycopg2
+from defaults import DEFAULT_CONNECT_ATTEMPTS
+from defaults import DEFAULT_DEADLINE_MARGIN_SECONDS
+
+# Error classes of a failed connect, each with its own recovery.
+AUTH = "auth"  # The proxy rejected the token: sign a new one, retry at once.
+BORROW_TIMEOUT = "borrow_timeout"  # The proxy's pool is exhausted: back off.
+TRANSIENT = "transient"  # The proxy or STS did not answer in time: back off.
+
+AUTH_FAILURE_MESSAGES = (
+    "PAM authentication failed",
+    "password authentication failed",
+    "IAM authentication failed",
+)
+# RDS Proxy answers a client it cannot find a database connection for within
+# borrow_timeout with this error, as it does when max_connections is reached.
+BORROW_TIMEOUT_MESSAGES = (
+    "Timed-out waiting to acquire database connection",
+    "too many clients already",
+    "remaining connection slots are reserved",
+)
+TRANSIENT_MESSAGES = (
+    "timeout expired",
+    "could not connect to server",
+    "Connection refused",
+    "Connection timed out",
+    "server closed the connection unexpectedly",
+    "Temporary failure in name resolution",
+)
+TRANSIENT_STS_CODES = (
+    "Throttling",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+    "ServiceUnavailable",
+    "InternalFailure",
+    "IDPCommunicationError",
+)
+
+# Below this, a statement is not worth starting.
+MIN_STATEMENT_TIMEOUT_MS = 50
+
+# Without enough connect timings for a p95, hedge after this long.
+DEFAULT_HEDGE_AFTER_SECONDS = 0.5
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 100
+
+
+def classify(error):
+    """Returns AUTH, BORROW_TIMEOUT or TRANSIENT for an error worth retrying
+    a connect after, or None."""
+    if isinstance(error, psycopg2.OperationalError):
+        message = str(error)
+        if any(text in message for text in AUTH_FAILURE_MESSAGES):
+            return AUTH
+        if any(text in message for text in BORROW_TIMEOUT_MESSAGES):
+            return BORROW_TIMEOUT
+        if any(text in message for text in TRANSIENT_MESSAGES):
+            return TRANSIENT
+        return None
+    if isinstance(error, botocore.exceptions.ClientError):
+        code = error.response.get("Error", {}).get("Code")
+        return TRANSIENT if code in TRANSIENT_STS_CODES else None
+    if isinstance(
+        error,
+        (
+            botocore.exceptions.EndpointConnectionError,
+            botocore.exceptions.ConnectTimeoutError,
+            botocore.exceptions.ReadTimeoutError,
+        ),
+    ):
+        return TRANSIENT
+    return None
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of connecting while an endpoint's circuit is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting work the invocation has no time left for."""
+
+
+class Deadline:
+    """The time left in the current invocation, less a margin to return a
+    response in. Reset at the start of every invocation."""
+
+    def __init__(self, margin_seconds=DEFAULT_DEADLINE_MARGIN_SECONDS):
+        self.margin_seconds = margin_seconds
+        self._expires_at = None
+
+    def reset(self, context=None):
+        if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+            # Local runs have no invocation deadline.
+            self._expires_at = None
+            return
+        self._expires_at = (
+            time.monotonic()
+            + context.get_remaining_time_in_millis() / 1000
+            - self.margin_seconds
+        )
+
+    def remaining(self):
+        if self._expires_at is None:
+            return math.inf
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def statement_timeout_sql(self):
+        """Returns the SET LOCAL that ends the next statement at the
+        deadline, or None without one. Raises DeadlineExceeded when no time
+        is left.
+
+        SET LOCAL lasts until the end of the transaction and, unlike SET,
+        does not pin the RDS Proxy session.
+        """
+        remaining = self.remaining()
+        if remaining == math.inf:
+            return None
+        if remaining * 1000 < MIN_STATEMENT_TIMEOUT_MS:
+            raise DeadlineExceeded("the invocation deadline has passed")
+        return f"set local statement_timeout = {int(remaining * 1000)}"
+
+    def apply_statement_timeout(self, conn):
+        sql = self.statement_timeout_sql()
+        if sql is not None:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+
+    @contextmanager
+    def cancel_on_expiry(self, conn):
+        """Cancels the statement running on `conn` when the deadline passes.
+
+        Backs up statement_timeout, which only limits single statements and,
+        for a server-side cursor, single fetches.
+        """
+        remaining = self.remaining()
+        if remaining == math.inf:
+            yield conn
+            return
+        timer = threading.Timer(remaining, conn.cancel)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield conn
+        finally:
+            timer.cancel()
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: the n-th retry waits a random
+    time between 0 and min(max_delay, base_delay * 2**n)."""
+
+    def __init__(
+        self,
+        attempts=DEFAULT_CONNECT_ATTEMPTS,
+        base_delay=0.1,
+        max_delay=2.0,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+
+class CircuitBreaker:
+    """Fails connects to an endpoint fast after `failure_threshold`
+    consecutive failures, for `reset_seconds`. Then a single trial connect is
+    let through; its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.stats = {"opened": 0, "rejected": 0}
+
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def check(self):
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(
+                    f"circuit open after {self._failures} failed connects; "
+                    f"retrying in at most {self.reset_seconds}s",
+                )
+            self.state = self.HALF_OPEN
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.stats["opened"] += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+def _close_quietly(future):
+    if future.exception() is None:
+        try:
+            future.result().close()
+        except psycopg2.Error:
+            pass
+
+
+class HedgedConnect:
+    """Starts a second connect when the first one takes longer than the p95
+    of recent connects, and keeps whichever completes first.
+
+    A hedge costs one extra proxy connection and token check, and only pays
+    off against slow outliers such as a lost SYN or a slow borrow.
+    """
+
+    def __init__(self, default_after_seconds=DEFAULT_HEDGE_AFTER_SECONDS):
+        self.default_after_seconds = default_after_seconds
+        self.stats = {"hedged": 0, "hedge_wins": 0}
+
+        self._durations = deque(maxlen=HEDGE_WINDOW)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def after_seconds(self):
+        if len(self._durations) < HEDGE_MIN_SAMPLES:
+            return self.default_after_seconds
+        durations = sorted(self._durations)
+        return durations[math.ceil(len(durations) * 0.95) - 1]
+
+    def connect(self, connect):
+        """Runs `connect`, hedged. Only errors from both attempts raise."""
+        with self._lock:
+            if self._executor is None:
+                # Room for losers of earlier hedges that have yet to time out.
+                self._executor = ThreadPoolExecutor(
+                    max_workers=4,
+                    thread_name_prefix="hedge",
+                )
+        start = time.monotonic()
+        first = self._executor.submit(connect)
+        done, _ = wait([first], timeout=self.after_seconds)
+        if done:
+            conn = first.result()
+            self._durations.append(time.monotonic() - start)
+            return conn
+
+        self.stats["hedged"] += 1
+        second = self._executor.submit(connect)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            connected = [future for future in done if future.exception() is None]
+            if not connected:
+                error = next(iter(done)).exception()
+                continue
+            winner = connected[0]
+            for loser in connected[1:]:
+                _close_quietly(loser)
+            for loser in pending:
+                loser.add_done_callback(_close_quietly)
+            if winner is second:
+                self.stats["hedge_wins"] += 1
+            self._durations.append(time.monotonic() - start)
+            return winner.result()
+        raise error
@@ -0,0 +1,234 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import importlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from pagination import encode
+from pagination import loads
+from routing import is_read_only
+
+OFF = "off"
+LOCAL = "local"
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# Carried by every entry of a target, to drop them all after a write whose
+# tables cannot be told from its SQL.
+ALL_TABLES = "*"
+
+# Quoted literals and identifiers, kept as they are, and runs of whitespace.
+SQL_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+")
+TABLE_NAME = r"((?:\"(?:[^\"]|\"\")+\"|\w+)(?:\s*\.\s*(?:\"(?:[^\"]|\"\")+\"|\w+))*)"
+READ_TABLES = re.compile(r"\b(?:from|join)\s+(?:only\s+)?" + TABLE_NAME, re.IGNORECASE)
+WRITE_TABLES = re.compile(
+    r"\b(?:insert\s+into|update|delete\s+from|merge\s+into|copy"
+    r"|truncate(?:\s+table)?|(?:alter|drop)\s+table(?:\s+if\s+exists)?)"
+    r"\s+(?:only\s+)?" + TABLE_NAME,
+    re.IGNORECASE,
+)
+# Neither read-only nor writes to a table.
+SESSION_STATEMENT = re.compile(
+    r"^\s*(set|reset|begin|start|commit|end|rollback|savepoint|release|lock)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(sql):
+    """Collapses whitespace outside quoted literals and identifiers, so that
+    reformatted copies of a query share a cache entry."""
+    sql = sql.strip().rstrip(";").rstrip()
+    if "$" in sql or "\\" in sql:
+        # Dollar quotes and backslash escapes would need a real tokenizer;
+        # such queries are only cached under their exact text.
+        return sql
+    return SQL_TOKEN.sub(_collapse_whitespace, sql)
+
+
+def _collapse_whitespace(match):
+    token = match.group()
+    return token if token[0] in "'\"" else " "
+
+
+def _table(name):
+    # Tag tables by bare name, so a schema-qualified write also drops entries
+    # of queries that reach the table through the search_path.
+    name = re.split(r"\s*\.\s*", name)[-1]
+    if name.startswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+
+def read_tables(sql):
+    return {_table(name) for name in READ_TABLES.findall(sql)}
+
+
+def write_tables(sql):
+    """Returns the tables a statement writes, or None when it writes but
+    names no table it can be tied to, such as a function call."""
+    tables = {_table(name) for name in WRITE_TABLES.findall(sql)}
+    return tables or None
+
+
+def cache_ttls(event, default):
+    """Returns the cache TTL in seconds of each query of an event, in the
+    order of normalize_queries. Query objects may set "cache_ttl"; 0 skips
+    the cache for that query."""
+    ttls = []
+    for query in (event or {}).get("queries") or [None]:
+        ttl = query.get("cache_ttl", default) if isinstance(query, dict) else default
+        if not isinstance(ttl, int) or ttl < 0:
+            raise ValueError("cache_ttl must be a non-negative integer")
+        ttls.append(ttl)
+    return ttls
+
+
+class LocalBackend:
+    """An in-process LRU of encoded results, bounded by their total size in
+    bytes. Entries expire after their TTL and can be dropped by tag.
+
+    A shared backend provides the same get, set, invalidate and stats
+    members and stores the values it is given as opaque bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {"entries": 0, "bytes": 0, "evictions": 0, "invalidations": 0}
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tags = {}
+
+    def _remove(self, key):
+        value, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+        self.stats["bytes"] -= len(value)
+        self.stats["entries"] -= 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl_seconds, tags):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl_seconds, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self.stats["bytes"] += len(value)
+            self.stats["entries"] += 1
+            while self.stats["bytes"] > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.stats["invalidations"] += 1
+
+
+class ResultCache:
+    """Caches query results by target, normalized SQL, parameters and the
+    options of the page they fill, and drops the results that read a table
+    when a statement writes to it.
+
+    Writes only invalidate the backend they run against: with LocalBackend,
+    other execution environments keep serving their copies until the TTL
+    runs out.
+    """
+
+    def __init__(self, backend, default_ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.backend = backend
+        self.default_ttl_seconds = default_ttl_seconds
+        # A single entry takes at most an eighth of a local cache.
+        self.max_entry_bytes = getattr(backend, "max_bytes", DEFAULT_MAX_BYTES) // 8
+        self.stats = {"hits": 0, "misses": 0, "skipped": 0}
+
+    @staticmethod
+    def key(target, sql, params, options=None):
+        digest = hashlib.sha256()
+        digest.update(encode([target, normalize_sql(sql), params, options]))
+        return digest.hexdigest()
+
+    def get(self, target, sql, params, options=None):
+        value = self.backend.get(self.key(target, sql, params, options))
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return loads(value)
+
+    def put(self, target, sql, params, value, ttl_seconds, options=None):
+        """Stores a JSON-serializable result. Results of statements that are
+        not read-only, or larger than max_entry_bytes, are not cached.
+
+        `options` are the page options of the result, if it is a page: the
+        same SQL fills pages of different limits.
+        """
+        encoded = encode(value)
+        if not is_read_only(sql) or len(encoded) > self.max_entry_bytes:
+            self.stats["skipped"] += 1
+            return
+        tags = {f"{target}/{table}" for table in read_tables(sql)}
+        tags.add(f"{target}/{ALL_TABLES}")
+        self.backend.set(
+            self.key(target, sql, params, options),
+            encoded,
+            ttl_seconds,
+            tags,
+        )
+
+    def invalidate_writes(self, target, statements):
+        """Drops the cached results that read a table the statements write."""
+        tags = set()
+        for sql in statements:
+            if is_read_only(sql) or SESSION_STATEMENT.match(sql):
+                continue
+            tables = write_tables(sql)
+            if tables is None:
+                tags.add(f"{target}/{ALL_TABLES}")
+            else:
+                tags.update(f"{target}/{table}" for table in tables)
+        if tags:
+            self.backend.invalidate(tags)
+
+    @property
+    def summary(self):
+        return {**self.stats, **self.backend.stats}
+
+
+def load_result_cache(mode, max_bytes, default_ttl_seconds):
+    """Returns the ResultCache for a RESULT_CACHE mode, or None when it is OFF.
+
+    Besides OFF and LOCAL, the mode may name a shared backend factory as
+    "module:function", which is called without arguments.
+    """
+    if mode == OFF:
+        return None
+    if mode == LOCAL:
+        backend = LocalBackend(max_bytes)
+    else:
+        module_name, _, factory_name = mode.partition(":")
+        backend = getattr(importlib.import_module(module_name), factory_name)()
+    return ResultCache(backend, default_ttl_seconds)
@@ -0,0 +1,83 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import re
+import time
+from contextlib import contextmanager
+
+READ_ONLY = "read_only"
+READ_WRITE = "read_write"
+
+READ_STATEMENT = re.compile(
+    r"^\s*(select|with|show|explain|values|table)\b",
+    re.IGNORECASE,
+)
+# Clauses that make an otherwise read-looking statement write or lock rows.
+WRITE_CLAUSE = re.compile(
+    r"\b(insert|update|delete|merge|nextval|setval)\b|\bfor\s+(no\s+key\s+)?update\b|\bfor\s+(key\s+)?share\b",
+    re.IGNORECASE,
+)
+
+
+def is_read_only(sql):
+    return bool(READ_STATEMENT.match(sql)) and not WRITE_CLAUSE.search(sql)
+
+
+def resolve_route(statements, route=None):
+    """Returns READ_ONLY or READ_WRITE for a transaction made of `statements`.
+
+    An explicit `route` wins; otherwise the transaction is read-only only if
+    every statement in it is.
+    """
+    if route is not None:
+        if route not in (READ_ONLY, READ_WRITE):
+            raise ValueError(f"route must be {READ_ONLY!r} or {READ_WRITE!r}")
+        return route
+    if all(is_read_only(sql) for sql in statements):
+        return READ_ONLY
+    return READ_WRITE
+
+
+class Router:
+    """Routes transactions to the READ_ONLY or READ_WRITE proxy endpoint.
+
+    After a write, reads stay on the read/write endpoint for
+    `read_your_writes_seconds` so that callers see their own writes despite
+    replica lag.
+    """
+
+    def __init__(self, read_write, read_only=None, read_your_writes_seconds=5):
+        self.holders = {READ_WRITE: read_write, READ_ONLY: read_only or read_write}
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.stats = {READ_ONLY: 0, READ_WRITE: 0, "sticky": 0}
+
+        self._sticky_until = 0.0
+        self._current = None
+
+    def choose(self, route):
+        if route == READ_ONLY and time.monotonic() < self._sticky_until:
+            self.stats["sticky"] += 1
+            return READ_WRITE
+        return route
+
+    @contextmanager
+    def connection(self, route):
+        chosen = self.choose(route)
+        self.stats[chosen] += 1
+        self._current = self.holders[chosen]
+        try:
+            with self._current.connection() as conn:
+                yield conn
+        finally:
+            self._current = None
+        if route == READ_WRITE:
+            self._sticky_until = time.monotonic() + self.read_your_writes_seconds
+
+    def discard_current(self):
+        """Drops the connection in use once the current transaction ends."""
+        if self._current is not None:
+            self._current.discard_on_release()
+
+    def close(self):
+        for holder in set(self.holders.values()):
+            holder.close()
@@ -0,0 +1,114 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+from datetime import timedelta
+from functools import partial
+
+from broker import BoundedTTLCache
+from broker import CredentialBroker
+from config import DEFAULT_TARGET
+from config import load_config
+from connection import ConnectionHolder
+from credentials import create_session
+from metrics import Recorder
+from pinning import PinningGuard
+from resilience import CircuitBreaker
+from resilience import Deadline
+from resilience import HedgedConnect
+from resilience import RetryPolicy
+from result_cache import load_result_cache
+from routing import Router
+
+# Init stage shared by the handlers: runs once per execution
+# environment, during the Lambda init phase. Module-level state survives
+# across warm invocations.
+
+CONFIG = load_config(os.environ)
+SESSION = create_session(CONFIG.region)
+BROKER = CredentialBroker(
+    SESSION,
+    CONFIG.targets,
+    max_entries=CONFIG.broker_max_entries,
+    idle_seconds=CONFIG.broker_idle_seconds,
+    token_max_age=timedelta(seconds=CONFIG.token_max_age_seconds),
+)
+METRICS = Recorder(
+    CONFIG.metrics_namespace,
+    mode=CONFIG.metrics_mode,
+    subsegments=CONFIG.trace_subsegments,
+)
+PINNING = PinningGuard(CONFIG.pinning_policy)
+# Reset from the Lambda context at the start of every invocation.
+DEADLINE = Deadline(CONFIG.deadline_margin_ms / 1000)
+RETRY_POLICY = RetryPolicy(attempts=CONFIG.connect_attempts)
+# None unless RESULT_CACHE turns the query result cache on.
+RESULT_CACHE = load_result_cache(
+    CONFIG.result_cache,
+    CONFIG.result_cache_max_bytes,
+    CONFIG.result_cache_ttl_seconds,
+)
+
+
+def auth_token(target=DEFAULT_TARGET, hostname=None):
+    return BROKER.auth_token(target, hostname, metrics=METRICS)
+
+
+def invalidate_auth_token(target=DEFAULT_TARGET, hostname=None):
+    BROKER.invalidate_auth_token(target, hostname)
+
+
+def cache_stats():
+    return BROKER.stats
+
+
+def _connection_holder(target, hostname):
+    return ConnectionHolder(
+        password_provider=partial(auth_token, target.name, hostname),
+        on_auth_failure=partial(invalidate_auth_token, target.name, hostname),
+        metrics=METRICS,
+        connect_timeout=CONFIG.connect_timeout_seconds,
+        retry_policy=RETRY_POLICY,
+        breaker=(
+            CircuitBreaker(
+                CONFIG.circuit_breaker_failures,
+                CONFIG.circuit_breaker_reset_seconds,
+            )
+            if CONFIG.circuit_breaker_failures
+            else None
+        ),
+        hedge=HedgedConnect() if CONFIG.connect_hedge else None,
+        deadline=DEADLINE,
+        host=hostname,
+        port=target.port,
+        database=target.database,
+        user=target.user,
+        sslmode=CONFIG.sslmode,
+    )
+
+
+def _router(target):
+    return Router(
+        read_write=_connection_holder(target, target.endpoint),
+        read_only=(
+            _connection_holder(target, target.read_only_endpoint)
+            if target.read_only_endpoint
+            else None
+        ),
+        read_your_writes_seconds=CONFIG.read_your_writes_seconds,
+    )
+
+
+# One Router, and so up to two warm connections, per recently used target.
+ROUTERS = BoundedTTLCache(
+    CONFIG.broker_max_entries,
+    CONFIG.broker_idle_seconds,
+    on_evict=Router.close,
+)
+
+
+def router(name):
+    """Returns the Router of a logical database. Raises KeyError for an
+    unknown one."""
+    target = BROKER.target(name)
+    return ROUTERS.get_or_load(name, partial(_router, target))
@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import psycopg2
+from coalesce import coalesce_records
+from coalesce import CoalescedWriter
+from config import DEFAULT_TARGET
+from psycopg2.extensions import QueryCanceledError
+from resilience import CircuitOpenError
+from resilience import DeadlineExceeded
+from routing import READ_WRITE
+from runtime import CONFIG
+from runtime import DEADLINE
+from runtime import METRICS
+from runtime import router
+
+# Init stage
+
+# Builds the sts client and router without fetching credentials or connecting.
+router(DEFAULT_TARGET)
+
+
+# Per-request stage
+
+
+def _batch_response(failed):
+    # With ReportBatchItemFailures, only the messages listed here return to
+    # the queue; every other message of the batch is deleted.
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed],
+    }
+
+
+def handler(event, context):
+
+    DEADLINE.reset(context)
+    records = (event or {}).get("Records", [])
+    try:
+        groups, failed = coalesce_records(records, CONFIG.writer_tables)
+        stats = {
+            "messages": len(records),
+            "coalesced": sum(len(entries) for entries in groups.values()),
+            "unparsed": len(failed),
+        }
+        if not groups:
+            print(stats)
+            return _batch_response(failed)
+
+        try:
+            # Looked up per batch: an idle router is closed and replaced.
+            with router(DEFAULT_TARGET).connection(READ_WRITE) as conn:
+                with DEADLINE.cancel_on_expiry(conn):
+                    with METRICS.phase("write") as phase:
+                        writer = CoalescedWriter(conn, deadline=DEADLINE)
+                        failed += writer.write(groups, CONFIG.writer_tables)
+                        # One transaction for the whole batch: the rows of
+                        # failed messages were rolled back to their savepoints.
+                        conn.commit()
+                        phase.dimensions["Bisected"] = writer.stats["bisections"] > 0
+            stats.update(writer.stats, failed=len(failed), errors=writer.errors)
+        except (
+            CircuitOpenError,
+            DeadlineExceeded,
+            QueryCanceledError,
+            psycopg2.OperationalError,
+            psycopg2.InterfaceError,
+        ) as e:
+            # Nothing was committed; the whole batch is delivered again.
+            failed = [record["messageId"] for record in records]
+            stats.update(failed=len(failed), error=str(e).strip())
+        print(stats)
+        return _batch_response(failed)
+    finally:
+        METRICS.flush()
@@ -0,0 +1,88 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+# RDS IAM auth tokens are valid for 15 minutes after signing.
+TOKEN_LIFETIME = timedelta(minutes=15)
+
+# Tokens are treated as expired once they are this old, well ahead of
+# TOKEN_LIFETIME, so that a reconnect never presents a token that is about to
+# expire.
+TOKEN_MAX_AGE = timedelta(minutes=10)
+
+
+class AuthTokenCache:
+    """Caches RDS IAM auth tokens per (endpoint, port, user, region,
+    credential identity).
+
+    Expiry is lazy: nothing re-signs a token in the background. An entry
+    expires at `max_age`, or earlier if its credentials enter the credential
+    cache's refresh margin, and the first `get` after that signs a new token.
+    Because that point comes before the token's real 15 minute lifetime, the
+    token handed out is never close to expiry."""
+
+    def __init__(self, credential_cache, max_age=TOKEN_MAX_AGE):
+        self.credential_cache = credential_cache
+        self.max_age = min(max_age, TOKEN_LIFETIME)
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0}
+
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def _refresh_at(self, signed_at, credentials):
+        # A token is only as good as the credentials that signed it.
+        credentials_refresh_at = (
+            credentials["Expiration"] - self.credential_cache.refresh_margin
+        )
+        return min(signed_at + self.max_age, credentials_refresh_at)
+
+    def get(self, hostname, port, username, region, signer=None):
+        """Returns a token, signed with `signer`, a (credentials, rds client)
+        pair from the credential cache, if the caller already holds one."""
+        credentials, client = signer or self.credential_cache.get_rds_client()
+        key = (hostname, int(port), username, region, credentials["AccessKeyId"])
+        now = datetime.now(timezone.utc)
+
+        entry = self._tokens.get(key)
+        if entry is not None and entry[1] > now:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None and entry[1] > now:
+                self.stats["hits"] += 1
+                return entry[0]
+
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["refreshes"] += 1
+
+            token = client.generate_db_auth_token(
+                DBHostname=hostname,
+                Port=int(port),
+                DBUsername=username,
+                Region=region,
+            )
+
+            # Drop tokens that are stale or were signed with rotated credentials.
+            self._tokens = {
+                k: v
+                for k, v in self._tokens.items()
+                if v[1] > now and k[4] == credentials["AccessKeyId"]
+            }
+            self._tokens[key] = (token, self._refresh_at(now, credentials))
+            return token
+
+    def invalidate(self, hostname=None):
+        with self._lock:
+            self._tokens = {
+                k: v
+                for k, v in self._tokens.items()
+                if hostname is not None and k[0] != hostname
+            }
@@ -0,0 +1,38 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import traceback
+
+# "on-demand", "provisioned-concurrency" or "snap-start", set by Lambda.
+INITIALIZATION_TYPE = os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE", "on-demand")
+
+
+def _run(hook):
+    # A failed warmup only means the first invocation does the work itself.
+    try:
+        hook()
+    except Exception:
+        traceback.print_exc()
+
+
+def register(before_snapshot, after_restore):
+    """Runs `before_snapshot` and `after_restore` at the points where the
+    execution environment can do work ahead of its first invocation.
+
+    With SnapStart they become the runtime's snapshot hooks: `before_snapshot`
+    should only load state that is safe to copy into many environments, and
+    `after_restore` re-establishes credentials and connections, which must
+    not be shared between them. With provisioned concurrency both run now,
+    during the pre-provisioned init. On-demand environments skip them, so
+    their cold start does not grow.
+    """
+    if INITIALIZATION_TYPE == "snap-start":
+        from snapshot_restore_py import register_after_restore
+        from snapshot_restore_py import register_before_snapshot
+
+        register_before_snapshot(_run, before_snapshot)
+        register_after_restore(_run, after_restore)
+    elif INITIALIZATION_TYPE == "provisioned-concurrency":
+        _run(before_snapshot)
+        _run(after_restore)
@@ -1,15 +1,20 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
+import json
+
 from aws_cdk import Aws as Aws
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_kms as kms
 from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_lambda_event_sources as lambda_event_sources
 from aws_cdk import aws_logs as logs
 from aws_cdk import aws_ram as ram
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_s3_deployment as s3deploy
+from aws_cdk import aws_sqs as sqs
+from aws_cdk import custom_resources as cr
 from aws_cdk import CfnOutput
 from aws_cdk import Duration
 from aws_cdk import Fn
@@ -39,14 +44,131 @@ class ApplicationStack(Stack):
         application_rds_proxy_endpoint = self.node.try_get_context(
             "application_rds_proxy_endpoint",
         )
+        application_rds_proxy_read_only_endpoint = (
+            self.node.try_get_context("application_rds_proxy_read_only_endpoint")
+            or ""
+        )
         application_vpc_cidr = self.node.try_get_context("application_vpc_cidr")
         database_username = self.node.try_get_context("database_username")
         database_name = self.node.try_get_context("database_name")
         python_version = self.node.try_get_context("python_version")
+        lambda_architecture = self.node.try_get_context("lambda_architecture") or "x86_64"
+        connectiontest_handler_mode = (
+            self.node.try_get_context("connectiontest_handler_mode") or "sync"
+        )
+        # Additional logical databases the function can reach, each with its
+        # own role_arn, endpoint, user and database.
+        application_database_targets = (
+            self.node.try_get_context("application_database_targets") or {}
+        )
+        application_network_mode = (
+            self.node.try_get_context("application_network_mode") or "nat"
+        )
+        connectiontest_start_mode = (
+            self.node.try_get_context("connectiontest_start_mode") or "on_demand"
+        )
+        connectiontest_provisioned_concurrency = {
+            "min_capacity": 1,
+            "max_capacity": 4,
+            "utilization_target": 0.7,
+            **(self.node.try_get_context("connectiontest_provisioned_concurrency") or {}),
+        }
+        # Tables maps each table the queue writer may insert into to its
+        # conflict "key" columns and "on_conflict" action ("nothing" or
+        # "update").
+        sqs_writer = {
+            "enabled": False,
+            "batch_size": 100,
+            "max_batching_window_seconds": 5,
+            "max_concurrency": 2,
+            "max_receive_count": 5,
+            "tables": {},
+            **(self.node.try_get_context("sqs_writer") or {}),
+        }
 
         database_account_rdsdb_connect_role_arn = f"arn:{Aws.PARTITION}:iam::{database_account_id}:role/{database_account_rdsdb_connect_role_name}"
 
         POSTGRESQL_PORT = 5432
+        CONNECTIONTEST_HANDLERS = {
+            "sync": "connection_test.handler",
+            "async": "connection_test_async.handler",
+        }
+
+        # nat: AWS API calls leave through a NAT gateway.
+        # endpoints: STS is reached through an interface VPC endpoint.
+        # isolated: as endpoints, in isolated subnets without a NAT gateway.
+        APPLICATION_NETWORK_MODES = ("nat", "endpoints", "isolated")
+        CONNECTIONTEST_START_MODES = ("on_demand", "snapstart", "provisioned")
+        CONNECTIONTEST_RESERVED_CONCURRENCY = 5
+        # Every concurrent load holds one proxy connection for up to the
+        # function timeout.
+        INGEST_RESERVED_CONCURRENCY = 2
+        # Layer artifacts are built per architecture by tools/build_layer.py.
+        LAMBDA_ARCHITECTURES = {
+            "x86_64": _lambda.Architecture.X86_64,
+            "arm64": _lambda.Architecture.ARM_64,
+        }
+
+        if connectiontest_handler_mode not in CONNECTIONTEST_HANDLERS:
+            raise ValueError(
+                f"connectiontest_handler_mode must be one of {sorted(CONNECTIONTEST_HANDLERS)}",
+            )
+
+        if application_network_mode not in APPLICATION_NETWORK_MODES:
+            raise ValueError(
+                f"application_network_mode must be one of {list(APPLICATION_NETWORK_MODES)}",
+            )
+
+        if lambda_architecture not in LAMBDA_ARCHITECTURES:
+            raise ValueError(
+                f"lambda_architecture must be one of {list(LAMBDA_ARCHITECTURES)}",
+            )
+
+        if connectiontest_start_mode not in CONNECTIONTEST_START_MODES:
+            raise ValueError(
+                f"connectiontest_start_mode must be one of {list(CONNECTIONTEST_START_MODES)}",
+            )
+
+        if connectiontest_start_mode == "snapstart" and tuple(
+            int(part) for part in str(python_version).split(".")
+        ) < (3, 12):
+            raise ValueError("SnapStart requires python_version 3.12 or later")
+
+        if connectiontest_start_mode == "provisioned" and not (
+            1
+            <= connectiontest_provisioned_concurrency["min_capacity"]
+            <= connectiontest_provisioned_concurrency["max_capacity"]
+            <= CONNECTIONTEST_RESERVED_CONCURRENCY
+        ):
+            raise ValueError(
+                "connectiontest_provisioned_concurrency needs 1 <= min_capacity <= max_capacity "
+                f"<= {CONNECTIONTEST_RESERVED_CONCURRENCY} (the function's reserved concurrency)",
+            )
+
+        if sqs_writer["enabled"]:
+            if not sqs_writer["tables"]:
+                raise ValueError("sqs_writer needs at least one table when enabled")
+            if not 1 <= sqs_writer["batch_size"] <= 10000:
+                raise ValueError("sqs_writer batch_size must be between 1 and 10000")
+            if not 0 <= sqs_writer["max_batching_window_seconds"] <= 300:
+                raise ValueError(
+                    "sqs_writer max_batching_window_seconds must be between 0 and 300",
+                )
+            if (
+                sqs_writer["batch_size"] > 10
+                and sqs_writer["max_batching_window_seconds"] < 1
+            ):
+                raise ValueError(
+                    "sqs_writer batch_size above 10 needs max_batching_window_seconds >= 1",
+                )
+            if not 2 <= sqs_writer["max_concurrency"] <= 1000:
+                raise ValueError("sqs_writer max_concurrency must be between 2 and 1000")
+
+        application_subnet_type = (
+            ec2.SubnetType.PRIVATE_ISOLATED
+            if application_network_mode == "isolated"
+            else ec2.SubnetType.PRIVATE_WITH_EGRESS
+        )
 
         # Networking
 
@@ -68,12 +190,18 @@ class ApplicationStack(Stack):
                 ec2.SubnetConfiguration(
                     name="application",
                     cidr_mask=27,
-                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
+                    subnet_type=application_subnet_type,
                 ),
-                ec2.SubnetConfiguration(
-                    name="public",
-                    cidr_mask=27,
-                    subnet_type=ec2.SubnetType.PUBLIC,
+                *(
+                    []
+                    if application_network_mode == "isolated"
+                    else [
+                        ec2.SubnetConfiguration(
+                            name="public",
+                            cidr_mask=27,
+                            subnet_type=ec2.SubnetType.PUBLIC,
+                        ),
+                    ]
                 ),
             ],
         )
@@ -87,10 +215,10 @@ class ApplicationStack(Stack):
         )
 
         application_subnet_selection = ec2.SubnetSelection(
-            subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
+            subnet_type=application_subnet_type,
         )
         application_subnet_ids = application_vpc.select_subnets(
-            subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
+            subnet_type=application_subnet_type,
         ).subnet_ids
 
         application_subnet_arns = []
@@ -102,7 +230,7 @@ class ApplicationStack(Stack):
             self,
             "connectiontest-lambda-sg",
             vpc=application_vpc,
-            description="Security group allowing access from connectiontest lambda to the application RDS proxy endpoint for PostgreSQL traffic and internet for HTTPS traffic",
+            description="Security group allowing access from connectiontest lambda to the application RDS proxy endpoint for PostgreSQL traffic and AWS APIs for HTTPS traffic",
             security_group_name="connectiontest-lambda-sg",
             allow_all_outbound=False,
         )
@@ -113,12 +241,122 @@ class ApplicationStack(Stack):
             description="Allow outbound PostgreSQL access from connectiontest lambda to the RDS database",
         )
 
-        connectiontest_lambda_sg.add_egress_rule(
-            ec2.Peer.any_ipv4(),
-            ec2.Port.tcp(443),
-            description="Allow outbound HTTPS access from connectiontest lambda to the internet",
+        ingest_lambda_sg = ec2.SecurityGroup(
+            self,
+            "ingest-lambda-sg",
+            vpc=application_vpc,
+            description="Security group allowing access from ingest lambda to the application RDS proxy endpoint for PostgreSQL traffic and S3 and AWS APIs for HTTPS traffic",
+            security_group_name="ingest-lambda-sg",
+            allow_all_outbound=False,
         )
 
+        ingest_lambda_sg.add_egress_rule(
+            ec2.Peer.ipv4(application_vpc.vpc_cidr_block),
+            ec2.Port.tcp(POSTGRESQL_PORT),
+            description="Allow outbound PostgreSQL access from ingest lambda to the RDS database",
+        )
+
+        if application_network_mode == "nat":
+            connectiontest_lambda_sg.add_egress_rule(
+                ec2.Peer.any_ipv4(),
+                ec2.Port.tcp(443),
+                description="Allow outbound HTTPS access from connectiontest lambda to the internet",
+            )
+
+            ingest_lambda_sg.add_egress_rule(
+                ec2.Peer.any_ipv4(),
+                ec2.Port.tcp(443),
+                description="Allow outbound HTTPS access from ingest lambda to S3 and AWS APIs",
+            )
+        else:
+            sts_endpoint_sg = ec2.SecurityGroup(
+                self,
+                "sts-endpoint-sg",
+                vpc=application_vpc,
+                description="Security group allowing HTTPS access from connectiontest lambda to the STS interface endpoint",
+                security_group_name="sts-endpoint-sg",
+                allow_all_outbound=False,
+            )
+
+            sts_endpoint_sg.add_ingress_rule(
+                connectiontest_lambda_sg,
+                ec2.Port.tcp(443),
+                description="Allow inbound HTTPS access from connectiontest lambda",
+            )
+
+            sts_endpoint_sg.add_ingress_rule(
+                ingest_lambda_sg,
+                ec2.Port.tcp(443),
+                description="Allow inbound HTTPS access from ingest lambda",
+            )
+
+            connectiontest_lambda_sg.add_egress_rule(
+                sts_endpoint_sg,
+                ec2.Port.tcp(443),
+                description="Allow outbound HTTPS access from connectiontest lambda to the STS interface endpoint",
+            )
+
+            ingest_lambda_sg.add_egress_rule(
+                sts_endpoint_sg,
+                ec2.Port.tcp(443),
+                description="Allow outbound HTTPS access from ingest lambda to the STS interface endpoint",
+            )
+
+            # S3 is only reachable on its public addresses, which the
+            # AWS-managed prefix list of the region holds. CloudFormation
+            # cannot resolve its ID, so it is looked up at deploy time.
+            s3_prefix_list = cr.AwsCustomResource(
+                self,
+                "s3-prefix-list",
+                on_update=cr.AwsSdkCall(
+                    service="EC2",
+                    action="describeManagedPrefixLists",
+                    parameters={
+                        "Filters": [
+                            {
+                                "Name": "prefix-list-name",
+                                "Values": [f"com.amazonaws.{Aws.REGION}.s3"],
+                            },
+                        ],
+                    },
+                    physical_resource_id=cr.PhysicalResourceId.of(
+                        f"com.amazonaws.{Aws.REGION}.s3",
+                    ),
+                    output_paths=["PrefixLists.0.PrefixListId"],
+                ),
+                policy=cr.AwsCustomResourcePolicy.from_sdk_calls(
+                    resources=cr.AwsCustomResourcePolicy.ANY_RESOURCE,
+                ),
+                install_latest_aws_sdk=False,
+            )
+
+            ingest_lambda_sg.add_egress_rule(
+                ec2.Peer.prefix_list(
+                    s3_prefix_list.get_response_field("PrefixLists.0.PrefixListId"),
+                ),
+                ec2.Port.tcp(443),
+                description="Allow outbound HTTPS access from ingest lambda to S3 through the gateway endpoint",
+            )
+
+            # With private DNS, the regional STS hostname resolves to the
+            # endpoint's addresses in the application subnets.
+            application_vpc.add_interface_endpoint(
+                "sts-endpoint",
+                service=ec2.InterfaceVpcEndpointAwsService.STS,
+                subnets=application_subnet_selection,
+                security_groups=[sts_endpoint_sg],
+                private_dns_enabled=True,
+                open=False,
+            )
+
+            # Routes S3 traffic, such as the ingest lambda's ranged GETs,
+            # through the VPC's route tables instead of a NAT gateway.
+            application_vpc.add_gateway_endpoint(
+                "s3-endpoint",
+                service=ec2.GatewayVpcEndpointAwsService.S3,
+                subnets=[application_subnet_selection],
+            )
+
         # RAM
 
         ram.CfnResourceShare(
@@ -136,7 +374,7 @@ class ApplicationStack(Stack):
             self,
             "connectiontest-lambda-role",
             role_name=connectiontest_lambda_role_name,
-            description="IAM role for the ConnectionTest Lambda function",
+            description="IAM role for the ConnectionTest and ingest Lambda functions",
             assumed_by=iam.ServicePrincipal("lambda.amazonaws.com"),
         )
 
@@ -154,6 +392,12 @@ class ApplicationStack(Stack):
                         ],
                         resources=[
                             database_account_rdsdb_connect_role_arn,
+                            *sorted(
+                                {
+                                    target["role_arn"]
+                                    for target in application_database_targets.values()
+                                },
+                            ),
                         ],
                     ),
                 ],
@@ -225,7 +469,7 @@ class ApplicationStack(Stack):
             "psycopg2-s3-deployment",
             sources=[
                 s3deploy.Source.asset(
-                    "assets/layers/psycopg2/layer.zip",
+                    f"assets/layers/psycopg2/layer-{lambda_architecture}.zip",
                 ),
             ],
             destination_bucket=layer_bucket,
@@ -249,17 +493,64 @@ class ApplicationStack(Stack):
             compatible_runtimes=[
                 python_runtime,
             ],
-            compatible_architectures=[_lambda.Architecture.X86_64],
+            compatible_architectures=[LAMBDA_ARCHITECTURES[lambda_architecture]],
         )
 
-        _lambda.Function(
+        connectiontest_layers = [psycopg2_layer]
+
+        if connectiontest_handler_mode == "async":
+            asyncpg_s3_deployment = s3deploy.BucketDeployment(
+                self,
+                "asyncpg-s3-deployment",
+                sources=[
+                    s3deploy.Source.asset(
+                        f"assets/layers/asyncpg/layer-{lambda_architecture}.zip",
+                    ),
+                ],
+                destination_bucket=layer_bucket,
+                destination_key_prefix="layers/asyncpg",
+                extract=False,
+                memory_limit=1024,
+            )
+
+            asyncpg_destination_key = Fn.select(0, asyncpg_s3_deployment.object_keys)
+
+            # The asyncpg handler still imports the shared psycopg2 modules.
+            connectiontest_layers = [
+                psycopg2_layer,
+                _lambda.LayerVersion(
+                    self,
+                    "asyncpg-layer",
+                    layer_version_name="asyncpg",
+                    code=_lambda.Code.from_bucket(
+                        layer_bucket,
+                        f"layers/asyncpg/{asyncpg_destination_key}",
+                    ),
+                    compatible_runtimes=[
+                        python_runtime,
+                    ],
+                    compatible_architectures=[LAMBDA_ARCHITECTURES[lambda_architecture]],
+                ),
+            ]
+
+        database_environment = {
+            "DATABASE_ACCOUNT_IAM_ROLE": database_account_rdsdb_connect_role_arn,
+            "RDS_PROXY_APPLICATION_ENDPOINT": application_rds_proxy_endpoint,
+            "RDS_PROXY_READ_ONLY_ENDPOINT": application_rds_proxy_read_only_endpoint,
+            "DB_USERNAME": database_username,
+            "DBNAME": database_name,
+            "DATABASE_TARGETS": json.dumps(application_database_targets),
+        }
+
+        connectiontest_lambda = _lambda.Function(
             self,
             "connectiontest-lambda",
             runtime=python_runtime,
+            architecture=LAMBDA_ARCHITECTURES[lambda_architecture],
             code=_lambda.Code.from_asset("assets/lambda/code/"),
             function_name="connectiontest-lambda",
-            handler="connection_test.handler",
-            layers=[psycopg2_layer],
+            handler=CONNECTIONTEST_HANDLERS[connectiontest_handler_mode],
+            layers=connectiontest_layers,
             memory_size=1024,
             timeout=Duration.seconds(30),
             role=connectiontest_lambda_role,
@@ -267,19 +558,184 @@ class ApplicationStack(Stack):
             vpc_subnets=application_subnet_selection,
             security_groups=[connectiontest_lambda_sg],
             tracing=_lambda.Tracing.ACTIVE,
-            reserved_concurrent_executions=5,
+            reserved_concurrent_executions=CONNECTIONTEST_RESERVED_CONCURRENCY,
+            environment=database_environment,
+        )
+
+        if connectiontest_start_mode != "on_demand":
+            if connectiontest_start_mode == "snapstart":
+                # The L2 construct only accepts SnapStart for Java runtimes.
+                connectiontest_lambda.node.default_child.add_property_override(
+                    "SnapStart",
+                    {"ApplyOn": "PublishedVersions"},
+                )
+
+            # SnapStart and provisioned concurrency only apply to published
+            # versions; invoke the function through the alias.
+            connectiontest_lambda_alias = _lambda.Alias(
+                self,
+                "connectiontest-lambda-alias",
+                alias_name="live",
+                version=connectiontest_lambda.current_version,
+                provisioned_concurrent_executions=(
+                    connectiontest_provisioned_concurrency["min_capacity"]
+                    if connectiontest_start_mode == "provisioned"
+                    else None
+                ),
+            )
+
+            if connectiontest_start_mode == "provisioned":
+                connectiontest_lambda_alias.add_auto_scaling(
+                    min_capacity=connectiontest_provisioned_concurrency["min_capacity"],
+                    max_capacity=connectiontest_provisioned_concurrency["max_capacity"],
+                ).scale_on_utilization(
+                    utilization_target=connectiontest_provisioned_concurrency[
+                        "utilization_target"
+                    ],
+                )
+
+            CfnOutput(
+                self,
+                "ConnectionTestLambdaAlias",
+                value=connectiontest_lambda_alias.function_arn,
+                description="ARN of the connectiontest-lambda alias to invoke",
+            )
+
+        # Ingest
+
+        ingest_bucket_name_id = f"ingest-bucket-{Stack.of(self).account}"
+
+        ingest_bucket_key = kms.Key(
+            self,
+            "ingest-bucket-key",
+            removal_policy=RemovalPolicy.DESTROY,
+            alias=f"alias/{ingest_bucket_name_id}-kms-key",
+            description="KMS Key to encrypt the ingest bucket",
+            enable_key_rotation=True,
+        )
+
+        ingest_bucket = s3.Bucket(
+            self,
+            id=ingest_bucket_name_id,
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.KMS,
+            encryption_key=ingest_bucket_key,
+            removal_policy=RemovalPolicy.DESTROY,
+            enforce_ssl=True,
+            bucket_name=ingest_bucket_name_id,
+            auto_delete_objects=True,
+            versioned=False,
+        )
+
+        # The database account only trusts the connectiontest role to assume
+        # its connect role, so the ingest function shares it.
+        ingest_bucket.grant_read(connectiontest_lambda_role)
+
+        ingest_lambda = _lambda.Function(
+            self,
+            "ingest-lambda",
+            runtime=python_runtime,
+            architecture=LAMBDA_ARCHITECTURES[lambda_architecture],
+            code=_lambda.Code.from_asset("assets/lambda/code/"),
+            function_name="ingest-lambda",
+            handler="ingest.handler",
+            layers=[psycopg2_layer],
+            memory_size=1024,
+            timeout=Duration.minutes(15),
+            role=connectiontest_lambda_role,
+            vpc=application_vpc,
+            vpc_subnets=application_subnet_selection,
+            security_groups=[ingest_lambda_sg],
+            tracing=_lambda.Tracing.ACTIVE,
+            reserved_concurrent_executions=INGEST_RESERVED_CONCURRENCY,
             environment={
-                "DATABASE_ACCOUNT_IAM_ROLE": database_account_rdsdb_connect_role_arn,
-                "RDS_PROXY_APPLICATION_ENDPOINT": application_rds_proxy_endpoint,
-                "DB_USERNAME": database_username,
-                "DBNAME": database_name,
+                **database_environment,
+                "INGEST_BUCKET": ingest_bucket.bucket_name,
+                "METRICS_NAMESPACE": "Ingest",
             },
         )
 
+        # Queue writer
+
+        if sqs_writer["enabled"]:
+            sqs_writer_queue_key = kms.Key(
+                self,
+                "writer-queue-key",
+                removal_policy=RemovalPolicy.DESTROY,
+                alias="alias/writer-queue-kms-key",
+                description="KMS Key to encrypt the writer queue and its dead-letter queue",
+                enable_key_rotation=True,
+            )
+
+            sqs_writer_dlq = sqs.Queue(
+                self,
+                "writer-dlq",
+                queue_name="writer-dlq",
+                encryption=sqs.QueueEncryption.KMS,
+                encryption_master_key=sqs_writer_queue_key,
+                enforce_ssl=True,
+                retention_period=Duration.days(14),
+            )
+
+            sqs_writer_queue = sqs.Queue(
+                self,
+                "writer-queue",
+                queue_name="writer-queue",
+                encryption=sqs.QueueEncryption.KMS,
+                encryption_master_key=sqs_writer_queue_key,
+                enforce_ssl=True,
+                # Six times the function timeout, so that messages are not
+                # delivered again while a batch is still being retried.
+                visibility_timeout=Duration.seconds(180),
+                dead_letter_queue=sqs.DeadLetterQueue(
+                    max_receive_count=sqs_writer["max_receive_count"],
+                    queue=sqs_writer_dlq,
+                ),
+            )
+
+            sqs_writer_lambda = _lambda.Function(
+                self,
+                "writer-lambda",
+                runtime=python_runtime,
+                architecture=LAMBDA_ARCHITECTURES[lambda_architecture],
+                code=_lambda.Code.from_asset("assets/lambda/code/"),
+                function_name="writer-lambda",
+                handler="sqs_writer.handler",
+                layers=[psycopg2_layer],
+                memory_size=512,
+                timeout=Duration.seconds(30),
+                role=connectiontest_lambda_role,
+                vpc=application_vpc,
+                vpc_subnets=application_subnet_selection,
+                security_groups=[connectiontest_lambda_sg],
+                tracing=_lambda.Tracing.ACTIVE,
+                # Every concurrent batch holds one proxy connection.
+                reserved_concurrent_executions=sqs_writer["max_concurrency"],
+                environment={
+                    **database_environment,
+                    "WRITER_TABLES": json.dumps(sqs_writer["tables"]),
+                    "METRICS_NAMESPACE": "Writer",
+                },
+            )
+
+            sqs_writer_lambda.add_event_source(
+                lambda_event_sources.SqsEventSource(
+                    sqs_writer_queue,
+                    batch_size=sqs_writer["batch_size"],
+                    max_batching_window=Duration.seconds(
+                        sqs_writer["max_batching_window_seconds"],
+                    ),
+                    max_concurrency=sqs_writer["max_concurrency"],
+                    report_batch_item_failures=True,
+                ),
+            )
+
         # CFN Outputs
 
         subnet_ids_output_string = ""
-        for subnet_id in application_vpc.private_subnets:
+        for subnet_id in application_vpc.select_subnets(
+            subnet_type=application_subnet_type,
+        ).subnets:
             subnet_ids_output_string += subnet_id.subnet_id + ","
 
         CfnOutput(
@@ -295,3 +751,32 @@ class ApplicationStack(Stack):
             value=subnet_ids_output_string,
             description="Subnet IDs",
         )
+
+        CfnOutput(
+            self,
+            "IngestBucketName",
+            value=ingest_bucket.bucket_name,
+            description="Bucket the ingest lambda loads objects from",
+        )
+
+        CfnOutput(
+            self,
+            "IngestLambdaName",
+            value=ingest_lambda.function_name,
+            description="Name of the ingest lambda to invoke",
+        )
+
+        if sqs_writer["enabled"]:
+            CfnOutput(
+                self,
+                "WriterQueueUrl",
+                value=sqs_writer_queue.queue_url,
+                description="Queue the writer lambda inserts messages from",
+            )
+
+            CfnOutput(
+                self,
+                "WriterDeadLetterQueueUrl",
+                value=sqs_writer_dlq.queue_url,
+                description="Queue of the messages the writer lambda failed to insert",
+            )
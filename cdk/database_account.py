@@ -1,7 +1,9 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
+from aws_cdk import Annotations
 from aws_cdk import Aws as Aws
+from aws_cdk import aws_applicationautoscaling as appscaling
 from aws_cdk import aws_ec2 as ec2
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_logs as logs
@@ -13,6 +15,8 @@ from aws_cdk import RemovalPolicy
 from aws_cdk import Stack
 from constructs import Construct
 
+from cdk.proxy_sizing import annotate
+
 
 class DatabaseStack(Stack):
     def __init__(
@@ -38,9 +42,61 @@ class DatabaseStack(Stack):
         database_account_rdsdb_connect_role_name = self.node.try_get_context(
             "database_account_rdsdb_connect_role_name",
         )
+        database_capacity = {
+            "min_acu": 0.5,
+            "max_acu": 10,
+            **(self.node.try_get_context("database_capacity") or {}),
+        }
+        database_readers = {
+            "count": 1,
+            "scale_with_writer": True,
+            "promotion_tiers": [],
+            "availability_zones": [],
+            **(self.node.try_get_context("database_readers") or {}),
+        }
+        reader_autoscaling = {
+            "max_count": 0,
+            "metric": "cpu",
+            "target_value": 60,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 300,
+            **database_readers.get("autoscaling", {}),
+        }
+        rds_proxy_settings = {
+            "max_connections_percent": 90,
+            "max_idle_connections_percent": 50,
+            "borrow_timeout_seconds": 20,
+            "idle_client_timeout_seconds": 1800,
+            "init_query": "",
+            "session_pinning_filters": [],
+            **(self.node.try_get_context("rds_proxy_settings") or {}),
+        }
+        # Expected load from the application account, for the sizing checks.
+        connection_sizing = {
+            "lambda_concurrency": 5,
+            "connections_per_environment": 2,
+            "lambda_timeout_seconds": 30,
+            **(self.node.try_get_context("connection_sizing") or {}),
+        }
 
         connectiontest_lambda_role_arn = f"arn:{Aws.PARTITION}:iam::{application_account_id}:role/{connectiontest_lambda_role_name}"
         POSTGRESQL_PORT = 5432
+        READER_SCALING_METRICS = {
+            "cpu": appscaling.PredefinedMetric.RDS_READER_AVERAGE_CPU_UTILIZATION,
+            "connections": appscaling.PredefinedMetric.RDS_READER_AVERAGE_DATABASE_CONNECTIONS,
+        }
+
+        if reader_autoscaling["metric"] not in READER_SCALING_METRICS:
+            raise ValueError(
+                f"database_readers autoscaling metric must be one of {list(READER_SCALING_METRICS)}",
+            )
+
+        if reader_autoscaling["max_count"] and not (
+            database_readers["count"] <= reader_autoscaling["max_count"] <= 15
+        ):
+            raise ValueError(
+                "database_readers autoscaling max_count must be between count and 15",
+            )
         stack_output_dict = {}
 
         # Networking
@@ -124,15 +180,63 @@ class DatabaseStack(Stack):
             iam_authentication=True,
             security_groups=[rds_sg],
             monitoring_interval=Duration.seconds(60),
-            serverless_v2_max_capacity=10,
-            serverless_v2_min_capacity=0.5,
+            serverless_v2_max_capacity=database_capacity["max_acu"],
+            serverless_v2_min_capacity=database_capacity["min_acu"],
             storage_encrypted=True,
             vpc=database_vpc,
             vpc_subnets=database_subnet_selection,
             writer=rds.ClusterInstance.serverless_v2("writer"),
+            readers=[
+                rds.ClusterInstance.serverless_v2(
+                    f"reader{index + 1}",
+                    scale_with_writer=database_readers["scale_with_writer"],
+                )
+                for index in range(database_readers["count"])
+            ],
             default_database_name=database_name,
         )
 
+        # The L2 ClusterInstance derives the promotion tier from
+        # scale_with_writer and has no availability zone option.
+        for index in range(database_readers["count"]):
+            reader = db_cluster.node.find_child(f"reader{index + 1}").node.default_child
+            if index < len(database_readers["promotion_tiers"]):
+                reader.promotion_tier = database_readers["promotion_tiers"][index]
+            if database_readers["availability_zones"]:
+                reader.availability_zone = database_readers["availability_zones"][
+                    index % len(database_readers["availability_zones"])
+                ]
+
+        if reader_autoscaling["max_count"]:
+            # Aurora adds and removes replicas of its own beyond the readers
+            # above; it never removes the ones it did not create.
+            reader_scaling_target = appscaling.ScalableTarget(
+                self,
+                "ReaderAutoScalingTarget",
+                service_namespace=appscaling.ServiceNamespace.RDS,
+                scalable_dimension="rds:cluster:ReadReplicaCount",
+                resource_id=f"cluster:{db_cluster.cluster_identifier}",
+                min_capacity=database_readers["count"],
+                max_capacity=reader_autoscaling["max_count"],
+                role=iam.Role.from_role_arn(
+                    self,
+                    "ReaderAutoScalingRole",
+                    f"arn:{Aws.PARTITION}:iam::{Aws.ACCOUNT_ID}:role/aws-service-role/rds.application-autoscaling.amazonaws.com/AWSServiceRoleForApplicationAutoScaling_RDSCluster",
+                ),
+            )
+
+            reader_scaling_target.scale_to_track_metric(
+                "ReaderTargetTracking",
+                predefined_metric=READER_SCALING_METRICS[reader_autoscaling["metric"]],
+                target_value=reader_autoscaling["target_value"],
+                scale_in_cooldown=Duration.seconds(
+                    reader_autoscaling["scale_in_cooldown_seconds"],
+                ),
+                scale_out_cooldown=Duration.seconds(
+                    reader_autoscaling["scale_out_cooldown_seconds"],
+                ),
+            )
+
         db_cluster.secret.add_rotation_schedule(
             "RotationSchedule",
             automatically_after=Duration.days(30),
@@ -150,8 +254,35 @@ class DatabaseStack(Stack):
             iam_auth=True,
             vpc_subnets=database_subnet_selection,
             security_groups=[rds_proxy_sg],
+            max_connections_percent=rds_proxy_settings["max_connections_percent"],
+            max_idle_connections_percent=rds_proxy_settings[
+                "max_idle_connections_percent"
+            ],
+            borrow_timeout=Duration.seconds(
+                rds_proxy_settings["borrow_timeout_seconds"],
+            ),
+            idle_client_timeout=Duration.seconds(
+                rds_proxy_settings["idle_client_timeout_seconds"],
+            ),
+            init_query=rds_proxy_settings["init_query"] or None,
+            session_pinning_filters=[
+                rds.SessionPinningFilter.of(filter_name)
+                for filter_name in rds_proxy_settings["session_pinning_filters"]
+            ],
         )
 
+        annotate(db_proxy, database_capacity, rds_proxy_settings, connection_sizing)
+
+        if (
+            "READ_ONLY" in target_roles.split(",")
+            and not database_readers["count"]
+            and not reader_autoscaling["max_count"]
+        ):
+            Annotations.of(db_proxy).add_warning(
+                "The READ_ONLY proxy endpoint has no readers to route to; set "
+                "database_readers count or autoscaling max_count",
+            )
+
         # IAM
 
         cross_account_rds_connect_role = iam.Role(
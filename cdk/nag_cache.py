@@ -0,0 +1,160 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from importlib.metadata import version
+
+import jsii
+from aws_cdk import Annotations
+from aws_cdk import Aspects
+from aws_cdk import IAspect
+
+# Findings are annotations whose message starts with a rule pack prefix.
+NAG_MESSAGE_PREFIXES = ("AwsSolutions-", "NIST.800.53.R5-", "CdkNagValidationFailure")
+
+# Asset hashes and the version IDs derived from them change with every code
+# edit but never with a rule outcome.
+ASSET_HASH = re.compile(r"[0-9a-f]{64}|(?<=CurrentVersion)[0-9A-F]{8}[0-9a-f]{32}")
+
+
+@jsii.implements(IAspect)
+class _TimedAspect:
+    def __init__(self, pack, timings, stack_name):
+        self.pack = pack
+        self.timings = timings
+        self.stack_name = stack_name
+
+    def visit(self, node):
+        start = time.perf_counter()
+        self.pack.visit(node)
+        self.timings[self.stack_name] += time.perf_counter() - start
+
+
+def template_hash(template, pack_factories):
+    """Hashes what a stack's nag findings depend on: its template, which
+    carries the nag suppressions as metadata, the rule packs and the cdk-nag
+    version."""
+    digest = hashlib.sha256()
+    digest.update(version("cdk-nag").encode())
+    digest.update(",".join(factory.__name__ for factory in pack_factories).encode())
+    digest.update(ASSET_HASH.sub("", json.dumps(template, sort_keys=True)).encode())
+    return digest.hexdigest()
+
+
+def _load(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _replay(stack, findings):
+    nodes = {f"/{node.node.path}": node for node in stack.node.find_all()}
+    for finding in findings:
+        annotations = Annotations.of(nodes.get(finding["path"], stack))
+        if finding["level"] == "error":
+            annotations.add_error(finding["message"])
+        else:
+            annotations.add_warning(finding["message"])
+
+
+def _findings(artifact):
+    return [
+        {
+            "path": message.id,
+            "level": message.level.value.lower(),
+            "message": str(message.entry.data),
+        }
+        for message in artifact.messages
+        if message.level.value.lower() in ("error", "warning")
+        and str(message.entry.data).startswith(NAG_MESSAGE_PREFIXES)
+    ]
+
+
+def synth(app, stacks, pack_factories, cache_path, use_cache=True):
+    """Synthesizes `app`, running the cdk-nag packs only on stacks whose
+    template changed since their findings were cached.
+
+    The app is synthesized once without the packs to hash each template.
+    Stale stacks then get the packs as aspects; the cached findings of the
+    others are added back as annotations, and the app is synthesized again.
+    When no stack is stale and none has findings to add back, the first
+    assembly is returned as is; without `use_cache`, the app is only
+    synthesized with the packs. Prints a timing breakdown to stderr.
+    """
+    first_synth = None
+    cache, hashes = {}, {}
+    if use_cache:
+        start = time.perf_counter()
+        assembly = app.synth()
+        first_synth = time.perf_counter() - start
+
+        cache = _load(cache_path)
+        hashes = {
+            stack.stack_name: template_hash(
+                assembly.get_stack_by_name(stack.stack_name).template,
+                pack_factories,
+            )
+            for stack in stacks
+        }
+
+    nag_timings = {}
+    stale = []
+    replayed = False
+    for stack in stacks:
+        cached = cache.get(stack.stack_name, {})
+        if use_cache and cached.get("hash") == hashes[stack.stack_name]:
+            _replay(stack, cached["findings"])
+            replayed = replayed or bool(cached["findings"])
+            continue
+        stale.append(stack)
+        nag_timings[stack.stack_name] = 0.0
+        for factory in pack_factories:
+            Aspects.of(stack).add(
+                _TimedAspect(factory(), nag_timings, stack.stack_name),
+            )
+
+    second_synth = None
+    if stale or replayed:
+        start = time.perf_counter()
+        assembly = app.synth(force=True)
+        second_synth = time.perf_counter() - start
+
+    if use_cache:
+        for stack in stale:
+            cache[stack.stack_name] = {
+                "hash": hashes[stack.stack_name],
+                "findings": _findings(assembly.get_stack_by_name(stack.stack_name)),
+            }
+        with open(cache_path, "w") as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+
+    nag_total = sum(nag_timings.values())
+    if first_synth is not None:
+        print(f"synth {first_synth:.2f}s", file=sys.stderr)
+    for stack in stacks:
+        if stack.stack_name in nag_timings:
+            print(
+                f"  nag {stack.stack_name} {nag_timings[stack.stack_name]:.2f}s",
+                file=sys.stderr,
+            )
+        else:
+            print(f"  nag {stack.stack_name} cached", file=sys.stderr)
+    if second_synth is None:
+        print(
+            f"nag findings all cached ({os.path.basename(cache_path)})",
+            file=sys.stderr,
+        )
+    else:
+        print(
+            f"synth with nag {second_synth:.2f}s"
+            f" (nag {nag_total:.2f}s, cache {os.path.basename(cache_path)})",
+            file=sys.stderr,
+        )
+    return assembly
@@ -0,0 +1,135 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+
+from aws_cdk import Annotations
+
+# Aurora PostgreSQL sets max_connections to
+# LEAST({DBInstanceClassMemory/9531392}, 5000). Serverless v2 derives it once,
+# from the memory of the maximum capacity, at 2 GiB per ACU.
+BYTES_PER_CONNECTION = 9531392
+BYTES_PER_ACU = 2 * 1024**3
+MAX_CONNECTIONS_LIMIT = 5000
+# With a minimum capacity of 0.5 ACU, max_connections is capped lower.
+HALF_ACU_MAX_CONNECTIONS_LIMIT = 2000
+
+# Connections the proxy should leave to the secret rotation function and
+# administrators, who connect to the cluster directly.
+MIN_DIRECT_CONNECTIONS = 10
+
+# An idle Lambda execution environment keeps its connection for minutes; a
+# shorter idle_client_timeout turns most warm invocations into reconnects.
+MIN_IDLE_CLIENT_TIMEOUT_SECONDS = 300
+
+
+def aurora_max_connections(min_acu, max_acu):
+    """Estimates the max_connections of an Aurora PostgreSQL Serverless v2
+    writer from its capacity bounds."""
+    max_connections = min(
+        int(max_acu * BYTES_PER_ACU // BYTES_PER_CONNECTION),
+        MAX_CONNECTIONS_LIMIT,
+    )
+    if min_acu <= 0.5:
+        max_connections = min(max_connections, HALF_ACU_MAX_CONNECTIONS_LIMIT)
+    return max_connections
+
+
+def size_proxy(capacity, proxy_settings, connection_sizing):
+    """Derives the proxy's connection limits and the warnings for settings
+    that could starve the database, the proxy or its clients.
+
+    Returns a (limits, warnings) pair. `capacity` holds min_acu and max_acu,
+    `proxy_settings` the RDS Proxy tuning from context and
+    `connection_sizing` the expected lambda_concurrency,
+    connections_per_environment and lambda_timeout_seconds.
+    """
+    database_connections = aurora_max_connections(
+        capacity["min_acu"],
+        capacity["max_acu"],
+    )
+    max_percent = proxy_settings["max_connections_percent"]
+    idle_percent = proxy_settings["max_idle_connections_percent"]
+    proxy_connections = math.floor(database_connections * max_percent / 100)
+    idle_connections = math.floor(database_connections * idle_percent / 100)
+    # Worst case, every client connection is pinned or inside a transaction
+    # and holds a database connection of its own.
+    client_connections = (
+        connection_sizing["lambda_concurrency"]
+        * connection_sizing["connections_per_environment"]
+    )
+    min_capacity_connections = aurora_max_connections(
+        capacity["min_acu"],
+        capacity["min_acu"],
+    )
+
+    limits = {
+        "database_max_connections": database_connections,
+        "proxy_max_connections": proxy_connections,
+        "proxy_max_idle_connections": idle_connections,
+        "client_connections": client_connections,
+        # Largest concurrency whose connections all fit in the proxy's pool.
+        "max_lambda_concurrency": proxy_connections
+        // connection_sizing["connections_per_environment"],
+    }
+
+    warnings = []
+    if idle_percent > max_percent:
+        warnings.append(
+            f"max_idle_connections_percent ({idle_percent}) is above "
+            f"max_connections_percent ({max_percent}); RDS Proxy rejects this",
+        )
+    if database_connections - proxy_connections < MIN_DIRECT_CONNECTIONS:
+        warnings.append(
+            f"max_connections_percent {max_percent} leaves "
+            f"{database_connections - proxy_connections} of an estimated "
+            f"{database_connections} database connections for secret rotation "
+            "and administration; lower it",
+        )
+    if client_connections > proxy_connections:
+        warnings.append(
+            f"{client_connections} client connections "
+            f"({connection_sizing['lambda_concurrency']} concurrent executions x "
+            f"{connection_sizing['connections_per_environment']}) exceed the "
+            f"proxy's {proxy_connections} database connections; pinned sessions "
+            "and open transactions will wait for borrow_timeout. Raise "
+            "max_acu or max_connections_percent, or keep concurrency below "
+            f"{limits['max_lambda_concurrency']}",
+        )
+    if min(idle_connections, client_connections) > min_capacity_connections:
+        warnings.append(
+            f"up to {min(idle_connections, client_connections)} idle proxy "
+            f"connections exceed the ~{min_capacity_connections} connections a "
+            f"{capacity['min_acu']} ACU writer is sized for and can keep it "
+            "from scaling down; lower max_idle_connections_percent",
+        )
+    if (
+        proxy_settings["borrow_timeout_seconds"]
+        >= connection_sizing["lambda_timeout_seconds"]
+    ):
+        warnings.append(
+            f"borrow_timeout_seconds ({proxy_settings['borrow_timeout_seconds']}) "
+            "is not below the Lambda timeout "
+            f"({connection_sizing['lambda_timeout_seconds']}s); invocations time "
+            "out before the proxy reports that no connection is available",
+        )
+    if proxy_settings["idle_client_timeout_seconds"] < MIN_IDLE_CLIENT_TIMEOUT_SECONDS:
+        warnings.append(
+            "idle_client_timeout_seconds "
+            f"({proxy_settings['idle_client_timeout_seconds']}) is below "
+            f"{MIN_IDLE_CLIENT_TIMEOUT_SECONDS}; warm Lambda execution "
+            "environments will mostly reconnect",
+        )
+    return limits, warnings
+
+
+def annotate(scope, capacity, proxy_settings, connection_sizing):
+    """Adds the sizing to `scope` as synth-time info and warning annotations."""
+    limits, warnings = size_proxy(capacity, proxy_settings, connection_sizing)
+    Annotations.of(scope).add_info(
+        "RDS Proxy sizing: "
+        + ", ".join(f"{name}={value}" for name, value in limits.items()),
+    )
+    for warning in warnings:
+        Annotations.of(scope).add_warning(f"RDS Proxy sizing: {warning}")
+    return limits
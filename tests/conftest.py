@@ -0,0 +1,11 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import os
+import sys
+
+# The handler modules are flat files on the Lambda path, not a package.
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(__file__), os.pardir, "assets", "lambda", "code"),
+)
@@ -0,0 +1,140 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import batch
+import psycopg2
+from batch import execute_batch
+from batch import normalize_statements
+from batch import ROLLBACK_TO_SAVEPOINT
+
+
+class FakeCursor:
+    """Records what is executed and fails every round trip containing
+    "fail"."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def mogrify(self, sql, params=None):
+        return (sql % tuple(params) if params else sql).encode()
+
+    def execute(self, sql, params=None):
+        if isinstance(sql, str):
+            sql = self.mogrify(sql, params)
+        self.conn.executed.append(sql)
+        if b"fail" in sql:
+            raise psycopg2.DataError("invalid input")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.closed = 0
+        self.executed = []
+        self.outcome = None
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.outcome = "commit"
+
+    def rollback(self):
+        self.outcome = "rollback"
+
+
+def test_statements_are_normalized():
+    statements = normalize_statements(
+        {
+            "statements": [
+                "select 1",
+                {"sql": "insert into t values (%s) returning id", "params": [1]},
+                {"sql": "update t set x = 1", "fetch": True},
+                "delete from t",
+            ],
+        },
+    )
+
+    assert [statement["fetch"] for statement in statements] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert statements[1]["params"] == [1]
+    assert statements[3]["params"] is None
+
+
+def test_statements_without_rows_share_a_round_trip():
+    conn = FakeConnection()
+    statements = normalize_statements(
+        {"statements": ["insert into t values (1)", "insert into t values (2)"]},
+    )
+
+    results = execute_batch(conn, statements)
+
+    assert conn.executed == [
+        b"savepoint batch_group;\n"
+        b"insert into t values (1);\n"
+        b"insert into t values (2)",
+    ]
+    assert results == [{"status": "ok"}, {"status": "ok", "rowcount": 1}]
+    assert conn.outcome == "commit"
+
+
+def test_round_trips_are_split_at_the_size_limit(monkeypatch):
+    monkeypatch.setattr(batch, "MAX_ROUND_TRIP_BYTES", 160)
+    conn = FakeConnection()
+    statements = normalize_statements(
+        {"statements": [f"insert into t values ({i})" for i in range(4)]},
+    )
+
+    execute_batch(conn, statements)
+
+    assert len(conn.executed) == 2
+
+
+def test_failed_group_is_attributed_to_its_statement():
+    conn = FakeConnection()
+    statements = normalize_statements(
+        {
+            "statements": [
+                "insert into t values (1)",
+                "insert into t values ('fail')",
+                "insert into t values (3)",
+            ],
+        },
+    )
+
+    results = execute_batch(conn, statements)
+
+    assert conn.executed[1] == ROLLBACK_TO_SAVEPOINT
+    assert [result["status"] for result in results] == ["ok", "error", "skipped"]
+    assert results[1]["error"] == "invalid input"
+    assert conn.outcome == "rollback"
+
+
+def test_without_transaction_each_statement_fails_on_its_own():
+    conn = FakeConnection()
+    statements = normalize_statements(
+        {
+            "statements": [
+                "insert into t values ('fail')",
+                "insert into t values (2)",
+            ],
+        },
+    )
+
+    results = execute_batch(conn, statements, transaction=False)
+
+    assert [result["status"] for result in results] == ["error", "ok"]
+    assert len(conn.executed) == 2
+    assert conn.autocommit is False
+    assert conn.outcome is None
@@ -0,0 +1,167 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import broker
+import pytest
+from broker import BoundedTTLCache
+from broker import CredentialBroker
+from config import DatabaseTarget
+from tokens import TOKEN_MAX_AGE
+
+
+class FakeClient:
+    def __init__(self, service_name, calls):
+        self.service_name = service_name
+        self.calls = calls
+
+    def assume_role(self, RoleArn, RoleSessionName):
+        self.calls.append(("assume_role", RoleArn))
+        return {
+            "Credentials": {
+                "AccessKeyId": f"key-{len(self.calls)}",
+                "SecretAccessKey": "secret",
+                "SessionToken": "token",
+                "Expiration": datetime.now(timezone.utc) + timedelta(hours=1),
+            },
+        }
+
+    def generate_db_auth_token(self, DBHostname, Port, DBUsername, Region):
+        self.calls.append(("sign", DBHostname))
+        return f"token-{len(self.calls)}"
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def create_client(self, service_name, **kwargs):
+        return FakeClient(service_name, self.calls)
+
+
+def target(name, role):
+    return DatabaseTarget(
+        name=name,
+        role_arn=f"arn:aws:iam::111111111111:role/{role}",
+        endpoint=f"{name}.proxy",
+        user="app",
+        database=name,
+        region="eu-west-1",
+    )
+
+
+def make_broker(session, max_entries=2):
+    targets = {
+        "default": target("default", "shared"),
+        "orders": target("orders", "shared"),
+        "billing": target("billing", "billing"),
+    }
+    return CredentialBroker(session, targets, max_entries, 600, TOKEN_MAX_AGE)
+
+
+def test_cache_evicts_the_least_recently_used_entry():
+    evicted = []
+    cache = BoundedTTLCache(2, 600, on_evict=evicted.append)
+    cache.get_or_load("a", lambda: "A")
+    cache.get_or_load("b", lambda: "B")
+    cache.get_or_load("a", lambda: "unused")
+    cache.get_or_load("c", lambda: "C")
+
+    assert evicted == ["B"]
+    assert cache.values() == ["A", "C"]
+
+
+def test_cache_expires_idle_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(broker.time, "monotonic", lambda: now[0])
+    cache = BoundedTTLCache(10, 60)
+    cache.get_or_load("a", lambda: "A")
+
+    now[0] += 61
+    assert cache.get_or_load("a", lambda: "A2") == "A2"
+    assert cache.stats["evictions"] == 1
+
+
+def test_concurrent_loads_of_a_key_run_the_loader_once():
+    cache = BoundedTTLCache(10, 600)
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        started.set()
+        release.wait()
+        return "value"
+
+    results = []
+    owner = threading.Thread(
+        target=lambda: results.append(cache.get_or_load("k", loader))
+    )
+    owner.start()
+    started.wait()
+    waiter = threading.Thread(
+        target=lambda: results.append(cache.get_or_load("k", loader))
+    )
+    waiter.start()
+    while cache.stats["collapsed"] == 0:
+        time.sleep(0.001)
+    release.set()
+    owner.join()
+    waiter.join()
+
+    assert results == ["value", "value"]
+    assert loads == [1]
+
+
+def test_failed_load_is_raised_to_the_caller_and_not_cached():
+    cache = BoundedTTLCache(10, 600)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", fail)
+    assert cache.get_or_load("k", lambda: "value") == "value"
+
+
+def test_targets_sharing_a_role_share_credentials():
+    session = FakeSession()
+    credential_broker = make_broker(session)
+
+    credential_broker.auth_token("default")
+    credential_broker.auth_token("orders")
+
+    assert [call for call in session.calls if call[0] == "assume_role"] == [
+        ("assume_role", "arn:aws:iam::111111111111:role/shared"),
+    ]
+    assert [call for call in session.calls if call[0] == "sign"] == [
+        ("sign", "default.proxy"),
+        ("sign", "orders.proxy"),
+    ]
+
+
+def test_tokens_are_reused_until_invalidated():
+    session = FakeSession()
+    credential_broker = make_broker(session)
+
+    first = credential_broker.auth_token("orders")
+    assert credential_broker.auth_token("orders") == first
+
+    credential_broker.invalidate_auth_token("orders")
+    assert credential_broker.auth_token("orders") != first
+    assert credential_broker.stats["token_cache"] == {
+        "hits": 1,
+        "misses": 2,
+        "refreshes": 0,
+    }
+
+
+def test_unknown_target_is_a_key_error():
+    with pytest.raises(KeyError, match="Unknown database target 'missing'"):
+        make_broker(FakeSession()).auth_token("missing")
@@ -0,0 +1,68 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import math
+
+import pytest
+from bulk_copy import ChunkSizer
+from bulk_copy import CSV
+from bulk_copy import last_record_end
+from bulk_copy import RecordReader
+from bulk_copy import TEXT
+
+
+@pytest.mark.parametrize(
+    "data, data_format, end",
+    [
+        (b"1,a\n2,b\n3,", CSV, 8),
+        (b"1,a\n2,b\n", CSV, 8),
+        (b"1,partial", CSV, 0),
+        (b'1,"x\ny"\n2,"z\n', CSV, 8),
+        (b'1,"say ""hi""\n"\n2', CSV, 16),
+        (b'1\t"x\ny\n', TEXT, 7),
+    ],
+)
+def test_last_record_end(data, data_format, end):
+    assert last_record_end(data, data_format) == end
+
+
+def read_all(reader):
+    sent = []
+    while True:
+        data = reader.read(8192)
+        if not data:
+            return sent
+        sent.append(data)
+
+
+def test_reader_holds_back_a_split_record():
+    reader = RecordReader(iter([b"1,a\n2,", b"b\n3,c"]), CSV, at_end=False)
+
+    assert read_all(reader) == [b"1,a\n", b"2,b\n"]
+    assert reader.sent_bytes == 8
+
+
+def test_reader_sends_the_final_record_at_the_end_of_the_object():
+    reader = RecordReader(iter([b"1,a\n2,", b"b\n3,c"]), CSV, at_end=True)
+
+    assert read_all(reader) == [b"1,a\n", b"2,b\n", b"3,c"]
+    assert reader.sent_bytes == 11
+
+
+def test_sizer_uses_the_configured_size_until_it_has_measured():
+    sizer = ChunkSizer(chunk_bytes=1000, min_bytes=100)
+
+    assert sizer.size(1.0) == 1000
+    sizer.record(500, 1.0)
+    assert sizer.size(math.inf) == 1000
+    assert sizer.size(1.0) == 400
+    assert sizer.size(0.2) == 0
+
+
+def test_sizer_halves_the_throughput_of_a_chunk_cut_short():
+    sizer = ChunkSizer(chunk_bytes=10000, min_bytes=100)
+    sizer.record(1000, 1.0)
+    sizer.record_cut_short(2000, 1.0)
+
+    assert sizer.bytes_per_second == 500
+    assert sizer.size(1.0) == 400
@@ -0,0 +1,95 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+
+from coalesce import coalesce_records
+from config import WriterTable
+
+TABLES = {
+    "orders": WriterTable(name="orders", key=("id",), on_conflict="update"),
+    "events": WriterTable(name="events", key=("id",), on_conflict="nothing"),
+}
+
+
+def records(*bodies):
+    return [
+        {"messageId": f"m{index}", "body": json.dumps(body)}
+        for index, body in enumerate(bodies, 1)
+    ]
+
+
+def test_upserts_of_a_key_are_merged_in_message_order():
+    groups, failed = coalesce_records(
+        records(
+            {"table": "orders", "row": {"id": 1, "a": 1, "b": 1}},
+            {"table": "orders", "row": {"id": 1, "a": 2}},
+            {"table": "orders", "row": {"id": 1, "a": 3, "b": 3}},
+            {"table": "orders", "row": {"id": 2, "b": 1}},
+            {"table": "orders", "row": {"id": 2, "c": 2}},
+        ),
+        TABLES,
+    )
+
+    assert failed == []
+    assert groups == {
+        ("orders", ("a", "b", "id")): [(["m1", "m2", "m3"], (3, 3, 1))],
+        ("orders", ("b", "c", "id")): [(["m4", "m5"], (1, 2, 2))],
+    }
+
+
+def test_rows_of_a_do_nothing_table_are_kept_in_message_order():
+    groups, failed = coalesce_records(
+        records(
+            {"table": "events", "row": {"id": 1, "v": "first"}},
+            {"table": "events", "row": {"id": 1, "v": "second"}},
+        ),
+        TABLES,
+    )
+
+    assert failed == []
+    assert groups == {
+        ("events", ("id", "v")): [(["m1"], (1, "first")), (["m2"], (1, "second"))],
+    }
+
+
+def test_unusable_messages_are_reported():
+    groups, failed = coalesce_records(
+        records(
+            {"table": "unknown", "row": {"id": 1}},
+            {"table": "orders", "row": {"a": 1}},
+            {"table": "orders", "row": {}},
+        )
+        + [{"messageId": "m4", "body": "not json"}],
+        TABLES,
+    )
+
+    assert groups == {}
+    assert failed == ["m1", "m2", "m3", "m4"]
+
+
+def test_equal_numeric_keys_are_merged():
+    groups, _ = coalesce_records(
+        records(
+            {"table": "orders", "row": {"id": 1, "a": 1}},
+            {"table": "orders", "row": {"id": 1.0, "a": 2}},
+        ),
+        TABLES,
+    )
+
+    assert groups == {("orders", ("a", "id")): [(["m1", "m2"], (2, 1.0))]}
+
+
+def test_keys_are_written_in_the_order_of_their_last_message():
+    groups, _ = coalesce_records(
+        records(
+            {"table": "orders", "row": {"id": 1, "a": 1}},
+            {"table": "orders", "row": {"id": "1", "a": 2}},
+            {"table": "orders", "row": {"id": 1, "a": 3}},
+        ),
+        TABLES,
+    )
+
+    assert groups == {
+        ("orders", ("a", "id")): [(["m2"], (2, "1")), (["m1", "m3"], (3, 1))],
+    }
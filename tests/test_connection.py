@@ -0,0 +1,71 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import connection
+import psycopg2
+import pytest
+from connection import ConnectionHolder
+from resilience import RetryPolicy
+
+AUTH_FAILURE = psycopg2.OperationalError("FATAL:  PAM authentication failed")
+REFUSED = psycopg2.OperationalError("could not connect to server: Connection refused")
+
+
+class FakeConnect:
+    """Stands in for psycopg2.connect: raises the given errors in turn, then
+    returns a connection object."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.passwords = []
+
+    def __call__(self, password, **kwargs):
+        self.passwords.append(password)
+        if self.errors:
+            raise self.errors.pop(0)
+        return object()
+
+
+def holder(monkeypatch, fake, attempts):
+    monkeypatch.setattr(connection.psycopg2, "connect", fake)
+    monkeypatch.setattr(connection.time, "sleep", lambda seconds: None)
+    tokens = iter(["stale", "fresh", "unused"])
+    state = {"token": next(tokens)}
+    return ConnectionHolder(
+        password_provider=lambda: state["token"],
+        on_auth_failure=lambda: state.update(token=next(tokens)),
+        retry_policy=RetryPolicy(attempts=attempts),
+    )
+
+
+@pytest.mark.parametrize("attempts", [1, 3])
+def test_rejected_token_is_signed_again_once(monkeypatch, attempts):
+    fake = FakeConnect(AUTH_FAILURE)
+    holder(monkeypatch, fake, attempts)._connect()
+
+    assert fake.passwords == ["stale", "fresh"]
+
+
+def test_second_rejected_token_is_raised(monkeypatch):
+    fake = FakeConnect(AUTH_FAILURE, AUTH_FAILURE)
+    with pytest.raises(psycopg2.OperationalError):
+        holder(monkeypatch, fake, 3)._connect()
+
+    assert fake.passwords == ["stale", "fresh"]
+
+
+def test_token_retry_leaves_the_attempts_for_other_failures(monkeypatch):
+    fake = FakeConnect(AUTH_FAILURE, REFUSED, REFUSED)
+    connection_holder = holder(monkeypatch, fake, 3)
+    connection_holder._connect()
+
+    assert len(fake.passwords) == 4
+    assert connection_holder.stats["retries"] == 3
+
+
+def test_single_attempt_does_not_retry_other_failures(monkeypatch):
+    fake = FakeConnect(REFUSED)
+    with pytest.raises(psycopg2.OperationalError):
+        holder(monkeypatch, fake, 1)._connect()
+
+    assert len(fake.passwords) == 1
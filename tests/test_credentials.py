@@ -0,0 +1,74 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from credentials import CredentialCache
+
+
+class FakeSts:
+    def __init__(self, lifetime):
+        self.lifetime = lifetime
+        self.calls = 0
+
+    def assume_role(self, RoleArn, RoleSessionName):
+        self.calls += 1
+        return {
+            "Credentials": {
+                "AccessKeyId": f"key-{self.calls}",
+                "SecretAccessKey": "secret",
+                "SessionToken": "token",
+                "Expiration": datetime.now(timezone.utc) + self.lifetime,
+            },
+        }
+
+
+class FakeSession:
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.sts = FakeSts(lifetime)
+        self.rds_clients = []
+
+    def create_client(self, service_name, **credentials):
+        if service_name == "sts":
+            return self.sts
+        self.rds_clients.append(credentials)
+        return credentials
+
+
+def test_credentials_and_client_are_reused_while_fresh():
+    session = FakeSession()
+    cache = CredentialCache("arn:aws:iam::111111111111:role/r", session)
+
+    first = cache.get_rds_client()
+    second = cache.get_rds_client()
+
+    assert first == second
+    assert first[1]["aws_access_key_id"] == first[0]["AccessKeyId"]
+    assert session.sts.calls == 1
+    assert cache.stats == {"hits": 1, "misses": 1, "refreshes": 0}
+
+
+def test_credentials_within_the_margin_are_refreshed():
+    session = FakeSession(lifetime=timedelta(minutes=4))
+    cache = CredentialCache("arn:aws:iam::111111111111:role/r", session)
+
+    cache.get_rds_client()
+    credentials, client = cache.get_rds_client()
+
+    assert credentials["AccessKeyId"] == "key-2"
+    assert client["aws_access_key_id"] == "key-2"
+    assert cache.stats == {"hits": 0, "misses": 1, "refreshes": 1}
+
+
+def test_invalidate_assumes_the_role_again():
+    session = FakeSession()
+    cache = CredentialCache("arn:aws:iam::111111111111:role/r", session)
+
+    cache.get_rds_client()
+    cache.invalidate()
+    credentials, _ = cache.get_rds_client()
+
+    assert credentials["AccessKeyId"] == "key-2"
+    assert len(session.rds_clients) == 2
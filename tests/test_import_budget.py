@@ -0,0 +1,25 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import importlib.util
+import os
+
+# tools/ is a directory of scripts, not a package.
+_spec = importlib.util.spec_from_file_location(
+    "import_budget",
+    os.path.join(os.path.dirname(__file__), os.pardir, "tools", "import_budget.py"),
+)
+import_budget = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(import_budget)
+
+
+def test_handler_import_stays_within_budget():
+    timings = import_budget.measure("connection_test")
+
+    assert import_budget.check(timings) == []
+
+
+def test_config_import_loads_no_driver_or_sdk():
+    imported = {name.strip() for name, _, _ in import_budget.measure("config")}
+
+    assert not {"boto3", "botocore", "psycopg2"} & imported
@@ -0,0 +1,72 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import json
+
+import metrics
+from metrics import MAX_VALUES
+from metrics import NO_OP_RECORDER
+from metrics import Recorder
+
+
+def documents(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_phases_are_written_per_dimension_set(capsys):
+    recorder = Recorder("Test", subsegments=False)
+    with recorder.phase("connect") as phase:
+        phase.dimensions["Reused"] = True
+    with recorder.phase("connect") as phase:
+        phase.dimensions["Reused"] = True
+    recorder.record("query", 1.5, {})
+    recorder.flush()
+
+    connect, query = documents(capsys)
+    assert connect["Phase"] == "connect"
+    assert connect["Reused"] == "true"
+    assert len(connect["Duration"]) == 2
+    assert connect["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [
+        ["FunctionName", "Phase", "Reused"],
+    ]
+    assert query["Duration"] == [1.5]
+
+
+def test_failed_phase_carries_an_error_dimension(capsys):
+    recorder = Recorder("Test", subsegments=False)
+    try:
+        with recorder.phase("query"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    recorder.flush()
+
+    (document,) = documents(capsys)
+    assert document["Error"] == "true"
+
+
+def test_documents_hold_at_most_max_values(capsys):
+    recorder = Recorder("Test", subsegments=False)
+    for _ in range(MAX_VALUES):
+        recorder.record("query", 1.0, {})
+
+    # A full document is written before the flush.
+    (full,) = documents(capsys)
+    assert len(full["Duration"]) == MAX_VALUES
+
+    for _ in range(MAX_VALUES + 1):
+        recorder.record("query", 1.0, {})
+    recorder.flush()
+    assert [len(document["Duration"]) for document in documents(capsys)] == [
+        MAX_VALUES,
+        1,
+    ]
+
+
+def test_off_mode_records_nothing(capsys, monkeypatch):
+    monkeypatch.setattr(metrics.Recorder, "record", None)
+    with NO_OP_RECORDER.phase("query") as phase:
+        phase.dimensions["Route"] = "read_only"
+    NO_OP_RECORDER.flush()
+
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,77 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+from pagination import decode_cursor
+from pagination import encode_cursor
+from pagination import keyset_query
+from pagination import page_options
+
+
+def options(**query):
+    (page,) = page_options({"queries": [{"sql": "select 1", **query}]}, 100)
+    return page
+
+
+def render(sql, params):
+    # psycopg2 formats %s and %% like Python's % operator.
+    return sql % tuple(repr(param) for param in params)
+
+
+def test_query_without_key_is_sent_as_it_is():
+    sql, params = keyset_query("select * from t where name like 'a%';", None, options())
+
+    assert sql == "select * from t where name like 'a%'"
+    assert params is None
+
+
+def test_literal_percent_survives_the_page_parameters():
+    sql, params = keyset_query(
+        "select * from t where name like 'a%'",
+        None,
+        options(key="id", limit=10),
+    )
+
+    assert params == [11]
+    assert render(sql, params) == (
+        "select * from (select * from t where name like 'a%') as keyset_page"
+        ' order by "id" limit 11'
+    )
+
+
+def test_query_with_params_keeps_its_escapes():
+    sql, params = keyset_query(
+        "select * from t where name like 'a%%' and kind = %s",
+        ["x"],
+        options(key="id", limit=10),
+    )
+
+    assert params == ["x", 11]
+    assert "like 'a%'" in render(sql, params)
+
+
+def test_cursor_seeks_past_the_previous_page():
+    cursor = encode_cursor(["id", "name"], [5, "e"])
+    sql, params = keyset_query(
+        "select * from t",
+        None,
+        options(key=["id", "name"], cursor=cursor, limit=2, descending=True),
+    )
+
+    assert params == [5, "e", 3]
+    assert '("id", "name") < (%s, %s)' in sql
+    assert 'order by "id" desc, "name" desc limit %s' in sql
+
+
+def test_cursor_must_match_its_key():
+    cursor = encode_cursor(["id"], [5])
+
+    assert decode_cursor(cursor, ["id"]) == [5]
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, ["name"])
+
+
+@pytest.mark.parametrize("limit", [0, 101, "10"])
+def test_limit_is_bounded(limit):
+    with pytest.raises(ValueError):
+        options(limit=limit)
@@ -0,0 +1,94 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+from pinning import classify
+from pinning import MAX_STATEMENT_BYTES
+from pinning import PinningError
+from pinning import PinningGuard
+from pinning import REJECT
+from pinning import REWRITE
+from pinning import SERVER_SIDE_CURSOR
+from pinning import WARN
+
+
+@pytest.mark.parametrize(
+    "sql, risks",
+    [
+        ("select 1", []),
+        ("SET search_path TO app", ["set"]),
+        ("set local search_path to app", []),
+        ("create temp table t (x int)", ["temporary_object"]),
+        ("declare c cursor for select 1", ["cursor"]),
+        ("select nextval('s')", ["sequence_function"]),
+        ("select pg_advisory_lock(1)", ["advisory_lock"]),
+        ("select set_config('a.b', 'c', false)", ["set_config"]),
+        ("select set_config('a.b', 'c', true)", []),
+    ],
+)
+def test_classify(sql, risks):
+    assert classify(sql) == risks
+
+
+def test_oversized_statements_pin():
+    assert classify("select '" + "x" * MAX_STATEMENT_BYTES + "'") == [
+        "statement_size"
+    ]
+
+
+@pytest.mark.parametrize(
+    "sql, rewritten",
+    [
+        ("set search_path to app", "set local search_path to app"),
+        ("set session timezone to 'UTC'", "set local timezone to 'UTC'"),
+        ("select pg_advisory_lock(1)", "select pg_advisory_xact_lock(1)"),
+        (
+            "select pg_try_advisory_lock_shared(1)",
+            "select pg_try_advisory_xact_lock_shared(1)",
+        ),
+        (
+            "select set_config('a.b', 'c', false)",
+            "select set_config('a.b', 'c', true)",
+        ),
+    ],
+)
+def test_rewrite_in_a_transaction(sql, rewritten):
+    guard = PinningGuard(REWRITE)
+
+    assert guard.check(sql, in_transaction=True) == rewritten
+    assert not guard.pinned
+
+
+@pytest.mark.parametrize(
+    "sql, in_transaction",
+    [
+        ("set search_path to app", False),
+        ("select pg_advisory_unlock(1)", True),
+        ("set session authorization app", True),
+        ("create temp table t (x int)", True),
+    ],
+)
+def test_rewrite_rejects_what_it_cannot_rewrite(sql, in_transaction):
+    with pytest.raises(PinningError):
+        PinningGuard(REWRITE).check(sql, in_transaction)
+
+
+def test_reject_rejects_rewritable_statements():
+    with pytest.raises(PinningError, match=r"\(set\)"):
+        PinningGuard(REJECT).check("set search_path to app", in_transaction=True)
+
+
+def test_warn_records_risks_and_driver_behaviour():
+    guard = PinningGuard(WARN)
+
+    assert guard.check("set search_path to app", False) == "set search_path to app"
+    guard.record(SERVER_SIDE_CURSOR)
+    assert guard.reasons == ["set", SERVER_SIDE_CURSOR]
+
+    guard.reset()
+    assert not guard.pinned
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PinningGuard("ignore")
@@ -0,0 +1,77 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from query import chunked
+from query import DEFAULT_QUERY
+from query import normalize_queries
+from query import stream_rows
+
+
+class FakeCursor:
+    def __init__(self, rows, description):
+        self.rows = rows
+        self.description = description
+        self.executed = None
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        if self.description is None:
+            raise AssertionError("no results to fetch")
+        return iter(self.rows)
+
+    def execute(self, sql, params):
+        self.executed = (sql, params)
+
+
+class FakeConnection:
+    def __init__(self, rows, description=("column",)):
+        self.cursors = []
+        self.rows = rows
+        self.description = description
+
+    def cursor(self, name=None):
+        cursor = FakeCursor(self.rows, self.description)
+        self.cursors.append((name, cursor))
+        return cursor
+
+
+def test_queries_default_to_the_probe_query():
+    assert normalize_queries(None) == [(DEFAULT_QUERY, None)]
+    assert normalize_queries(
+        {"queries": ["select 1", {"sql": "select %s", "params": [2]}]},
+    ) == [("select 1", None), ("select %s", [2])]
+
+
+def test_rows_are_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+def test_rows_use_a_client_cursor_by_default():
+    conn = FakeConnection([(1,), (2,)])
+
+    assert list(stream_rows(conn, "select 1")) == [(1,), (2,)]
+    ((name, cursor),) = conn.cursors
+    assert name is None
+    assert cursor.itersize is None
+
+
+def test_server_side_rows_use_a_named_cursor():
+    conn = FakeConnection([(1,)])
+
+    assert list(stream_rows(conn, "select 1", itersize=10, server_side=True)) == [(1,)]
+    ((name, cursor),) = conn.cursors
+    assert name.startswith("stream_")
+    assert cursor.itersize == 10
+
+
+def test_statement_without_a_result_yields_no_rows():
+    conn = FakeConnection([], description=None)
+
+    assert list(stream_rows(conn, "insert into t values (1)")) == []
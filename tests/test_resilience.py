@@ -0,0 +1,181 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import threading
+import time
+
+import botocore.exceptions
+import psycopg2
+import pytest
+import resilience
+from resilience import AUTH
+from resilience import BORROW_TIMEOUT
+from resilience import CircuitBreaker
+from resilience import CircuitOpenError
+from resilience import classify
+from resilience import Deadline
+from resilience import DeadlineExceeded
+from resilience import HedgedConnect
+from resilience import RetryPolicy
+from resilience import TRANSIENT
+
+
+class FakeContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+        self.cancelled = threading.Event()
+
+    def close(self):
+        self.closed = True
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+@pytest.mark.parametrize(
+    "error, error_class",
+    [
+        (psycopg2.OperationalError("FATAL:  PAM authentication failed"), AUTH),
+        (
+            psycopg2.OperationalError(
+                "Timed-out waiting to acquire database connection"
+            ),
+            BORROW_TIMEOUT,
+        ),
+        (psycopg2.OperationalError("timeout expired"), TRANSIENT),
+        (psycopg2.OperationalError("database \"x\" does not exist"), None),
+        (
+            botocore.exceptions.ClientError(
+                {"Error": {"Code": "Throttling"}},
+                "AssumeRole",
+            ),
+            TRANSIENT,
+        ),
+        (
+            botocore.exceptions.ClientError(
+                {"Error": {"Code": "AccessDenied"}},
+                "AssumeRole",
+            ),
+            None,
+        ),
+        (botocore.exceptions.EndpointConnectionError(endpoint_url="x"), TRANSIENT),
+        (ValueError("unrelated"), None),
+    ],
+)
+def test_classify(error, error_class):
+    assert classify(error) == error_class
+
+
+def test_retry_delay_is_capped(monkeypatch):
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.5)
+
+    assert [policy.delay(retry) for retry in range(4)] == [0.1, 0.2, 0.4, 0.5]
+
+
+def test_circuit_opens_and_lets_one_trial_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    now[0] += 30
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] += 30
+    breaker.check()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats == {"opened": 2, "rejected": 1}
+
+
+def test_fast_connect_is_not_hedged():
+    hedge = HedgedConnect(default_after_seconds=5)
+
+    assert hedge.connect(lambda: FakeConnection("first")).name == "first"
+    assert hedge.stats == {"hedged": 0, "hedge_wins": 0}
+
+
+def test_slow_connect_is_hedged_and_the_loser_closed():
+    hedge = HedgedConnect(default_after_seconds=0.01)
+    release = threading.Event()
+    connections = []
+
+    def connect():
+        conn = FakeConnection(len(connections))
+        connections.append(conn)
+        if conn.name == 0:
+            release.wait()
+        return conn
+
+    winner = hedge.connect(connect)
+    release.set()
+    hedge._executor.shutdown(wait=True)
+
+    assert winner.name == 1
+    assert connections[0].closed
+    assert hedge.stats == {"hedged": 1, "hedge_wins": 1}
+
+
+def test_hedge_raises_only_when_both_attempts_fail():
+    hedge = HedgedConnect(default_after_seconds=0.01)
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.05)
+        raise psycopg2.OperationalError("could not connect to server")
+
+    with pytest.raises(psycopg2.OperationalError):
+        hedge.connect(connect)
+    assert len(calls) == 2
+
+
+def test_deadline_keeps_a_margin_for_the_response(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    deadline = Deadline(margin_seconds=0.5)
+    deadline.reset(FakeContext(3000))
+
+    assert deadline.statement_timeout_sql() == "set local statement_timeout = 2500"
+    now[0] += 2.49
+    with pytest.raises(DeadlineExceeded):
+        deadline.statement_timeout_sql()
+    now[0] += 1
+    assert deadline.remaining() == 0.0
+
+
+def test_local_runs_have_no_deadline():
+    deadline = Deadline()
+    deadline.reset(FakeContext(3000))
+    deadline.reset(None)
+
+    assert deadline.statement_timeout_sql() is None
+    with deadline.cancel_on_expiry(FakeConnection("local")) as conn:
+        assert conn.name == "local"
+
+
+def test_running_statement_is_cancelled_at_the_deadline():
+    deadline = Deadline(margin_seconds=0.5)
+    deadline.reset(FakeContext(550))
+
+    with deadline.cancel_on_expiry(FakeConnection("proxy")) as conn:
+        assert conn.cancelled.wait(1)
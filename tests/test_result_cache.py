@@ -0,0 +1,142 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+import pytest
+import result_cache
+from result_cache import LocalBackend
+from result_cache import ResultCache
+
+TARGET = "default"
+SQL = "select * from orders where id = %s"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_local_backend_evicts_least_recently_used(clock):
+    backend = LocalBackend(max_bytes=10)
+    backend.set("a", b"aaaa", 60, set())
+    backend.set("b", b"bbbb", 60, set())
+    # Reading "a" makes "b" the least recently used entry.
+    assert backend.get("a") == b"aaaa"
+    backend.set("c", b"cccc", 60, set())
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"aaaa"
+    assert backend.get("c") == b"cccc"
+    assert backend.stats == {
+        "entries": 2,
+        "bytes": 8,
+        "evictions": 1,
+        "invalidations": 0,
+    }
+
+
+def test_local_backend_skips_values_larger_than_the_cache(clock):
+    backend = LocalBackend(max_bytes=4)
+    backend.set("a", b"aaaaa", 60, set())
+
+    assert backend.get("a") is None
+    assert backend.stats["entries"] == 0
+
+
+def test_local_backend_expires_entries_after_their_ttl(clock):
+    backend = LocalBackend()
+    backend.set("a", b"value", 5, {"t"})
+
+    clock.now += 4.9
+    assert backend.get("a") == b"value"
+    clock.now += 0.1
+    assert backend.get("a") is None
+    assert backend.stats["entries"] == 0
+    assert backend.stats["bytes"] == 0
+
+
+def test_local_backend_invalidates_by_tag(clock):
+    backend = LocalBackend()
+    backend.set("a", b"a", 60, {"orders", "*"})
+    backend.set("b", b"b", 60, {"customers", "*"})
+
+    backend.invalidate({"orders"})
+    assert backend.get("a") is None
+    assert backend.get("b") == b"b"
+    assert backend.stats["invalidations"] == 1
+
+    backend.invalidate({"*"})
+    assert backend.get("b") is None
+    assert backend.stats == {
+        "entries": 0,
+        "bytes": 0,
+        "evictions": 0,
+        "invalidations": 2,
+    }
+
+
+def test_result_cache_shares_entries_across_whitespace(clock):
+    cache = ResultCache(LocalBackend())
+    cache.put(TARGET, SQL, [1], {"rows": [[1]]}, 60)
+
+    assert cache.get(TARGET, "select *\n  from orders where id = %s;", [1]) == {
+        "rows": [[1]],
+    }
+    assert cache.get(TARGET, SQL, [2]) is None
+    assert cache.get("reporting", SQL, [1]) is None
+
+
+def test_result_cache_keys_pages_by_their_options(clock):
+    cache = ResultCache(LocalBackend())
+    small = {"key": [], "limit": 1, "after": None, "descending": False}
+    large = dict(small, limit=2)
+    cache.put(TARGET, SQL, [1], {"result": "one row"}, 60, options=small)
+
+    assert cache.get(TARGET, SQL, [1], large) is None
+    assert cache.get(TARGET, SQL, [1]) is None
+    assert cache.get(TARGET, SQL, [1], dict(small)) == {"result": "one row"}
+
+
+def test_result_cache_does_not_store_writes(clock):
+    cache = ResultCache(LocalBackend())
+    cache.put(TARGET, "update orders set total = 0", None, {"rows": []}, 60)
+
+    assert cache.stats["skipped"] == 1
+    assert cache.backend.stats["entries"] == 0
+
+
+def test_result_cache_invalidates_the_tables_a_write_names(clock):
+    cache = ResultCache(LocalBackend())
+    cache.put(TARGET, "select * from app.orders", None, {"rows": []}, 60)
+    cache.put(TARGET, "select * from customers", None, {"rows": []}, 60)
+    cache.put("reporting", "select * from orders", None, {"rows": []}, 60)
+
+    cache.invalidate_writes(
+        TARGET,
+        ["set local lock_timeout = 100", "insert into orders values (1)"],
+    )
+    assert cache.get(TARGET, "select * from app.orders", None) is None
+    assert cache.get(TARGET, "select * from customers", None) is not None
+    assert cache.get("reporting", "select * from orders", None) is not None
+
+    # A write whose tables cannot be told drops every result of the target.
+    cache.invalidate_writes(TARGET, ["call refresh_totals()"])
+    assert cache.get(TARGET, "select * from customers", None) is None
+    assert cache.get("reporting", "select * from orders", None) is not None
+
+
+def test_result_cache_keeps_results_for_read_only_statements(clock):
+    cache = ResultCache(LocalBackend())
+    cache.put(TARGET, "select * from orders", None, {"rows": []}, 60)
+
+    cache.invalidate_writes(TARGET, ["select * from orders", "begin", "commit"])
+    assert cache.get(TARGET, "select * from orders", None) is not None
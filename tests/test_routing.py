@@ -0,0 +1,86 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from contextlib import contextmanager
+
+import pytest
+import routing
+from routing import is_read_only
+from routing import READ_ONLY
+from routing import READ_WRITE
+from routing import resolve_route
+from routing import Router
+
+
+class FakeHolder:
+    def __init__(self, name):
+        self.name = name
+        self.discarded = False
+
+    @contextmanager
+    def connection(self):
+        yield self.name
+
+    def discard_on_release(self):
+        self.discarded = True
+
+
+@pytest.mark.parametrize(
+    "sql, read_only",
+    [
+        ("select 1", True),
+        ("  WITH x AS (select 1) select * from x", True),
+        ("show server_version", True),
+        ("select * from t for update", False),
+        ("select * from t for key share", False),
+        ("with x as (delete from t returning *) select * from x", False),
+        ("select nextval('s')", False),
+        ("insert into t values (1)", False),
+    ],
+)
+def test_is_read_only(sql, read_only):
+    assert is_read_only(sql) == read_only
+
+
+def test_transaction_is_read_only_only_if_every_statement_is():
+    assert resolve_route(["select 1", "select 2"]) == READ_ONLY
+    assert resolve_route(["select 1", "update t set x = 1"]) == READ_WRITE
+    assert resolve_route(["select 1"], route=READ_WRITE) == READ_WRITE
+    with pytest.raises(ValueError):
+        resolve_route(["select 1"], route="replica")
+
+
+def test_reads_stick_to_the_writer_after_a_write(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(routing.time, "monotonic", lambda: now[0])
+    router = Router(FakeHolder("writer"), FakeHolder("reader"), 5)
+
+    with router.connection(READ_ONLY) as conn:
+        assert conn == "reader"
+    with router.connection(READ_WRITE) as conn:
+        assert conn == "writer"
+    with router.connection(READ_ONLY) as conn:
+        assert conn == "writer"
+
+    now[0] += 5
+    with router.connection(READ_ONLY) as conn:
+        assert conn == "reader"
+    assert router.stats == {READ_ONLY: 2, READ_WRITE: 2, "sticky": 1}
+
+
+def test_without_a_read_only_endpoint_reads_use_the_writer():
+    router = Router(FakeHolder("writer"))
+
+    with router.connection(READ_ONLY) as conn:
+        assert conn == "writer"
+
+
+def test_discard_current_marks_the_holder_in_use():
+    reader = FakeHolder("reader")
+    router = Router(FakeHolder("writer"), reader)
+
+    with router.connection(READ_ONLY):
+        router.discard_current()
+    router.discard_current()
+
+    assert reader.discarded
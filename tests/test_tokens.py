@@ -0,0 +1,92 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from tokens import AuthTokenCache
+
+
+class FakeRdsClient:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_db_auth_token(self, DBHostname, Port, DBUsername, Region):
+        self.calls += 1
+        return f"{DBHostname}:{Port}:{DBUsername}:{Region}:{self.calls}"
+
+
+class FakeCredentialCache:
+    refresh_margin = timedelta(minutes=5)
+
+    def __init__(self, lifetime=timedelta(hours=1), access_key_id="key-1"):
+        self.client = FakeRdsClient()
+        self.credentials = {
+            "AccessKeyId": access_key_id,
+            "Expiration": datetime.now(timezone.utc) + lifetime,
+        }
+
+    def get_rds_client(self):
+        return self.credentials, self.client
+
+
+def test_tokens_are_cached_per_endpoint():
+    credential_cache = FakeCredentialCache()
+    cache = AuthTokenCache(credential_cache)
+
+    first = cache.get("proxy", 5432, "app", "eu-west-1")
+    second = cache.get("proxy", "5432", "app", "eu-west-1")
+    other = cache.get("proxy-read-only", 5432, "app", "eu-west-1")
+
+    assert first == second
+    assert other != first
+    assert credential_cache.client.calls == 2
+    assert cache.stats == {"hits": 1, "misses": 2, "refreshes": 0}
+
+
+def test_expired_token_is_re_signed_on_the_next_get():
+    credential_cache = FakeCredentialCache()
+    cache = AuthTokenCache(credential_cache, max_age=timedelta(0))
+
+    first = cache.get("proxy", 5432, "app", "eu-west-1")
+    second = cache.get("proxy", 5432, "app", "eu-west-1")
+
+    assert first != second
+    assert cache.stats == {"hits": 0, "misses": 1, "refreshes": 1}
+
+
+def test_token_expires_with_credentials_in_the_refresh_margin():
+    credential_cache = FakeCredentialCache(lifetime=timedelta(minutes=4))
+    cache = AuthTokenCache(credential_cache)
+
+    cache.get("proxy", 5432, "app", "eu-west-1")
+    cache.get("proxy", 5432, "app", "eu-west-1")
+
+    assert credential_cache.client.calls == 2
+
+
+def test_rotated_credentials_sign_a_new_token():
+    credential_cache = FakeCredentialCache()
+    cache = AuthTokenCache(credential_cache)
+    cache.get("proxy", 5432, "app", "eu-west-1")
+
+    rotated = FakeCredentialCache(access_key_id="key-2")
+    cache.get("proxy", 5432, "app", "eu-west-1", signer=rotated.get_rds_client())
+
+    assert rotated.client.calls == 1
+
+
+def test_invalidate_drops_one_host_or_all():
+    credential_cache = FakeCredentialCache()
+    cache = AuthTokenCache(credential_cache)
+    cache.get("proxy", 5432, "app", "eu-west-1")
+    cache.get("proxy-read-only", 5432, "app", "eu-west-1")
+
+    cache.invalidate("proxy")
+    cache.get("proxy-read-only", 5432, "app", "eu-west-1")
+    assert credential_cache.client.calls == 2
+
+    cache.invalidate()
+    cache.get("proxy-read-only", 5432, "app", "eu-west-1")
+    assert credential_cache.client.calls == 3
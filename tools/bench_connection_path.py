@@ -0,0 +1,229 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Offline per-phase latency benchmark for the Lambda connection path.
+
+Runs the handler's connection path (STS assume-role, rds client construction,
+token signing, connect, query) against local stand-ins (see local_stand_ins.py)
+and reports p50/p95/p99 per phase for cold and warm containers. A cold
+iteration builds a fresh botocore session, caches and connection holder, as a
+new execution environment would; warm iterations reuse them.
+
+    python tools/bench_connection_path.py --iterations 200 --output after.json
+    python tools/bench_connection_path.py --compare before.json
+
+Results are written as JSON so runs before and after a change can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from datetime import timezone
+
+from local_stand_ins import add_database_arguments
+from local_stand_ins import handler_environment
+from local_stand_ins import StsStandIn
+from local_stand_ins import use_lambda_code
+
+PHASES = ("init", "sts", "client", "token", "connect", "query")
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+QUERY = """select * from information_schema.tables"""
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples_by_phase):
+    return {
+        phase: {
+            "n": len(samples),
+            **{name: percentile(samples, q) for name, q in PERCENTILES},
+        }
+        for phase, samples in samples_by_phase.items()
+        if samples
+    }
+
+
+class Container:
+    """The per-container state of the handler, with each phase timed."""
+
+    def __init__(self, args, timings):
+        from connection import ConnectionHolder
+        from credentials import create_session
+        from credentials import CredentialCache
+        from tokens import AuthTokenCache
+
+        self.args = args
+        self.timings = timings
+
+        with self.phase("init"):
+            session = create_session(os.environ["AWS_REGION"])
+            self.credential_cache = CredentialCache(
+                os.environ["DATABASE_ACCOUNT_IAM_ROLE"],
+                session,
+            )
+        self.token_cache = AuthTokenCache(self.credential_cache)
+
+        # Separate the STS round trip from rds client construction.
+        assume_role = self.credential_cache._assume_role
+
+        def timed_assume_role():
+            with self.phase("sts"):
+                return assume_role()
+
+        self.credential_cache._assume_role = timed_assume_role
+        self.connection = ConnectionHolder(
+            password_provider=self.cached_token,
+            host=args.pg_host,
+            port=args.pg_port,
+            database=args.pg_database,
+            user=args.pg_user,
+            sslmode=os.environ["DB_SSLMODE"],
+        )
+
+    def phase(self, name):
+        timings = self.timings
+
+        class Phase:
+            def __enter__(self):
+                self.start = time.perf_counter()
+
+            def __exit__(self, *exc_info):
+                timings[name].append((time.perf_counter() - self.start) * 1000)
+
+        return Phase()
+
+    def cached_token(self):
+        return self.token_cache.get(
+            self.args.pg_host,
+            self.args.pg_port,
+            self.args.pg_user,
+            os.environ["AWS_REGION"],
+        )
+
+    def token(self):
+        sts_before = len(self.timings["sts"])
+        start = time.perf_counter()
+        self.credential_cache.get_rds_client()
+        elapsed = (time.perf_counter() - start) * 1000
+        if len(self.timings["sts"]) > sts_before:
+            elapsed -= self.timings["sts"][-1]
+        self.timings["client"].append(elapsed)
+
+        with self.phase("token"):
+            return self.cached_token()
+
+    def invoke(self):
+        if self.connection._conn is None:
+            self.token()  # timed as its own phases, outside connect
+        with self.phase("connect"):
+            conn = self.connection.acquire()
+        try:
+            with self.phase("query"):
+                with conn.cursor() as cur:
+                    cur.execute(QUERY)
+                    cur.fetchall()
+        finally:
+            self.connection.release()
+
+    def close(self):
+        self.connection.close()
+
+
+def run(args):
+    results = {}
+
+    cold = {phase: [] for phase in PHASES}
+    for _ in range(args.cold_iterations):
+        container = Container(args, cold)
+        container.invoke()
+        container.close()
+    results["cold"] = summarize(cold)
+
+    warm = {phase: [] for phase in PHASES}
+    container = Container(args, {phase: [] for phase in PHASES})
+    container.invoke()
+    container.timings = warm
+    for _ in range(args.iterations):
+        container.invoke()
+    container.close()
+    results["warm"] = summarize(warm)
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results, baseline=None):
+    print(f"{'mode':<5} {'phase':<8} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for mode, phases in results.items():
+        for phase, summary in phases.items():
+            line = f"{mode:<5} {phase:<8} {summary['n']:>5}"
+            for name, _ in PERCENTILES:
+                line += f" {summary[name]:9.2f}"
+            before = (baseline or {}).get(mode, {}).get(phase)
+            if before:
+                line += f"  (p50 {summary['p50'] - before['p50']:+.2f} ms vs baseline)"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_database_arguments(parser)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--cold-iterations", type=int, default=30)
+    parser.add_argument("--sts-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args()
+
+    with StsStandIn(latency_ms=args.sts_latency_ms) as sts:
+        os.environ.update(
+            handler_environment(
+                sts.endpoint_url,
+                args.pg_host,
+                args.pg_port,
+                args.pg_user,
+                args.pg_database,
+            ),
+        )
+        use_lambda_code()
+        results = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "revision": git_revision(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "sts_latency_ms": args.sts_latency_ms,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
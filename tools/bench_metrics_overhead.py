@@ -0,0 +1,79 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Overhead of the handler's phase instrumentation (metrics.Recorder).
+
+Times an empty phase with instrumentation off and in EMF mode (X-Ray
+subsegments disabled, as when the SDK is absent) and prints the cost per phase,
+plus the cost of flushing one invocation's worth of phases.
+
+    python tools/bench_metrics_overhead.py --phases 200000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from local_stand_ins import use_lambda_code
+
+use_lambda_code()
+
+from metrics import EMF  # noqa: E402
+from metrics import OFF  # noqa: E402
+from metrics import Recorder  # noqa: E402
+
+# Phases recorded by a typical cold invocation of the sync handler.
+INVOCATION_PHASES = ("credentials", "token", "connect", "query")
+
+
+def time_phases(recorder, phases):
+    start = time.perf_counter()
+    for _ in range(phases):
+        with recorder.phase("query") as phase:
+            phase.dimensions["CacheHit"] = True
+    elapsed = time.perf_counter() - start
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.flush()
+    return elapsed / phases * 1e9
+
+
+def time_flush(invocations):
+    recorder = Recorder("Benchmark", mode=EMF, subsegments=False)
+    elapsed = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(invocations):
+            for name in INVOCATION_PHASES:
+                with recorder.phase(name) as phase:
+                    phase.dimensions["CacheHit"] = True
+            start = time.perf_counter()
+            recorder.flush()
+            elapsed += time.perf_counter() - start
+    return elapsed / invocations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--phases", type=int, default=200_000)
+    parser.add_argument("--invocations", type=int, default=10_000)
+    args = parser.parse_args()
+
+    baseline_start = time.perf_counter()
+    for _ in range(args.phases):
+        with contextlib.nullcontext():
+            pass
+    baseline_ns = (time.perf_counter() - baseline_start) / args.phases * 1e9
+
+    off_ns = time_phases(Recorder("Benchmark", mode=OFF), args.phases)
+    emf_ns = time_phases(
+        Recorder("Benchmark", mode=EMF, subsegments=False),
+        args.phases,
+    )
+    flush_us = time_flush(args.invocations)
+
+    print(f"empty with-block      {baseline_ns:8.0f} ns/phase")
+    print(f"METRICS_MODE=off      {off_ns:8.0f} ns/phase")
+    print(f"METRICS_MODE=emf      {emf_ns:8.0f} ns/phase")
+    print(f"emf flush             {flush_us:8.1f} us/invocation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Builds size-optimized Lambda layer artifacts for x86_64 and arm64.
+
+Downloads manylinux wheels of one or more packages for the configured
+python_version (from cdk.json) and each architecture, regardless of the host,
+then prunes tests, metadata, type stubs and sources of compiled modules,
+strips debug symbols from shared objects and precompiles bytecode. Each
+artifact is written to assets/layers/<name>/layer-<architecture>.zip, and the
+build fails if one exceeds the size budget.
+
+    python tools/build_layer.py psycopg2-binary orjson --name psycopg2
+    python tools/build_layer.py asyncpg --architecture arm64 --budget-mb 6
+
+The build fails if an extension module was built for another interpreter
+than python_version, which Lambda's runtime could not import.
+
+Bytecode is only precompiled when the host interpreter matches python_version,
+since .pyc files are version specific; otherwise Lambda compiles the modules
+in memory on every cold start, because /opt is read-only.
+"""
+import argparse
+import compileall
+import json
+import os
+import py_compile
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLATFORMS = {
+    "x86_64": "manylinux2014_x86_64",
+    "arm64": "manylinux2014_aarch64",
+}
+
+# Host binutils only strip objects of their own architecture; try the
+# cross-architecture ones and llvm-strip, which handles both.
+STRIP_TOOLS = {
+    "x86_64": ("x86_64-linux-gnu-strip", "llvm-strip", "strip"),
+    "arm64": ("aarch64-linux-gnu-strip", "llvm-strip", "strip"),
+}
+
+PRUNE_DIRS = ("tests", "__pycache__")
+PRUNE_DIR_SUFFIXES = (".dist-info", ".egg-info")
+PRUNE_FILE_SUFFIXES = (".pyi", ".pyx", ".pxd", ".c", ".h", ".cpp")
+
+# The interpreter tag of a version-specific extension module, such as
+# _psycopg.cpython-39-x86_64-linux-gnu.so; abi3 modules carry none.
+EXTENSION_TAG = re.compile(r"\.cpython-(\d+)[a-z]*-")
+
+
+def default_python_version():
+    with open(os.path.join(ROOT_DIR, "cdk.json")) as f:
+        return json.load(f)["context"]["python_version"]
+
+
+def install(packages, architecture, python_version, target):
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            *packages,
+            "--quiet",
+            "--no-compile",
+            "--only-binary=:all:",
+            "--implementation",
+            "cp",
+            "--python-version",
+            python_version,
+            "--platform",
+            PLATFORMS[architecture],
+            "--target",
+            target,
+        ],
+        check=True,
+    )
+
+
+def check_interpreter(target, python_version):
+    expected = python_version.replace(".", "")
+    mismatched = sorted(
+        filename
+        for _, _, filenames in os.walk(target)
+        for filename in filenames
+        if (match := EXTENSION_TAG.search(filename)) and match.group(1) != expected
+    )
+    if mismatched:
+        raise SystemExit(
+            f"extension modules built for another interpreter than Python"
+            f" {python_version}: {', '.join(mismatched)}",
+        )
+
+
+def prune(target):
+    removed = 0
+    for dirpath, dirnames, filenames in os.walk(target, topdown=True):
+        for dirname in list(dirnames):
+            if dirname in PRUNE_DIRS or dirname.endswith(PRUNE_DIR_SUFFIXES):
+                path = os.path.join(dirpath, dirname)
+                removed += directory_size(path)
+                shutil.rmtree(path)
+                dirnames.remove(dirname)
+        for filename in filenames:
+            if filename.endswith(PRUNE_FILE_SUFFIXES):
+                path = os.path.join(dirpath, filename)
+                removed += os.path.getsize(path)
+                os.remove(path)
+    return removed
+
+
+def strip(target, architecture):
+    strip_tool = next(
+        (tool for tool in STRIP_TOOLS[architecture] if shutil.which(tool)),
+        None,
+    )
+    if strip_tool is None:
+        print(f"warning: no strip tool for {architecture}; shared objects kept as is")
+        return 0
+
+    saved = 0
+    for dirpath, _, filenames in os.walk(target):
+        for filename in filenames:
+            if ".so" not in filename:
+                continue
+            path = os.path.join(dirpath, filename)
+            size = os.path.getsize(path)
+            result = subprocess.run(
+                [strip_tool, "--strip-unneeded", path],
+                capture_output=True,
+            )
+            if result.returncode != 0:
+                print(f"warning: {strip_tool} could not strip {filename}")
+                continue
+            saved += size - os.path.getsize(path)
+    return saved
+
+
+def precompile(target, python_version):
+    host_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if host_version != python_version:
+        print(
+            f"warning: host Python {host_version} does not match {python_version};"
+            " skipping bytecode precompilation",
+        )
+        return
+    # Unchecked hashes skip the source timestamp check at import time.
+    compileall.compile_dir(
+        target,
+        quiet=1,
+        legacy=False,
+        optimize=0,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def write_zip(source_dir, artifact):
+    with zipfile.ZipFile(artifact, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        for dirpath, dirnames, filenames in os.walk(source_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                zf.write(path, os.path.relpath(path, source_dir))
+
+
+def build(packages, name, architecture, python_version, budget_bytes):
+    artifact = os.path.join(ROOT_DIR, "assets", "layers", name, f"layer-{architecture}.zip")
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        # Lambda adds the layer's python/ directory to sys.path.
+        target = os.path.join(build_dir, "python")
+        install(packages, architecture, python_version, target)
+        check_interpreter(target, python_version)
+        installed = directory_size(target)
+        pruned = prune(target)
+        stripped = strip(target, architecture)
+        precompile(target, python_version)
+        unpacked = directory_size(target)
+        write_zip(build_dir, artifact)
+
+    size = os.path.getsize(artifact)
+    print(
+        f"{os.path.relpath(artifact, ROOT_DIR)}: {size / 2**20:.2f} MiB zipped,"
+        f" {unpacked / 2**20:.2f} MiB unpacked (installed {installed / 2**20:.2f} MiB,"
+        f" pruned {pruned / 2**20:.2f} MiB, stripped {stripped / 2**20:.2f} MiB)",
+    )
+    if size > budget_bytes:
+        raise SystemExit(
+            f"{os.path.basename(artifact)} is {size / 2**20:.2f} MiB,"
+            f" over the {budget_bytes / 2**20:.2f} MiB budget",
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "packages",
+        nargs="+",
+        help="pip requirements, e.g. psycopg2-binary orjson",
+    )
+    parser.add_argument("--name", required=True, help="directory under assets/layers")
+    parser.add_argument(
+        "--architecture",
+        choices=(*PLATFORMS, "all"),
+        default="all",
+    )
+    parser.add_argument("--python-version", default=default_python_version())
+    parser.add_argument("--budget-mb", type=float, default=8.0)
+    args = parser.parse_args()
+
+    context_version = default_python_version()
+    if args.python_version != context_version:
+        print(
+            f"warning: building for Python {args.python_version}, but cdk.json sets"
+            f" python_version to {context_version}; deploy with"
+            f" -c python_version={args.python_version}",
+        )
+
+    architectures = PLATFORMS if args.architecture == "all" else (args.architecture,)
+    for architecture in architectures:
+        build(
+            args.packages,
+            args.name,
+            architecture,
+            args.python_version,
+            int(args.budget_mb * 2**20),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""End-to-end latency comparison of the sync and async connectiontest handlers.
+
+Invokes both handlers in-process with events carrying N independent queries
+and prints latency percentiles per handler and query count. The handler
+environment variables (DATABASE_ACCOUNT_IAM_ROLE, RDS_PROXY_APPLICATION_ENDPOINT,
+DB_USERNAME, DBNAME, AWS_REGION, optionally DB_SSLMODE) must point at a
+reachable database, and both psycopg2 and asyncpg must be installed.
+
+    python tools/compare_handlers.py --queries 1,4,8 --invocations 50
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "assets",
+        "lambda",
+        "code",
+    ),
+)
+
+DEFAULT_QUERY = "select pg_sleep(0.01), count(*) from information_schema.tables"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(handler, event, invocations):
+    samples = []
+    # The handlers log their results; keep them out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        handler(event, None)  # warm the container state first
+        for _ in range(invocations):
+            start = time.perf_counter()
+            handler(event, None)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", default="1,4,8")
+    parser.add_argument("--invocations", type=int, default=50)
+    parser.add_argument("--sql", default=DEFAULT_QUERY)
+    args = parser.parse_args()
+
+    import connection_test
+    import connection_test_async
+
+    handlers = {
+        "sync": connection_test.handler,
+        "async": connection_test_async.handler,
+    }
+
+    print(f"{'handler':<8} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for query_count in (int(n) for n in args.queries.split(",")):
+        event = {"queries": [args.sql] * query_count}
+        for name, handler in handlers.items():
+            samples = measure(handler, event, args.invocations)
+            print(
+                f"{name:<8} {query_count:>7} {percentile(samples, 0.5):9.1f} "
+                f"{percentile(samples, 0.95):9.1f} {statistics.mean(samples):9.1f}",
+            )
+
+
+if __name__ == "__main__":
+    main()
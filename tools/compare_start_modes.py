@@ -0,0 +1,110 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Cold versus SnapStart-restored versus warm starts of a deployed function.
+
+Reads the REPORT lines Lambda writes to the function's log group and groups
+invocations by how their execution environment started: cold (an "Init
+Duration"), restored from a SnapStart snapshot (a "Restore Duration") or warm.
+For each group it prints p50/p95 of the invocation duration and of the
+init or restore time, so deployments with different connectiontest_start_mode
+values can be compared:
+
+    python tools/compare_start_modes.py --since-minutes 60
+    python tools/compare_start_modes.py --invoke 20 --qualifier live
+
+--invoke first calls the function (through --qualifier, if given) that many
+times. Requires AWS credentials for the application account.
+"""
+import argparse
+import time
+
+import boto3
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95))
+REPORT_FIELDS = ("Duration", "Init Duration", "Restore Duration")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def parse_report(message):
+    """Returns the start kind and the durations of one REPORT line."""
+    # REPORT RequestId: ...\tDuration: 12.34 ms\tBilled Duration: 13 ms\t...
+    fields = dict(
+        part.strip().split(": ", 1) for part in message.split("\t") if ": " in part
+    )
+    fields = {
+        name: float(value.split()[0])
+        for name, value in fields.items()
+        if name in REPORT_FIELDS
+    }
+    if "Restore Duration" in fields:
+        start = "restored"
+    elif "Init Duration" in fields:
+        start = "cold"
+    else:
+        start = "warm"
+    return start, fields
+
+
+def reports(logs, log_group_name, start_time_ms):
+    paginator = logs.get_paginator("filter_log_events")
+    for page in paginator.paginate(
+        logGroupName=log_group_name,
+        startTime=start_time_ms,
+        filterPattern='"REPORT RequestId"',
+    ):
+        for event in page["events"]:
+            yield parse_report(event["message"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--function-name", default="connectiontest-lambda")
+    parser.add_argument("--qualifier", default=None)
+    parser.add_argument("--since-minutes", type=int, default=60)
+    parser.add_argument("--invoke", type=int, default=0)
+    args = parser.parse_args()
+
+    start_time_ms = int((time.time() - args.since_minutes * 60) * 1000)
+
+    if args.invoke:
+        lambda_client = boto3.client("lambda")
+        for _ in range(args.invoke):
+            lambda_client.invoke(
+                FunctionName=args.function_name,
+                **({"Qualifier": args.qualifier} if args.qualifier else {}),
+            )
+        # REPORT lines reach CloudWatch Logs a few seconds after the invocation.
+        time.sleep(15)
+
+    samples = {}
+    for start, durations in reports(
+        boto3.client("logs"),
+        f"/aws/lambda/{args.function_name}",
+        start_time_ms,
+    ):
+        group = samples.setdefault(start, {"Duration": [], "Startup": []})
+        group["Duration"].append(durations["Duration"])
+        startup = durations.get("Restore Duration", durations.get("Init Duration"))
+        if startup is not None:
+            group["Startup"].append(startup)
+
+    if not samples:
+        print("No REPORT lines found; invoke the function or widen --since-minutes.")
+        return
+
+    print(f"{'start':10} {'n':>5} {'metric':9} {'p50 ms':>9} {'p95 ms':>9}")
+    for start in ("cold", "restored", "warm"):
+        for metric, values in samples.get(start, {}).items():
+            if values:
+                print(
+                    f"{start:10} {len(values):5} {metric:9} "
+                    + " ".join(f"{percentile(values, q):9.1f}" for _, q in PERCENTILES),
+                )
+
+
+if __name__ == "__main__":
+    main()
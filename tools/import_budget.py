@@ -0,0 +1,108 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Import-time budget check for the Lambda handler module.
+
+Imports the handler in a fresh interpreter with `-X importtime`, prints the
+most expensive modules and exits non-zero when the total import time exceeds
+the budget or a module that should stay off the cold path gets imported.
+tests/test_import_budget.py runs the same check under pytest.
+
+    python tools/import_budget.py --budget-ms 600
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+LAMBDA_CODE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "assets",
+    "lambda",
+    "code",
+)
+
+# Placeholder configuration; importing the handler does no network I/O.
+HANDLER_ENVIRONMENT = {
+    "DATABASE_ACCOUNT_IAM_ROLE": "arn:aws:iam::111111111111:role/placeholder",
+    "RDS_PROXY_APPLICATION_ENDPOINT": "localhost",
+    "DB_USERNAME": "postgres",
+    "DBNAME": "postgres",
+    "AWS_REGION": "us-east-1",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+FORBIDDEN_MODULES = ("boto3",)
+
+BUDGET_MS = 600.0
+
+
+def measure(module):
+    env = dict(os.environ, **HANDLER_ENVIRONMENT)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [LAMBDA_CODE_DIR, env.get("PYTHONPATH")]),
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"importing {module} failed")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        timings.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def total_ms(timings):
+    # Top-level entries (no leading indentation) add up to the total.
+    return (
+        sum(cumulative for name, _, cumulative in timings if not name.startswith("  "))
+        / 1000
+    )
+
+
+def check(timings, budget_ms=BUDGET_MS):
+    """Returns the reasons the measured import fails the budget, if any."""
+    failures = []
+    if total_ms(timings) > budget_ms:
+        failures.append("import time exceeds budget")
+    imported = {name.strip() for name, _, _ in timings}
+    for module in FORBIDDEN_MODULES:
+        if module in imported:
+            failures.append(f"{module} is imported on the cold path")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="connection_test")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = measure(args.module)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(
+        timings,
+        key=lambda timing: timing[2],
+        reverse=True,
+    )[: args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name.strip()}")
+    print(f"total: {total_ms(timings):.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    failures = check(timings, args.budget_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Offline check of the ingest function's COPY path and its resume.
+
+Generates a CSV or text object whose records carry quoted delimiters,
+quotes and newlines, serves it from S3StandIn (see local_stand_ins.py) and
+invokes the ingest handler in-process, each time with a Lambda context of
+`--invocation-ms`, until the load completes. Then checks that the table
+holds every record exactly once and prints the throughput.
+
+    python tools/ingest_local.py --rows 200000 --chunk-bytes 1048576
+    python tools/ingest_local.py --format text --invocation-ms 1500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+from local_stand_ins import add_database_arguments
+from local_stand_ins import handler_environment
+from local_stand_ins import S3StandIn
+from local_stand_ins import StsStandIn
+from local_stand_ins import use_lambda_code
+
+BUCKET = "ingest-local"
+TABLE = "ingest_local_events"
+
+
+class Context:
+    """The part of the Lambda context the handlers read."""
+
+    def __init__(self, invocation_ms):
+        self.expires_at = time.monotonic() + invocation_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int(max(0.0, self.expires_at - time.monotonic()) * 1000)
+
+
+def generate(rows, data_format):
+    lines = []
+    for index in range(rows):
+        note = f'line {index}, with "quotes"\nand a newline' if index % 7 == 0 else "plain"
+        if data_format == "csv":
+            lines.append(f'{index},"{note.replace(chr(34), chr(34) * 2)}"\n')
+        else:
+            lines.append(f"{index}\t{note.replace(chr(10), chr(92) + 'n')}\n")
+    header = "id,note\n" if data_format == "csv" else ""
+    return (header + "".join(lines)).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_database_arguments(parser)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--format", choices=("csv", "text"), default="csv")
+    parser.add_argument("--chunk-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--read-bytes", type=int, default=64 * 1024)
+    parser.add_argument("--invocation-ms", type=int, default=3000)
+    parser.add_argument("--max-invocations", type=int, default=100)
+    args = parser.parse_args()
+
+    data = generate(args.rows, args.format)
+    key = f"events.{args.format}"
+
+    with StsStandIn() as sts, S3StandIn({(BUCKET, key): data}) as s3:
+        os.environ.update(
+            handler_environment(
+                sts.endpoint_url,
+                args.pg_host,
+                args.pg_port,
+                args.pg_user,
+                args.pg_database,
+            ),
+        )
+        os.environ.update(
+            {
+                "AWS_ENDPOINT_URL_S3": s3.endpoint_url,
+                "INGEST_BUCKET": BUCKET,
+                "INGEST_CHUNK_BYTES": str(args.chunk_bytes),
+                "INGEST_READ_BYTES": str(args.read_bytes),
+                "DEADLINE_MARGIN_MS": "200",
+                "METRICS_MODE": "off",
+            },
+        )
+        use_lambda_code()
+        import ingest
+        from config import DEFAULT_TARGET
+        from routing import READ_WRITE
+        from runtime import router
+
+        holder = router(DEFAULT_TARGET).holders[READ_WRITE]
+        with holder.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"drop table if exists {TABLE}")
+                cur.execute(f"create table {TABLE} (id bigint primary key, note text)")
+                # Start over rather than resume an earlier run's checkpoint.
+                cur.execute("select to_regclass(%s)", (ingest.CHECKPOINTS.table,))
+                if cur.fetchone()[0] is not None:
+                    cur.execute(
+                        f"delete from {ingest.CHECKPOINTS.table} where key = %s",
+                        (key,),
+                    )
+            conn.commit()
+
+        event = {
+            "key": key,
+            "table": TABLE,
+            "columns": ["id", "note"],
+            "format": args.format,
+            "header": args.format == "csv",
+        }
+        start = time.perf_counter()
+        for invocation in range(1, args.max_invocations + 1):
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = ingest.handler(event, Context(args.invocation_ms))
+            body = json.loads(response["body"])
+            print(
+                f"invocation {invocation}: {response['statusCode']} "
+                f"{body.get('byte_offset', 0)}/{len(data)} bytes, "
+                f"{body.get('rows_loaded', 0)} rows in {body.get('chunks', 0)} chunks"
+                + (f" ({body['error']})" if "error" in body else ""),
+            )
+            if response["statusCode"] != 202:
+                break
+        elapsed = time.perf_counter() - start
+
+        with holder.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"select count(*), count(distinct id), sum(id) from {TABLE}",
+                )
+                count, distinct, total = cur.fetchone()
+
+    expected = args.rows * (args.rows - 1) // 2
+    ok = count == distinct == args.rows and total == expected
+    print(
+        f"{count} rows ({distinct} distinct) in {elapsed:.2f}s, "
+        f"{len(data) / elapsed / 1024 / 1024:.1f} MiB/s, "
+        f"{s3.requests} S3 requests: {'ok' if ok else 'MISMATCH'}",
+    )
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
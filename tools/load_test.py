@@ -0,0 +1,412 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Concurrent load test of the connectiontest handler.
+
+Drives the handler at increasing concurrency with a weighted mix of requests
+and prints, per step, throughput, latency percentiles, errors and the number of
+database connections, so reserved concurrency, the proxy's
+max_connections_percent and Aurora capacity can be sized together.
+
+Locally, each unit of concurrency is a worker process holding its own handler
+module, as one Lambda execution environment would, with STS served by the
+stand-in from local_stand_ins.py. Point --pg-host/--pg-port at a connection
+pooler in front of PostgreSQL (for example PgBouncer in transaction mode) to
+stand in for RDS Proxy; backend connections are counted from pg_stat_activity
+on --count-host/--count-port, the PostgreSQL server itself.
+
+    python tools/load_test.py --steps 1,2,5,10,20 --step-seconds 10 \\
+        --mix query=6,read=2,write=2 --pg-port 6432 --count-port 5432
+
+Against a deployed stack, the function is invoked at each concurrency with
+RequestResponse calls, and connections are read from the proxy's
+ClientConnections and DatabaseConnections CloudWatch metrics, which have a
+one-minute resolution, so use steps of a minute or more:
+
+    python tools/load_test.py --function-name connectiontest-lambda \\
+        --qualifier live --proxy-name <proxy> --steps 1,5,10 --step-seconds 120
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from local_stand_ins import add_database_arguments
+from local_stand_ins import handler_environment
+from local_stand_ins import StsStandIn
+from local_stand_ins import use_lambda_code
+
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+LOAD_TEST_TABLE = "load_test_events"
+CREATE_LOAD_TEST_TABLE = (
+    f"create table if not exists {LOAD_TEST_TABLE}"
+    " (id bigserial primary key, worker int, payload text)"
+)
+
+EVENTS = {
+    # Streams through a named cursor, which pins and discards the connection.
+    "query": lambda worker: {
+        "queries": ["select * from information_schema.tables limit 50"],
+    },
+    "read": lambda worker: {
+        "statements": [
+            "select count(*) from information_schema.columns",
+        ],
+    },
+    "write": lambda worker: {
+        "statements": [
+            {
+                "sql": f"insert into {LOAD_TEST_TABLE} (worker, payload) values (%s, %s)",
+                "params": [worker, "x" * 100],
+            },
+        ],
+    },
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in EVENTS:
+            raise SystemExit(f"unknown request type {name!r}; use {', '.join(EVENTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def failed(response):
+    if response.get("statusCode") != 200:
+        return True
+    body = response.get("body", "")
+    # Batch responses report statement errors with a 200 status.
+    return body.startswith("{") and any(
+        result["status"] != "ok" for result in json.loads(body).get("results", [])
+    )
+
+
+def worker_main(pipe, environ, module_name, worker_id):
+    os.environ.update(environ)
+    use_lambda_code()
+    # Each worker is its own execution environment; keep handler logs out of
+    # the report.
+    sys.stdout = open(os.devnull, "w")
+    handler = __import__(module_name).handler
+    pipe.send("ready")
+
+    rng = random.Random(worker_id)
+    while True:
+        command = pipe.recv()
+        if command is None:
+            break
+        seconds, weights = command
+        names, cumulative = list(weights), list(weights.values())
+        latencies, errors = [], 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            event = EVENTS[rng.choices(names, cumulative)[0]](worker_id)
+            start = time.perf_counter()
+            try:
+                if failed(handler(event, None)):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        pipe.send((latencies, errors))
+
+
+class ConnectionSampler:
+    """Samples a connection count in the background during a step."""
+
+    def __init__(self, count, interval=0.5):
+        self.count = count
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            with contextlib.suppress(Exception):
+                self.samples.append(self.count())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        return {
+            "DatabaseConnectionsMax": max(self.samples),
+            "DatabaseConnectionsMean": round(sum(self.samples) / len(self.samples), 1),
+        }
+
+
+def summarize(concurrency, seconds, latencies, errors, connections):
+    step = {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / seconds, 1),
+        "errors": errors,
+        "connections": connections,
+    }
+    if latencies:
+        step.update(
+            {name: round(percentile(latencies, q), 2) for name, q in PERCENTILES},
+        )
+    return step
+
+
+def run_local(args, weights, steps):
+    import psycopg2
+
+    monitor = psycopg2.connect(
+        host=args.count_host or args.pg_host,
+        port=args.count_port or args.pg_port,
+        user=args.pg_user,
+        dbname=args.pg_database,
+        # Any password passes the local pam_permit rule.
+        password="local",
+    )
+    monitor.autocommit = True
+
+    def count_connections():
+        with monitor.cursor() as cur:
+            cur.execute(
+                "select count(*) from pg_stat_activity"
+                " where backend_type = 'client backend' and datname = %s"
+                " and pid <> pg_backend_pid()",
+                (args.pg_database,),
+            )
+            return cur.fetchone()[0]
+
+    conn = psycopg2.connect(
+        host=args.pg_host,
+        port=args.pg_port,
+        user=args.pg_user,
+        dbname=args.pg_database,
+        # Any password passes the local pam_permit rule.
+        password="local",
+    )
+    with conn, conn.cursor() as cur:
+        cur.execute(CREATE_LOAD_TEST_TABLE)
+    conn.close()
+
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    results = []
+    with StsStandIn(latency_ms=args.sts_latency_ms) as sts:
+        environ = handler_environment(
+            sts.endpoint_url,
+            args.pg_host,
+            args.pg_port,
+            args.pg_user,
+            args.pg_database,
+        )
+        environ.update(dict(item.split("=", 1) for item in args.env))
+        try:
+            for concurrency in steps:
+                # Scale out like Lambda: environments from earlier steps stay warm.
+                while len(workers) < concurrency:
+                    parent, child = context.Pipe()
+                    process = context.Process(
+                        target=worker_main,
+                        args=(child, environ, args.handler_module, len(workers)),
+                        daemon=True,
+                    )
+                    process.start()
+                    parent.recv()
+                    workers.append((process, parent))
+
+                with ConnectionSampler(count_connections) as sampler:
+                    for _, pipe in workers[:concurrency]:
+                        pipe.send((args.step_seconds, weights))
+                    latencies, errors = [], 0
+                    for _, pipe in workers[:concurrency]:
+                        worker_latencies, worker_errors = pipe.recv()
+                        latencies += worker_latencies
+                        errors += worker_errors
+                results.append(
+                    summarize(
+                        concurrency,
+                        args.step_seconds,
+                        latencies,
+                        errors,
+                        sampler.summary(),
+                    ),
+                )
+                print_step(results[-1])
+        finally:
+            for process, pipe in workers:
+                with contextlib.suppress(OSError):
+                    pipe.send(None)
+                process.join(timeout=5)
+            monitor.close()
+    return results
+
+
+def proxy_connections(cloudwatch, proxy_name, start, end):
+    connections = {}
+    for metric in ("ClientConnections", "DatabaseConnections"):
+        datapoints = cloudwatch.get_metric_statistics(
+            Namespace="AWS/RDS",
+            MetricName=metric,
+            Dimensions=[{"Name": "ProxyName", "Value": proxy_name}],
+            StartTime=start,
+            EndTime=end + timedelta(minutes=1),
+            Period=60,
+            Statistics=["Maximum"],
+        )["Datapoints"]
+        if datapoints:
+            connections[metric] = max(point["Maximum"] for point in datapoints)
+    return connections
+
+
+def run_deployed(args, weights, steps):
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+
+    lambda_client = boto3.client(
+        "lambda",
+        config=Config(max_pool_connections=max(steps), retries={"max_attempts": 0}),
+    )
+    cloudwatch = boto3.client("cloudwatch")
+    names, cumulative = list(weights), list(weights.values())
+
+    if "write" in weights:
+        lambda_client.invoke(
+            FunctionName=args.function_name,
+            Payload=json.dumps({"statements": [CREATE_LOAD_TEST_TABLE]}),
+            **({"Qualifier": args.qualifier} if args.qualifier else {}),
+        )
+
+    def invoke_until(deadline, worker_id):
+        rng = random.Random(worker_id)
+        latencies, errors, throttles = [], 0, 0
+        while time.monotonic() < deadline:
+            event = EVENTS[rng.choices(names, cumulative)[0]](worker_id)
+            start = time.perf_counter()
+            try:
+                response = lambda_client.invoke(
+                    FunctionName=args.function_name,
+                    Payload=json.dumps(event),
+                    **({"Qualifier": args.qualifier} if args.qualifier else {}),
+                )
+                payload = json.loads(response["Payload"].read() or b"{}")
+                if "FunctionError" in response or failed(payload):
+                    errors += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "TooManyRequestsException":
+                    raise
+                throttles += 1
+                # A throttled caller backs off instead of spinning.
+                time.sleep(0.1)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies, errors, throttles
+
+    results = []
+    for concurrency in steps:
+        start = datetime.now(timezone.utc)
+        deadline = time.monotonic() + args.step_seconds
+        with ThreadPoolExecutor(concurrency) as executor:
+            outcomes = list(
+                executor.map(invoke_until, [deadline] * concurrency, range(concurrency)),
+            )
+        connections = {}
+        if args.proxy_name:
+            connections = proxy_connections(
+                cloudwatch,
+                args.proxy_name,
+                start,
+                datetime.now(timezone.utc),
+            )
+        step = summarize(
+            concurrency,
+            args.step_seconds,
+            [latency for latencies, _, _ in outcomes for latency in latencies],
+            sum(errors for _, errors, _ in outcomes),
+            connections,
+        )
+        step["throttles"] = sum(throttles for _, _, throttles in outcomes)
+        results.append(step)
+        print_step(step)
+    return results
+
+
+def print_step(step):
+    connections = ", ".join(
+        f"{name} {value}" for name, value in sorted(step["connections"].items())
+    )
+    print(
+        f"c={step['concurrency']:<4} {step['requests']:>7} req"
+        f" {step['throughput']:>8.1f} req/s"
+        + "".join(f" {name} {step.get(name, 0):8.2f} ms" for name, _ in PERCENTILES)
+        + f"  errors {step['errors']}"
+        + (f"  throttles {step['throttles']}" if "throttles" in step else "")
+        + (f"  connections {connections}" if connections else ""),
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_database_arguments(parser)
+    parser.add_argument("--steps", default="1,2,5,10")
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--mix", default="query=6,read=2,write=2")
+    parser.add_argument(
+        "--handler-module",
+        default="connection_test",
+        help="connection_test or connection_test_async (local mode)",
+    )
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="extra handler environment variable (local mode), e.g. QUERY_CURSOR=server",
+    )
+    parser.add_argument("--count-host", help="PostgreSQL server behind the pooler")
+    parser.add_argument("--count-port", type=int)
+    parser.add_argument("--sts-latency-ms", type=float, default=0.0)
+    parser.add_argument("--function-name", help="load test a deployed function")
+    parser.add_argument("--qualifier")
+    parser.add_argument("--proxy-name", help="RDS Proxy to read connections from")
+    parser.add_argument("--output", help="write the steps as JSON to this file")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    steps = [int(step) for step in args.steps.split(",")]
+    if args.function_name:
+        results = run_deployed(args, weights, steps)
+    else:
+        results = run_local(args, weights, steps)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mix": weights, "steps": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
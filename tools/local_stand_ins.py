@@ -0,0 +1,235 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Local stand-ins for running the Lambda connection path without AWS.
+
+StsStandIn serves AssumeRole on localhost and is picked up by botocore through
+AWS_ENDPOINT_URL_STS; S3StandIn serves objects to the ingest function through
+AWS_ENDPOINT_URL_S3. The database side is a local PostgreSQL that asks for a
+cleartext password and accepts any, so the signed IAM auth token is sent as
+the password the way RDS Proxy receives it. Tokens change with every
+signature, so md5 and scram cannot check them; a PAM rule backed by
+pam_permit can:
+
+    docker run -d --name iam-pg -p 5432:5432 -e POSTGRES_PASSWORD=unused postgres:15
+    docker exec iam-pg sh -c 'printf "auth required pam_permit.so\\naccount required pam_permit.so\\n" > /etc/pam.d/postgresql-iam && sed -i "1i host all all all pam pamservice=postgresql-iam" "$PGDATA/pg_hba.conf"'
+    docker exec -u postgres iam-pg pg_ctl reload
+
+With `trust` authentication the server never asks for a password, and the
+token is not sent at all.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+LAMBDA_CODE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "assets",
+    "lambda",
+    "code",
+)
+
+ASSUME_ROLE_RESPONSE = """<AssumeRoleResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">
+  <AssumeRoleResult>
+    <Credentials>
+      <AccessKeyId>ASIA{access_key}</AccessKeyId>
+      <SecretAccessKey>local-secret-access-key</SecretAccessKey>
+      <SessionToken>local-session-token</SessionToken>
+      <Expiration>{expiration}</Expiration>
+    </Credentials>
+    <AssumedRoleUser>
+      <AssumedRoleId>AROALOCAL:cross_acct_connection</AssumedRoleId>
+      <Arn>arn:aws:sts::111111111111:assumed-role/local/cross_acct_connection</Arn>
+    </AssumedRoleUser>
+  </AssumeRoleResult>
+  <ResponseMetadata>
+    <RequestId>{request_id}</RequestId>
+  </ResponseMetadata>
+</AssumeRoleResponse>
+"""
+
+
+class StsStandIn:
+    """A localhost STS that answers every request with fresh AssumeRole
+    credentials, optionally after an artificial `latency_ms`."""
+
+    def __init__(self, latency_ms=0.0, credential_lifetime=timedelta(hours=1)):
+        self.latency_ms = latency_ms
+        self.credential_lifetime = credential_lifetime
+        self.requests = 0
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stand_in.requests += 1
+                if stand_in.latency_ms:
+                    time.sleep(stand_in.latency_ms / 1000)
+                expiration = datetime.now(timezone.utc) + stand_in.credential_lifetime
+                body = ASSUME_ROLE_RESPONSE.format(
+                    access_key=uuid.uuid4().hex[:16].upper(),
+                    expiration=expiration.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    request_id=uuid.uuid4(),
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+S3_ERROR_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<Error><Code>{code}</Code><Message>{message}</Message></Error>
+"""
+
+RANGE_HEADER = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class S3StandIn:
+    """A localhost S3 that serves HEAD and ranged GET requests for the
+    objects in `objects`, a dict of (bucket, key) to bytes, honoring If-Match.
+    Optionally stalls each GET for `latency_ms`."""
+
+    def __init__(self, objects=None, latency_ms=0.0):
+        self.objects = objects if objects is not None else {}
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _error(self, status, code, message):
+                body = S3_ERROR_RESPONSE.format(code=code, message=message).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _object(self):
+                stand_in.requests += 1
+                bucket, _, key = self.path.lstrip("/").split("?")[0].partition("/")
+                data = stand_in.objects.get((bucket, urllib.parse.unquote(key)))
+                if data is None:
+                    self._error(404, "NoSuchKey", "The specified key does not exist.")
+                    return None, None
+                etag = f'"{hashlib.md5(data).hexdigest()}"'
+                if self.headers.get("If-Match", etag) != etag:
+                    self._error(412, "PreconditionFailed", "If-Match failed.")
+                    return None, None
+                return data, etag
+
+            def do_HEAD(self):
+                data, etag = self._object()
+                if data is None:
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+
+            def do_GET(self):
+                data, etag = self._object()
+                if data is None:
+                    return
+                if stand_in.latency_ms:
+                    time.sleep(stand_in.latency_ms / 1000)
+                status, body = 200, data
+                match = RANGE_HEADER.match(self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+                    status, body = 206, data[start : end + 1]
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                if match:
+                    self.send_header(
+                        "Content-Range",
+                        f"bytes {start}-{end}/{len(data)}",
+                    )
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def handler_environment(sts_endpoint_url, pg_host, pg_port, pg_user, pg_database):
+    """Environment that points the Lambda code at the local stand-ins."""
+    return {
+        "AWS_ENDPOINT_URL_STS": sts_endpoint_url,
+        "AWS_ACCESS_KEY_ID": "local-access-key-id",
+        "AWS_SECRET_ACCESS_KEY": "local-secret-access-key",
+        "AWS_REGION": "us-east-1",
+        "AWS_DEFAULT_REGION": "us-east-1",
+        "DATABASE_ACCOUNT_IAM_ROLE": "arn:aws:iam::111111111111:role/local",
+        "RDS_PROXY_APPLICATION_ENDPOINT": pg_host,
+        "DB_PORT": str(pg_port),
+        "DB_USERNAME": pg_user,
+        "DBNAME": pg_database,
+        "DB_SSLMODE": "prefer",
+    }
+
+
+def use_lambda_code():
+    if LAMBDA_CODE_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_CODE_DIR)
+
+
+def add_database_arguments(parser):
+    parser.add_argument("--pg-host", default=os.environ.get("PGHOST", "127.0.0.1"))
+    parser.add_argument(
+        "--pg-port",
+        type=int,
+        default=int(os.environ.get("PGPORT", "5432")),
+    )
+    parser.add_argument("--pg-user", default=os.environ.get("PGUSER", "postgres"))
+    parser.add_argument(
+        "--pg-database",
+        default=os.environ.get("PGDATABASE", "postgres"),
+    )